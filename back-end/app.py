@@ -15,6 +15,8 @@ from database import (
     database, on_startup as init_db, on_shutdown as db_shutdown,
     register_websocket, unregister_websocket, subscribe_to_updates, unsubscribe_from_updates
 )
+from helpers.registration_queue import start_registration_queue, stop_registration_queue
+from helpers.seat_broadcast import seat_broadcast, SEATS_TOPIC
 import logging
 import uuid
 import json
@@ -28,8 +30,8 @@ app = FastAPI(
     title="Course Registration System API",
     description="API for a university course registration system",
     version="1.0.0",
-    on_startup=[init_db],
-    on_shutdown=[db_shutdown]
+    on_startup=[init_db, start_registration_queue],
+    on_shutdown=[stop_registration_queue, db_shutdown]
 )
 
 app.include_router(user_router, prefix="/api/v1", tags=["Users"])
@@ -114,6 +116,10 @@ async def websocket_endpoint(
                             "collection": collection,
                             "entity_id": entity_id
                         }))
+                        
+                        # Seat subscribers start from the course's current seats, then get deltas
+                        if collection == SEATS_TOPIC:
+                            await seat_broadcast.send_snapshot(entity_id, websocket)
                     else:
                         await websocket.send_text(json.dumps({
                             "type": "error",
@@ -0,0 +1,156 @@
+"""
+Registration Concurrency Benchmark
+
+Fires parallel registrations through enroll_student against the configured
+database and checks that credit hours are never double-spent:
+
+  1. 500 parallel registrations of one student for the same course
+     -> exactly one enrollment, charged exactly once
+  2. 500 parallel registrations of one student for 500 different courses
+     with a budget that covers only a few of them
+     -> successes * credit_hours == budget spent, balance never negative
+
+Registrations that fail with anything other than a rejection (for example a
+transaction that runs out of retries on the contended student document) are
+counted and reported separately instead of stopping the run.
+
+All test documents use the BENCH- prefix and are removed afterwards.
+Run from the back-end directory: python benchmark_registration.py [parallel]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+import traceback
+from collections import Counter
+
+from fastapi import HTTPException
+
+from database import users_collection, courses_collection, enrollments_collection, create_indexes
+from helpers.exceptions import EnrollmentError
+from helpers.prerequisite_index import prerequisite_index
+from helpers.catalog import catalog
+from helpers.semester_settings import semester_settings
+from controllers.enrollmentController import enroll_student, invalidate_student_caches
+
+PREFIX = "BENCH-"
+STUDENT_ID = f"{PREFIX}STUDENT"
+CREDIT_HOURS_PER_COURSE = 3
+
+# Outcomes of one registration
+SUCCEEDED = "succeeded"
+REJECTED = "rejected"
+
+async def setup(course_count: int, budget: int):
+    """Create the benchmark student and courses"""
+    await cleanup()
+    snapshot = await semester_settings.get()
+
+    await users_collection.insert_one({
+        "student_id": STUDENT_ID,
+        "name": "Benchmark Student",
+        "role": "student",
+        "credit_hours": budget
+    })
+    await courses_collection.insert_many([
+        {
+            "course_id": f"{PREFIX}{i:04d}",
+            "name": f"Benchmark Course {i}",
+            "credit_hours": CREDIT_HOURS_PER_COURSE,
+            "prerequisites": [],
+            "semesters": [snapshot.current_semester]
+        }
+        for i in range(course_count)
+    ])
+
+    # The app normally learns about these from change streams
+    catalog.invalidate()
+    prerequisite_index.invalidate_student(STUDENT_ID)
+    invalidate_student_caches(STUDENT_ID)
+
+async def cleanup():
+    """Remove every benchmark document"""
+    await users_collection.delete_many({"student_id": STUDENT_ID})
+    await courses_collection.delete_many({"course_id": {"$regex": f"^{PREFIX}"}})
+    await enrollments_collection.delete_many({"student_id": STUDENT_ID})
+
+async def timed_enroll(course_id: str):
+    """Run one registration; returns (outcome, latency in ms), the outcome of an error being its type name"""
+    start_time = time.perf_counter()
+    try:
+        await enroll_student(STUDENT_ID, course_id)
+        outcome = SUCCEEDED
+    except (EnrollmentError, HTTPException):
+        outcome = REJECTED
+    except Exception as e:
+        outcome = type(e).__name__
+    return outcome, (time.perf_counter() - start_time) * 1000
+
+async def run_scenario(name: str, course_ids, budget: int) -> bool:
+    """Fire every registration at once and verify the credit-hour invariant"""
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(timed_enroll(course_id) for course_id in course_ids))
+    elapsed = time.perf_counter() - start_time
+
+    outcomes = Counter(outcome for outcome, _ in results)
+    successes = outcomes.pop(SUCCEEDED, 0)
+    rejections = outcomes.pop(REJECTED, 0)
+    latencies = sorted(latency for _, latency in results)
+
+    student = await users_collection.find_one({"student_id": STUDENT_ID})
+    enrollments = await enrollments_collection.count_documents({"student_id": STUDENT_ID})
+    remaining = student["credit_hours"]
+    spent = budget - remaining
+
+    print(f"\n=== {name} ===")
+    print(f"Requests: {len(results)} in {elapsed:.2f}s ({len(results) / elapsed:.0f} req/s)")
+    print(f"Latency ms: p50={statistics.median(latencies):.1f} "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1]:.1f} max={latencies[-1]:.1f}")
+    print(f"Succeeded: {successes}, rejected: {rejections}, enrollment records: {enrollments}")
+    if outcomes:
+        print("Errors: " + ", ".join(f"{error}={count}" for error, count in outcomes.most_common()))
+    print(f"Credit hours: budget={budget}, spent={spent}, remaining={remaining}")
+
+    ok = (
+        remaining >= 0
+        and enrollments == successes
+        and spent == successes * CREDIT_HOURS_PER_COURSE
+    )
+    print("✅ No double-spend" if ok else "❌ Credit hours and enrollments disagree")
+    return ok
+
+async def main(parallel: int = 500):
+    ok = True
+    try:
+        await create_indexes()
+
+        # Same course from every request: only one may win
+        budget = CREDIT_HOURS_PER_COURSE * 10
+        await setup(1, budget)
+        ok &= await run_scenario(
+            f"{parallel} parallel registrations for the same course",
+            [f"{PREFIX}0000"] * parallel,
+            budget
+        )
+
+        # Different courses, budget for only 5 of them
+        budget = CREDIT_HOURS_PER_COURSE * 5
+        await setup(parallel, budget)
+        ok &= await run_scenario(
+            f"{parallel} parallel registrations for different courses",
+            [f"{PREFIX}{i:04d}" for i in range(parallel)],
+            budget
+        )
+    except Exception as e:
+        print(f"❌ Benchmark failed: {str(e)}")
+        traceback.print_exc()
+        ok = False
+    finally:
+        await cleanup()
+
+    return ok
+
+if __name__ == "__main__":
+    parallel = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    sys.exit(0 if asyncio.run(main(parallel)) else 1)
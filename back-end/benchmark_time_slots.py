@@ -0,0 +1,167 @@
+"""
+Time Slot Response Benchmark
+
+Measures per-request CPU for GET /schedule/time-slots/{course_id} on one
+course with many sections, comparing:
+
+  before: TimeSlot per slot (cached), then TimeSlotResponse per slot, then
+          FastAPI response_model validation and JSON encoding
+  after:  the trusted path - cached plain rows emitted straight to bytes
+
+Both run through a real FastAPI app over ASGI with the auth dependency
+overridden and the catalog / time slot cache pre-filled, so no database is
+needed. The two response bodies are checked to be identical.
+Run from the back-end directory: python benchmark_time_slots.py [slots] [requests]
+"""
+
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List
+
+from fastapi import FastAPI
+
+from helpers.auth import get_current_active_user, TokenData
+from helpers.catalog import catalog, CatalogKind
+from models.Schedules import TimeSlot, TimeSlotResponse, TimeSlotType
+from controllers.scheduleController import router, get_available_time_slots, time_slot_row, TIME_SLOTS_CACHE
+
+COURSE_ID = "BENCH-COURSE"
+DAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
+TYPES = [TimeSlotType.LECTURE, TimeSlotType.LAB, TimeSlotType.TUTORIAL]
+
+def make_slots(count: int) -> List[Dict]:
+    """Stored time slot documents, as the admin endpoints write them"""
+    return [
+        {
+            "slot_id": f"BENCH-{i:04d}",
+            "course_id": COURSE_ID,
+            "day": DAYS[i % len(DAYS)],
+            "start_time": f"{8 + i % 10:02d}:00:00",
+            "end_time": f"{9 + i % 10:02d}:30:00",
+            "type": TYPES[i % len(TYPES)].value,
+            "room_id": f"R{i % 20}",
+            "instructor_id": f"I{i % 15}"
+        }
+        for i in range(count)
+    ]
+
+def setup_catalog():
+    """Serve the course, rooms and instructors from memory"""
+    catalog.maps[CatalogKind.COURSES] = {COURSE_ID: {"_id": "c", "course_id": COURSE_ID, "name": "Benchmark Course"}}
+    catalog.maps[CatalogKind.ROOMS] = {
+        f"R{i}": {"_id": f"r{i}", "room_id": f"R{i}", "building": "B", "room_number": str(100 + i)} for i in range(20)
+    }
+    catalog.maps[CatalogKind.INSTRUCTORS] = {
+        f"I{i}": {"_id": f"i{i}", "instructor_id": f"I{i}", "name": f"Instructor {i}", "role": "instructor"}
+        for i in range(15)
+    }
+    catalog.loaded = True
+
+def legacy_app(slots: List[Dict]) -> FastAPI:
+    """The pre-change endpoint: TimeSlot -> TimeSlotResponse -> response_model validation"""
+    app = FastAPI()
+    snapshot = catalog
+    cached = {
+        slot_type: [
+            TimeSlot(
+                **slot,
+                room_name=snapshot.room_name(slot["room_id"]),
+                instructor_name=snapshot.instructor_name(slot["instructor_id"])
+            )
+            for slot in slots if slot["type"] == slot_type
+        ]
+        for slot_type in TYPES
+    }
+
+    @app.get("/schedule/time-slots/{course_id}", response_model=Dict[str, List[TimeSlotResponse]])
+    async def get_course_time_slots(course_id: str):
+        course = snapshot.course(course_id)
+        return {
+            name: [
+                TimeSlotResponse(
+                    slot_id=slot.slot_id,
+                    course_id=slot.course_id,
+                    course_name=course["name"],
+                    day=slot.day,
+                    start_time=slot.start_time,
+                    end_time=slot.end_time,
+                    type=slot.type,
+                    room_id=slot.room_id,
+                    room_name=slot.room_name,
+                    instructor_id=slot.instructor_id,
+                    instructor_name=slot.instructor_name
+                )
+                for slot in cached[slot_type]
+            ]
+            for name, slot_type in zip(["lecture", "lab", "tutorial"], TYPES)
+        }
+
+    return app
+
+async def current_app(slots: List[Dict]) -> FastAPI:
+    """The shipped endpoint, with the time slot cache pre-filled from the same documents"""
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_active_user] = lambda: TokenData(sub="bench", role="admin", user_id="0")
+
+    TIME_SLOTS_CACHE.clear()
+    for slot_type in TYPES:
+        # Bypass Mongo: fill the cache the same way get_available_time_slots would
+        TIME_SLOTS_CACHE.set((COURSE_ID, slot_type), [
+            time_slot_row(slot, catalog.room_name(slot["room_id"]), catalog.instructor_name(slot["instructor_id"]))
+            for slot in slots if slot["type"] == slot_type
+        ])
+        assert len(await get_available_time_slots(COURSE_ID, slot_type)) > 0
+    return app
+
+async def request(app: FastAPI, path: str) -> bytes:
+    """One GET through the ASGI app; returns the response body"""
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "headers": [], "http_version": "1.1", "scheme": "http",
+        "server": ("bench", 80), "client": ("bench", 1), "root_path": ""
+    }
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+async def measure(name: str, app: FastAPI, requests: int) -> float:
+    path = f"/schedule/time-slots/{COURSE_ID}"
+    await request(app, path)  # warm up
+    start_cpu = time.process_time()
+    for _ in range(requests):
+        await request(app, path)
+    per_request = (time.process_time() - start_cpu) / requests * 1000
+    print(f"{name:>7}: {per_request:.2f} ms CPU per request")
+    return per_request
+
+async def main(slot_count: int = 500, requests: int = 200) -> bool:
+    setup_catalog()
+    slots = make_slots(slot_count)
+    before_app = legacy_app(slots)
+    after_app = await current_app(slots)
+
+    path = f"/schedule/time-slots/{COURSE_ID}"
+    same = json.loads(await request(before_app, path)) == json.loads(await request(after_app, path))
+    print(f"=== {slot_count} slots, {requests} requests ===")
+    print("✅ Responses identical" if same else "❌ Responses differ")
+
+    before = await measure("before", before_app, requests)
+    after = await measure("after", after_app, requests)
+    print(f"Speedup: {before / after:.1f}x")
+    return same
+
+if __name__ == "__main__":
+    slot_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    sys.exit(0 if asyncio.run(main(slot_count, requests)) else 1)
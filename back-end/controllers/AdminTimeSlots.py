@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
-from database import time_slots_collection, rooms_collection, courses_collection, users_collection
+from database import time_slots_collection
 from models.TimeSlots import TimeSlot
 from helpers.auth import get_current_user, TokenData
 from helpers.helpers import generate_slot_id
+from helpers.catalog import catalog
+from helpers.schedule_index import WeekSchedule, stored_time_fields
 from datetime import datetime
 
 router = APIRouter()
@@ -14,52 +16,44 @@ async def create_time_slot(time_slot: TimeSlot, user: TokenData = Depends(get_cu
         raise HTTPException(status_code=403, detail="Unauthorized access")
     
     try:
+        snapshot = await catalog.get()
+        
         # Validate room existence
-        room = await rooms_collection.find_one({"room_id": time_slot.room_id})
+        room = snapshot.room(time_slot.room_id)
         if not room:
             raise HTTPException(status_code=400, detail="Invalid room ID")
         
         # Validate instructor existence (if provided)
         if time_slot.instructor_id:
-            instructor = await users_collection.find_one({"instructor_id": time_slot.instructor_id})
+            instructor = snapshot.instructor(time_slot.instructor_id)
             if not instructor:
                 raise HTTPException(status_code=400, detail="Invalid instructor ID")
             
         # Validate course existence (if provided)
         if time_slot.course_id:
-            course = await courses_collection.find_one({"course_id": time_slot.course_id})
+            course = snapshot.course(time_slot.course_id)
             if not course:
                 raise HTTPException(status_code=400, detail="Invalid course ID")
             
-        # Convert time objects to strings for MongoDB query
-        start_time_str = time_slot.start_time.strftime("%H:%M:%S")
-        end_time_str = time_slot.end_time.strftime("%H:%M:%S")
+        # Display strings plus integer minutes, as stored
+        time_fields = stored_time_fields(time_slot.start_time, time_slot.end_time)
             
-        # Prevent conflicting time slots for the same room
-        existing_slot = await time_slots_collection.find_one({
-            "room_id": time_slot.room_id,
-            "day": time_slot.day,
-            "$or": [
-                {
-                    "$and": [
-                        {"start_time": {"$lte": start_time_str}},
-                        {"end_time": {"$gt": start_time_str}}
-                    ]
-                },
-                {
-                    "$and": [
-                        {"start_time": {"$lt": end_time_str}},
-                        {"end_time": {"$gte": end_time_str}}
-                    ]
-                },
-                {
-                    "$and": [
-                        {"start_time": {"$gte": start_time_str}},
-                        {"end_time": {"$lte": end_time_str}}
-                    ]
-                }
-            ]
-        })
+        # Prevent conflicting time slots for the same room: a numeric range query on
+        # (room_id, day, start_min) returns only the overlapping slots, plus any slot
+        # not yet migrated to minutes, which the exact check below covers
+        room_slots = await time_slots_collection.find(
+            {
+                "room_id": time_slot.room_id,
+                "day": time_slot.day,
+                "$or": [
+                    {"start_min": {"$lt": time_fields["end_min"]}, "end_min": {"$gt": time_fields["start_min"]}},
+                    {"start_min": {"$exists": False}}
+                ]
+            },
+            {"_id": 0, "slot_id": 1, "day": 1, "start_time": 1, "end_time": 1, "start_min": 1, "end_min": 1}
+        ).to_list(None)
+        room_schedule = WeekSchedule(room_slots)
+        existing_slot = room_schedule.find_conflict(time_slot.day, time_fields["start_min"], time_fields["end_min"])
         
         if existing_slot:
             raise HTTPException(status_code=400, detail="Time slot conflicts with an existing booking")
@@ -67,9 +61,11 @@ async def create_time_slot(time_slot: TimeSlot, user: TokenData = Depends(get_cu
         slot_id = await generate_slot_id()
         time_slot_data = time_slot.model_dump()
         time_slot_data["slot_id"] = slot_id
-        # Convert time objects to strings in the data to be stored
-        time_slot_data["start_time"] = start_time_str
-        time_slot_data["end_time"] = end_time_str
+        # Store times as strings for display and as minutes for range queries and comparisons
+        time_slot_data.update(time_fields)
+        # Seat counters for atomic section reservations
+        time_slot_data["capacity"] = room.get("capacity", 0)
+        time_slot_data["seats_taken"] = 0
         
         await time_slots_collection.insert_one(time_slot_data)
         return {"message": "Time slot created successfully", "slot_id": slot_id}
@@ -145,6 +141,34 @@ async def update_time_slot(slot_id: str, updated_data: dict, user: TokenData = D
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Unauthorized access")
     
+    # Seat counters are maintained by the reservation path only
+    updated_data.pop("seats_taken", None)
+    
+    # Minutes are derived from the time strings, never set directly
+    updated_data.pop("start_min", None)
+    updated_data.pop("end_min", None)
+    if "start_time" in updated_data or "end_time" in updated_data:
+        current = await time_slots_collection.find_one({"slot_id": slot_id}, {"start_time": 1, "end_time": 1})
+        if not current:
+            raise HTTPException(status_code=404, detail="Time slot not found")
+        try:
+            time_fields = stored_time_fields(
+                updated_data.get("start_time", current["start_time"]),
+                updated_data.get("end_time", current["end_time"])
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if time_fields["start_min"] >= time_fields["end_min"]:
+            raise HTTPException(status_code=400, detail="End time must be after start time")
+        updated_data.update(time_fields)
+    
+    # Keep the slot capacity in sync with its room
+    if updated_data.get("room_id"):
+        room = (await catalog.get()).room(updated_data["room_id"])
+        if not room:
+            raise HTTPException(status_code=400, detail="Invalid room ID")
+        updated_data["capacity"] = room.get("capacity", 0)
+    
     result = await time_slots_collection.update_one({"slot_id": slot_id}, {"$set": updated_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Time slot not found")
@@ -167,7 +191,8 @@ async def delete_time_slot(slot_id: str, user: TokenData = Depends(get_current_u
 async def get_time_slots_by_course(course_id: str, user: TokenData = Depends(get_current_user)):
     try:
         # Verify the course exists
-        course = await courses_collection.find_one({"course_id": course_id})
+        snapshot = await catalog.get()
+        course = snapshot.course(course_id)
         if not course:
             raise HTTPException(status_code=404, detail=f"Course with ID {course_id} not found")
         
@@ -181,11 +206,7 @@ async def get_time_slots_by_course(course_id: str, user: TokenData = Depends(get
         formatted_slots = []
         for slot in time_slots:
             # Get instructor name if instructor_id is available
-            instructor_name = None
-            if slot.get("instructor_id"):
-                instructor = await users_collection.find_one({"instructor_id": slot.get("instructor_id")})
-                if instructor:
-                    instructor_name = instructor.get("name")
+            instructor_name = snapshot.instructor_name(slot.get("instructor_id"))
             
             slot_dict = {
                 "slot_id": slot.get("slot_id"),
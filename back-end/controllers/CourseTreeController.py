@@ -1,132 +1,89 @@
-from fastapi import APIRouter, HTTPException, Depends
-from database import (
-    courses_collection,
-    departments_collection
-)
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from database import courses_collection
+from typing import List, Dict, Any, Optional
+import asyncio
+import re
 from models.CourseTree import CourseTreeNode, CourseTreeFilter
 from helpers.helpers import serialize_doc
 from helpers.auth import get_current_user
+from helpers.catalog import catalog, CatalogKind
+from helpers.course_graph import get_course_graph, group_by_department
+from helpers.etag import make_etag, check_etag
 
 router = APIRouter()
 
+# Serializes the cycle check and the write in add_prerequisite
+prerequisite_write_lock = asyncio.Lock()
+
 # Get course tree - supports filtering by department, level, and searching
 # Updated get_course_tree function with improved level filtering
 @router.get("/course-tree/")
-async def get_course_tree(department_id: str = None, level: int = None, search: str = None):
+async def get_course_tree(
+    response: Response,
+    department_id: str = None,
+    level: int = None,
+    search: str = None,
+    if_none_match: Optional[str] = Header(None)
+):
     try:
-        # Build base query for department filtering
-        query = {}
-        if department_id:
-            department = await departments_collection.find_one({"department_id": department_id})
-            if not department:
-                raise HTTPException(status_code=400, detail="Invalid department ID")
-            query["department_id"] = department_id
-        
-        # For search filtering
+        snapshot = await catalog.get()
+        
+        # Same catalog version and filters -> same tree
+        etag = make_etag("course_tree", snapshot.version, department_id, level, search)
+        not_modified = check_etag(response, if_none_match, etag)
+        if not_modified:
+            return not_modified
+        
+        # Validate department filter
+        if department_id and not snapshot.department(department_id):
+            raise HTTPException(status_code=400, detail="Invalid department ID")
+        
+        # Search is a case-insensitive regex on name or course ID
+        search_pattern = None
         if search:
-            search_query = [
-                {"name": {"$regex": search, "$options": "i"}},
-                {"course_id": {"$regex": search, "$options": "i"}}
-            ]
-            
-            if query:
-                query = {
-                    "$and": [
-                        query,
-                        {"$or": search_query}
-                    ]
-                }
-            else:
-                query["$or"] = search_query
+            try:
+                search_pattern = re.compile(search, re.IGNORECASE)
+            except re.error:
+                raise HTTPException(status_code=400, detail="Invalid search pattern")
         
-        # Get all courses regardless of level for building the complete tree
-        all_courses = await courses_collection.find({}).to_list(1000)
+        level_pattern = re.compile(f"^{level}\\d{{2}}") if level else None
         
-        # Create a dictionary to store all courses by their ID for easy lookup
-        all_course_dict = {course["course_id"]: serialize_doc(course) for course in all_courses}
+        def matches_filters(course):
+            if department_id and course.get("department_id") != department_id:
+                return False
+            if search_pattern and not (
+                search_pattern.search(course.get("name", "")) or search_pattern.search(course["course_id"])
+            ):
+                return False
+            if level_pattern and not (course.get("level") == level or level_pattern.match(course["course_id"])):
+                return False
+            return True
         
-        # Now filter courses for the initial view based on query (department and search)
-        if level:
-            # Add level filtering to the query
-            level_query = {
-                "$or": [
-                    {"level": level},
-                    {"course_id": {"$regex": f"^{level}\\d{{2}}"}}
-                ]
-            }
-            
-            if query:
-                query = {
-                    "$and": [
-                        query,
-                        level_query
-                    ]
-                }
-            else:
-                query = level_query
-                
-        # Get filtered courses based on query (department, search, and level)
-        filtered_courses = await courses_collection.find(query).to_list(1000)
-        filtered_course_ids = {course["course_id"] for course in filtered_courses}
+        # Use all courses regardless of level for building the complete tree
+        all_course_dict = {course["course_id"]: serialize_doc(dict(course)) for course in snapshot.courses()}
+        
+        # Now filter courses for the initial view (department, search, and level)
+        filtered_course_ids = {
+            course["course_id"] for course in snapshot.courses() if matches_filters(course)
+        }
         
         # Add department names to each course
         for course_id, course in all_course_dict.items():
             if course.get("department_id"):
-                department = await departments_collection.find_one(
-                    {"department_id": course["department_id"]},
-                    {"name": 1, "_id": 0}
-                )
-                course["department_name"] = department["name"] if department else "Unknown"
+                course["department_name"] = snapshot.department_name(course["department_id"])
         
-        # Function to get all prerequisite courses recursively (courses that lead to this course)
-        def get_prerequisite_chain(course_id, visited=None):
-            if visited is None:
-                visited = set()
-            
-            if course_id in visited:
-                return set()  # Avoid circular references
-            
-            visited.add(course_id)
-            result = {course_id}
-            
-            course = all_course_dict.get(course_id)
-            if course and course.get("prerequisites"):
-                for prereq_id in course["prerequisites"]:
-                    result.update(get_prerequisite_chain(prereq_id, visited.copy()))
-            
-            return result
-        
-        # Function to get all subsequent courses recursively (courses that depend on this course)
-        def get_subsequent_chain(course_id, visited=None):
-            if visited is None:
-                visited = set()
-            
-            if course_id in visited:
-                return set()  # Avoid circular references
-            
-            visited.add(course_id)
-            result = {course_id}
-            
-            # Find all courses that have this course as a prerequisite
-            for other_id, other_course in all_course_dict.items():
-                if other_course.get("prerequisites") and course_id in other_course["prerequisites"]:
-                    result.update(get_subsequent_chain(other_id, visited.copy()))
-            
-            return result
+        graph = await get_course_graph()
         
         # If level filtering is applied, expand the filtered set to include prerequisite and subsequent courses
         expanded_course_ids = set(filtered_course_ids)
         if level and filtered_course_ids:
             # For each filtered course, include its prerequisite chain and subsequent chain
             for course_id in list(filtered_course_ids):
-                prereq_chain = get_prerequisite_chain(course_id)
-                subsequent_chain = get_subsequent_chain(course_id)
-                expanded_course_ids.update(prereq_chain)
-                expanded_course_ids.update(subsequent_chain)
+                expanded_course_ids.update(graph.ancestors(course_id))
+                expanded_course_ids.update(graph.descendants(course_id))
         
         # Build tree using either filtered or all courses based on whether filtering is applied
-        course_dict = {course_id: all_course_dict[course_id] for course_id in expanded_course_ids if course_id in all_course_dict}
+        course_dict = {course_id: course for course_id, course in all_course_dict.items() if course_id in expanded_course_ids}
         if not course_dict:  # If no courses match the filters
             if level:  # If level filter was applied and returned no results
                 course_dict = all_course_dict  # Fall back to all courses
@@ -145,140 +102,104 @@ async def get_course_tree(department_id: str = None, level: int = None, search:
                 
                 course["matches_level_filter"] = matches_level
         
-        # Build the tree structure
-        root_nodes = []
-        processed_courses = set()
+        # First pass: identify root nodes (no prerequisites inside the filtered set)
+        root_ids = [
+            course_id for course_id, course in course_dict.items()
+            if not any(prereq_id in course_dict for prereq_id in (course.get("prerequisites") or []))
+        ]
+        root_set = set(root_ids)
         
-        # First pass: identify root nodes (courses without prerequisites)
+        nodes = {}
         for course_id, course in course_dict.items():
-            # If course has no prerequisites or prerequisites are empty, it's a root node
-            prerequisites = course.get("prerequisites") or []
-            has_valid_prereqs = False
-            
-            # Check if all prerequisites are in our filtered set
-            for prereq_id in prerequisites:
-                if prereq_id in course_dict:
-                    has_valid_prereqs = True
-                    break
-            
-            if not has_valid_prereqs:
-                root_data = {
-                    "course_id": course["course_id"],
-                    "name": course["name"],
-                    "department_id": course["department_id"],
-                    "department_name": course.get("department_name", "Unknown"),
-                    "credit_hours": course["credit_hours"],
-                    "children": [],
-                    "semesters": course.get("semesters", []),
-                    "level": course.get("level"),
-                    "matches_level_filter": course.get("matches_level_filter", False)
-                }
-                root_nodes.append(root_data)
-                processed_courses.add(course_id)
-        
-        # Function to recursively build the tree
-        def build_children(parent_id):
-            children = []
-            for course_id, course in course_dict.items():
-                if course_id not in processed_courses and course.get("prerequisites") and parent_id in course["prerequisites"]:
-                    child_data = {
-                        "course_id": course["course_id"],
-                        "name": course["name"],
-                        "department_id": course["department_id"],
-                        "department_name": course.get("department_name", "Unknown"),
-                        "credit_hours": course["credit_hours"],
-                        "prerequisites": course.get("prerequisites", []),
-                        "children": [],
-                        "semesters": course.get("semesters", []),
-                        "level": course.get("level"),
-                        "matches_level_filter": course.get("matches_level_filter", False)
-                    }
-                    processed_courses.add(course_id)
-                    child_data["children"] = build_children(course_id)
-                    children.append(child_data)
-            return children
-        
-        # Build the tree for each root node
-        for root in root_nodes:
-            root["children"] = build_children(root["course_id"])
-        
-        # Group by department
-        departments = {}
-        for course in root_nodes:
-            dept_id = course["department_id"]
-            dept_name = course["department_name"]
-            
-            if dept_id not in departments:
-                departments[dept_id] = {
-                    "department_id": dept_id,
-                    "department_name": dept_name,
-                    "courses": []
-                }
-            
-            departments[dept_id]["courses"].append(course)
+            node = {
+                "course_id": course["course_id"],
+                "name": course["name"],
+                "department_id": course["department_id"],
+                "department_name": course.get("department_name", "Unknown"),
+                "credit_hours": course["credit_hours"],
+                "children": [],
+                "semesters": course.get("semesters", []),
+                "level": course.get("level"),
+                "matches_level_filter": course.get("matches_level_filter", False)
+            }
+            if course_id not in root_set:
+                node["prerequisites"] = course.get("prerequisites", [])
+            nodes[course_id] = node
         
-        # Convert to list for response
-        result = list(departments.values())
+        # Attach every course under its first prerequisite, in O(V+E)
+        root_nodes = graph.render_forest(nodes, root_ids)
         
-        return result
+        # Group by department
+        return group_by_department(root_nodes)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+# Validate the whole catalog for circular dependencies
+# (declared before /course-tree/{course_id} so "validate" is not taken as a course ID)
+@router.get("/course-tree/validate")
+async def validate_course_tree():
+    try:
+        graph = await get_course_graph()
+        
+        # Tarjan's SCC: every cycle lives inside one strongly connected component
+        cycles = [
+            {"courses": component, "cycle": graph.cycle_path(component)}
+            for component in graph.strongly_connected_components()
+        ]
+        
+        return {
+            "valid": not cycles,
+            "course_count": len(graph.order),
+            "prerequisite_count": sum(len(prereqs) for prereqs in graph.prerequisites.values()),
+            "cycles": cycles,
+            "message": f"{len(cycles)} circular dependencies detected" if cycles else "Course tree is valid"
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
 # Get course prerequisites chain for a specific course
 @router.get("/course-tree/{course_id}")
 async def get_course_prerequisites(course_id: str):
     try:
-        course = await courses_collection.find_one({"course_id": course_id})
+        snapshot = await catalog.get()
+        course = snapshot.course(course_id)
         if not course:
             raise HTTPException(status_code=404, detail=f"Course not found, ID={course_id}")
         
-        course_data = serialize_doc(course)
+        course_data = serialize_doc(dict(course))
         
         # Get department name
         if course.get("department_id"):
-            department = await departments_collection.find_one(
-                {"department_id": course["department_id"]},
-                {"name": 1, "_id": 0}
-            )
-            course_data["department_name"] = department["name"] if department else "Unknown"
+            course_data["department_name"] = snapshot.department_name(course["department_id"])
         
         # Get prerequisite courses
         prerequisites = []
-        if course.get("prerequisites"):
-            for prereq_id in course["prerequisites"]:
-                prereq_course = await courses_collection.find_one({"course_id": prereq_id})
-                if prereq_course:
-                    prereq_data = serialize_doc(prereq_course)
-                    
-                    # Get department name for prerequisite
-                    if prereq_course.get("department_id"):
-                        prereq_dept = await departments_collection.find_one(
-                            {"department_id": prereq_course["department_id"]},
-                            {"name": 1, "_id": 0}
-                        )
-                        prereq_data["department_name"] = prereq_dept["name"] if prereq_dept else "Unknown"
-                    
-                    prerequisites.append(prereq_data)
+        for prereq_course in snapshot.courses(course.get("prerequisites") or []):
+            prereq_data = serialize_doc(dict(prereq_course))
+            
+            # Get department name for prerequisite
+            if prereq_course.get("department_id"):
+                prereq_data["department_name"] = snapshot.department_name(prereq_course["department_id"])
+            
+            prerequisites.append(prereq_data)
         
         course_data["prerequisites_detail"] = prerequisites
         
         # Get courses that have this course as a prerequisite (subsequent courses)
-        subsequent_courses = await courses_collection.find(
-            {"prerequisites": course_id}
-        ).to_list(100)
+        graph = await get_course_graph()
+        subsequent_courses = snapshot.courses(graph.dependents.get(course_id, [])[:100])
         
         subsequent_courses_data = []
         for sub_course in subsequent_courses:
-            sub_data = serialize_doc(sub_course)
+            sub_data = serialize_doc(dict(sub_course))
             
             # Get department name for subsequent course
             if sub_course.get("department_id"):
-                sub_dept = await departments_collection.find_one(
-                    {"department_id": sub_course["department_id"]},
-                    {"name": 1, "_id": 0}
-                )
-                sub_data["department_name"] = sub_dept["name"] if sub_dept else "Unknown"
+                sub_data["department_name"] = snapshot.department_name(sub_course["department_id"])
             
             subsequent_courses_data.append(sub_data)
         
@@ -295,32 +216,42 @@ async def get_course_prerequisites(course_id: str):
 async def add_prerequisite(course_id: str, prereq_id: str):
     try:
         # Check if both courses exist
-        course = await courses_collection.find_one({"course_id": course_id})
+        snapshot = await catalog.get()
+        course = snapshot.course(course_id)
         if not course:
             raise HTTPException(status_code=404, detail=f"Course not found, ID={course_id}")
         
-        prereq_course = await courses_collection.find_one({"course_id": prereq_id})
+        prereq_course = snapshot.course(prereq_id)
         if not prereq_course:
             raise HTTPException(status_code=404, detail=f"Prerequisite course not found, ID={prereq_id}")
         
-        # Prevent circular dependencies
-        if course_id in (prereq_course.get("prerequisites") or []):
-            raise HTTPException(status_code=400, detail="Circular dependency detected")
-        
-        # Check if prerequisite already exists
-        prerequisites = course.get("prerequisites") or []
-        if prereq_id in prerequisites:
-            return {"message": "Prerequisite already exists"}
-        
-        # Add prerequisite
-        prerequisites.append(prereq_id)
-        result = await courses_collection.update_one(
-            {"course_id": course_id},
-            {"$set": {"prerequisites": prerequisites}}
-        )
-        
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Failed to update course")
+        async with prerequisite_write_lock:
+            # Check if prerequisite already exists
+            course = snapshot.course(course_id) or course
+            prerequisites = list(course.get("prerequisites") or [])
+            if prereq_id in prerequisites:
+                return {"message": "Prerequisite already exists"}
+            
+            # Prevent circular dependencies of any length
+            graph = await get_course_graph()
+            cycle = graph.cycle_if_added(course_id, prereq_id)
+            if cycle:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Circular dependency detected: {' -> '.join(cycle)}"
+                )
+            
+            # Add prerequisite
+            prerequisites.append(prereq_id)
+            result = await courses_collection.update_one(
+                {"course_id": course_id},
+                {"$set": {"prerequisites": prerequisites}}
+            )
+            
+            if result.matched_count == 0:
+                raise HTTPException(status_code=404, detail="Failed to update course")
+            
+            await catalog.refresh(CatalogKind.COURSES, course_id)
         
         return {"message": f"Prerequisite {prereq_id} added to course {course_id}"}
     except HTTPException as e:
@@ -342,7 +273,7 @@ async def update_course_level(course_id: str, level_data: dict):
             raise HTTPException(status_code=400, detail="Level must be a valid course level (100-900)")
         
         # Check if course exists
-        course = await courses_collection.find_one({"course_id": course_id})
+        course = (await catalog.get()).course(course_id)
         if not course:
             raise HTTPException(status_code=404, detail=f"Course not found, ID={course_id}")
         
@@ -355,6 +286,8 @@ async def update_course_level(course_id: str, level_data: dict):
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Failed to update course")
         
+        await catalog.refresh(CatalogKind.COURSES, course_id)
+        
         return {"message": f"Level updated for course {course_id}", "level": level}
     except HTTPException as e:
         raise e
@@ -366,12 +299,12 @@ async def update_course_level(course_id: str, level_data: dict):
 async def remove_prerequisite(course_id: str, prereq_id: str):
     try:
         # Check if course exists
-        course = await courses_collection.find_one({"course_id": course_id})
+        course = (await catalog.get()).course(course_id)
         if not course:
             raise HTTPException(status_code=404, detail=f"Course not found, ID={course_id}")
         
         # Check if prerequisite exists in the course
-        prerequisites = course.get("prerequisites") or []
+        prerequisites = list(course.get("prerequisites") or [])
         if prereq_id not in prerequisites:
             raise HTTPException(status_code=404, detail=f"Prerequisite {prereq_id} not found in course {course_id}")
         
@@ -385,6 +318,8 @@ async def remove_prerequisite(course_id: str, prereq_id: str):
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Failed to update course")
         
+        await catalog.refresh(CatalogKind.COURSES, course_id)
+        
         return {"message": f"Prerequisite {prereq_id} removed from course {course_id}"}
     except HTTPException as e:
         raise e
@@ -395,7 +330,7 @@ async def remove_prerequisite(course_id: str, prereq_id: str):
 @router.get("/course-tree/{course_id}/semesters")
 async def get_course_semesters(course_id: str):
     try:
-        course = await courses_collection.find_one({"course_id": course_id})
+        course = (await catalog.get()).course(course_id)
         if not course:
             raise HTTPException(status_code=404, detail=f"Course not found, ID={course_id}")
         
@@ -417,7 +352,7 @@ async def update_course_semesters(course_id: str, semesters: List[str]):
                 raise HTTPException(status_code=400, detail=f"Invalid semester: {semester}")
         
         # Check if course exists
-        course = await courses_collection.find_one({"course_id": course_id})
+        course = (await catalog.get()).course(course_id)
         if not course:
             raise HTTPException(status_code=404, detail=f"Course not found, ID={course_id}")
         
@@ -430,6 +365,8 @@ async def update_course_semesters(course_id: str, semesters: List[str]):
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Failed to update course")
         
+        await catalog.refresh(CatalogKind.COURSES, course_id)
+        
         return {"message": f"Semesters updated for course {course_id}", "semesters": semesters}
     except HTTPException as e:
         raise e
@@ -440,37 +377,26 @@ async def update_course_semesters(course_id: str, semesters: List[str]):
 @router.get("/course-tree/validate/{course_id}")
 async def validate_prerequisites_chain(course_id: str):
     try:
-        course = await courses_collection.find_one({"course_id": course_id})
+        snapshot = await catalog.get()
+        course = snapshot.course(course_id)
         if not course:
             raise HTTPException(status_code=404, detail=f"Course not found, ID={course_id}")
         
-        # Function to check for circular dependencies
-        async def check_circular_dependency(current_id, visited=None):
-            if visited is None:
-                visited = set()
-            
-            if current_id in visited:
-                return True  # Circular dependency detected
-            
-            visited.add(current_id)
-            current_course = await courses_collection.find_one({"course_id": current_id})
-            
-            if not current_course:
-                return False
-            
-            prerequisites = current_course.get("prerequisites") or []
-            
-            for prereq_id in prerequisites:
-                if await check_circular_dependency(prereq_id, visited.copy()):
-                    return True
-            
-            return False
-        
-        # Check if there's a circular dependency
-        has_circular = await check_circular_dependency(course_id)
-        
-        if has_circular:
-            return {"valid": False, "message": "Circular dependency detected in prerequisites chain"}
+        # A chain is circular if it reaches any course that sits on a cycle
+        graph = await get_course_graph()
+        chain = graph.ancestors(course_id) | {course_id}
+        cycles = [
+            graph.cycle_path(component)
+            for component in graph.strongly_connected_components()
+            if chain.intersection(component)
+        ]
+        
+        if cycles:
+            return {
+                "valid": False,
+                "message": "Circular dependency detected in prerequisites chain",
+                "cycles": cycles
+            }
         else:
             return {"valid": True, "message": "Prerequisites chain is valid"}
     except HTTPException as e:
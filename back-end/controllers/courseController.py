@@ -1,14 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from typing import Optional
 from database import (
     courses_collection, 
     enrollments_collection, 
-    students_collection, 
+    users_collection, 
     schedules_collection,
-    departments_collection
+    time_slots_collection
 )
 from models.Courses import Course, CourseUpdate
 from helpers.helpers import get_next_course_id, serialize_doc
 from helpers.auth import get_current_user
+from helpers.prerequisite_index import prerequisite_index
+from helpers.catalog import catalog, CatalogKind
+from helpers.schedule_index import schedule_index
+from helpers.etag import make_etag, check_etag
 
 router = APIRouter()
 
@@ -16,8 +21,8 @@ router = APIRouter()
 @router.post("/courses/")
 async def create_course(course: Course):
     # Validate department exists
-    department = await departments_collection.find_one({"department_id": course.department_id})
-    if not department:
+    snapshot = await catalog.get()
+    if not snapshot.department(course.department_id):
         raise HTTPException(status_code=400, detail="Invalid department ID")
     
     course_id = await get_next_course_id()
@@ -26,23 +31,25 @@ async def create_course(course: Course):
     course_data["course_id"] = course_id
     
     await courses_collection.insert_one(course_data)
+    await catalog.refresh(CatalogKind.COURSES, course_id)
     return {"message": "Course added successfully", "id": course_id}
 
 # Get all courses with department names
 @router.get("/courses/")
-async def get_courses():
-    courses = await courses_collection.find().to_list(100)
+async def get_courses(response: Response, if_none_match: Optional[str] = Header(None)):
+    snapshot = await catalog.get()
+    
+    # Unchanged catalog -> 304 without building the list
+    not_modified = check_etag(response, if_none_match, make_etag("courses", snapshot.version))
+    if not_modified:
+        return not_modified
     enriched_courses = []
     
-    for course in courses:
-        course_data = serialize_doc(course)
+    for course in snapshot.courses()[:100]:
+        course_data = serialize_doc(dict(course))
         # Get department name
         if course.get("department_id"):
-            department = await departments_collection.find_one(
-                {"department_id": course["department_id"]},
-                {"name": 1, "_id": 0}
-            )
-            course_data["department_name"] = department["name"] if department else "Unknown"
+            course_data["department_name"] = snapshot.department_name(course["department_id"])
         enriched_courses.append(course_data)
     
     return enriched_courses
@@ -50,20 +57,17 @@ async def get_courses():
 #Get course by ID with department name
 @router.get("/courses/{course_id}")
 async def get_course(course_id: str):
-    course = await courses_collection.find_one({"course_id": course_id})
+    snapshot = await catalog.get()
+    course = snapshot.course(course_id)
     
     if not course:
         raise HTTPException(status_code=404, detail=f"Course not found, ID={course_id}")
     
-    course_data = serialize_doc(course)
+    course_data = serialize_doc(dict(course))
     
     # Get department name
     if course.get("department_id"):
-        department = await departments_collection.find_one(
-            {"department_id": course["department_id"]},
-            {"name": 1, "_id": 0}
-        )
-        course_data["department_name"] = department["name"] if department else "Unknown"
+        course_data["department_name"] = snapshot.department_name(course["department_id"])
     
     return course_data
 
@@ -72,8 +76,8 @@ async def get_course(course_id: str):
 async def update_course(course_id: str, course: CourseUpdate):
     # Validate department if it's being updated
     if course.department_id:
-        department = await departments_collection.find_one({"department_id": course.department_id})
-        if not department:
+        snapshot = await catalog.get()
+        if not snapshot.department(course.department_id):
             raise HTTPException(status_code=400, detail="Invalid department ID")
     
     update_data = course.model_dump(exclude_unset=True)
@@ -85,6 +89,8 @@ async def update_course(course_id: str, course: CourseUpdate):
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Course not found")
     
+    await catalog.refresh(CatalogKind.COURSES, course_id)
+    
     return {"message": "Course updated successfully"}
 
 #Delete Course
@@ -105,7 +111,7 @@ async def delete_course(course_id: str):
     
     #Restore credit hours for affected students
     for enrollment in enrollments:
-        await students_collection.update_one(
+        await users_collection.update_one(
             {"student_id": enrollment["student_id"]},
             {"$inc": {"credit_hours": course["credit_hours"]}}
         )
@@ -113,8 +119,14 @@ async def delete_course(course_id: str):
     #Remove all enrollments & schedules
     await enrollments_collection.delete_many({"course_id": course_id})
     await schedules_collection.delete_many({"course_id": course_id})
+    await time_slots_collection.update_many({"course_id": course_id}, {"$set": {"seats_taken": 0}})
     
     #Delete the course
     await courses_collection.delete_one({"course_id": course_id})
     
+    catalog.remove(CatalogKind.COURSES, course_id)
+    schedule_index.invalidate()
+    for enrollment in enrollments:
+        prerequisite_index.invalidate_student(enrollment["student_id"])
+    
     return {"message": f"Course {course_id} has been deleted"}
\ No newline at end of file
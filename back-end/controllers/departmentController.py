@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from typing import Optional
 from database import departments_collection, courses_collection
 from models.Departments import Department
 from helpers.helpers import get_next_department_id, serialize_doc
 from helpers.auth import get_current_user
+from helpers.catalog import catalog, CatalogKind
+from helpers.etag import make_etag, check_etag
 
 router = APIRouter()
 
@@ -18,16 +21,22 @@ async def create_department(department: Department):
     department_data["department_id"] = department_id
     
     await departments_collection.insert_one(department_data)
+    await catalog.refresh(CatalogKind.DEPARTMENTS, department_id)
     return {"message": "Department added successfully", "id": department_id}
 
 #Get All Departments
 @router.get("/departments/")
-async def get_departments():
+async def get_departments(response: Response, if_none_match: Optional[str] = Header(None)):
     # if user["role"] != "admin":
     #     raise HTTPException(status_code=403, detail="Unauthorized access")
     
-    departments = await departments_collection.find().to_list(100)
-    return [serialize_doc(department) for department in departments]
+    snapshot = await catalog.get()
+    
+    # Unchanged catalog -> 304 without building the list
+    not_modified = check_etag(response, if_none_match, make_etag("departments", snapshot.version))
+    if not_modified:
+        return not_modified
+    return [serialize_doc(dict(department)) for department in snapshot.departments()[:100]]
 
 #Get Department By ID
 @router.get("/departments/{department_id}")
@@ -35,12 +44,16 @@ async def get_department(department_id: str):
     # if user["role"] != "admin":
     #     raise HTTPException(status_code=403, detail="Unauthorized access")
     
-    department = await departments_collection.find_one(department_id)
+    snapshot = await catalog.get()
+    department = snapshot.department(department_id)
+    if not department:
+        # Lookup by _id, as this endpoint always did
+        department = await departments_collection.find_one(department_id)
     
     if not department:
         raise HTTPException(status_code=404, detail="Department not found")
     
-    return serialize_doc(department)
+    return serialize_doc(dict(department))
 
 #Update Department
 @router.put("/departments/{department_id}")
@@ -56,6 +69,8 @@ async def update_department(department_id: str, updated_data = dict):
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Department not found")
     
+    await catalog.refresh(CatalogKind.DEPARTMENTS, department_id)
+    
     return {"message": "Department updated successfully"}
 
 #Delete Department
@@ -73,6 +88,9 @@ async def delete_department(department_id: str):
     
     await departments_collection.delete_one({"department_id": department_id})
     
+    # Courses went with the department
+    catalog.invalidate()
+    
     return {
         "message": f"Department {department_id} and {deleted_courses.deleted_count} related courses deleted successfully"
     }
\ No newline at end of file
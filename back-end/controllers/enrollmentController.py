@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
+from fastapi.responses import JSONResponse
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
 from models.Enrollments import (
@@ -6,131 +7,102 @@ from models.Enrollments import (
     Enrollment,
     EnrollmentResponse,
     EnrollmentStatus,
-    CourseAvailabilityResponse
+    CourseAvailabilityResponse,
+    CartItem,
+    CartResponse
 )
 from database import (
     enrollments_collection,
-    students_collection,
-    courses_collection,
     users_collection,
-    departments_collection,
-    semester_settings_collection
+    carts_collection,
+    add_change_listener
 )
 from helpers.auth import get_current_user, TokenData
 from helpers.exceptions import EnrollmentError
+from helpers.registration_queue import registration_queue, public_ticket, QueueFullError
+from helpers.prerequisite_index import prerequisite_index
+from helpers.catalog import catalog
+from helpers.course_graph import get_course_graph
+from helpers.available_tree import available_tree
+from helpers.etag import make_etag, check_etag
+from helpers.encoded_response import EncodedJSON, EncodedJSONResponse
+from helpers.cache import cache
+from helpers.semester_settings import semester_settings
+from helpers.idempotency import run_idempotent
+from helpers.transactions import run_transaction
+from controllers.scheduleController import release_course_sections
 from models.SemesterSettings import SemesterType
 import time
+import asyncio
 import functools
-from pymongo import UpdateOne
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 router = APIRouter()
 
 WITHDRAWAL_DEADLINE_DAYS = 14
-SETTINGS_ID = "semester_settings"  # Same as in semesterController
-
-# Simple in-memory cache for course tree data
-COURSE_TREE_CACHE = {
-    "data": None,
-    "timestamp": None,
-    "ttl": 300  # Cache TTL in seconds (5 minutes)
-}
-
-# Simple in-memory cache for student enrollments
-ENROLLMENTS_CACHE = {}
-
-# Cache decorator for expensive operations
-def timed_cache(ttl_seconds=300):
-    def decorator(func):
-        cache = {}
-        
-        @functools.wraps(func)
-        async def wrapper(*args, **kwargs):
-            # Create a key based on function arguments
-            key = str(args) + str(kwargs)
-            
-            # Check if result is cached and not expired
-            if key in cache:
-                result, timestamp = cache[key]
-                if time.time() - timestamp < ttl_seconds:
-                    print(f"✅ Cache hit for {func.__name__}")
-                    return result
-            
-            # Call the original function
-            print(f"❌ Cache miss for {func.__name__}")
-            start_time = time.time()
-            result = await func(*args, **kwargs)
-            execution_time = time.time() - start_time
-            print(f"⏱️ {func.__name__} execution time: {execution_time:.2f}s")
-            
-            # Cache the result
-            cache[key] = (result, time.time())
-            
-            return result
-        
-        # Add a method to clear the cache
-        wrapper.clear_cache = lambda: cache.clear()
-        
-        return wrapper
-    return decorator
+
+# Encoded student enrollment lists (EncodedJSON)
+# Keys: (student_id, "enrollments")
+# Entries are evicted by write events (see the change listeners at the bottom of this module)
+ENROLLMENTS_CACHE = cache.register("enrollments", ttl=900, max_entries=20000, max_bytes=64 * 1024 * 1024)
+
+# Server-side registration carts live in carts_collection: {_id: student_id, courses, last_updated}.
+# A TTL index on last_updated drops a cart 30 minutes after it was last touched
+CART_TTL = 1800
+
+# Validation context of each student with a cart, keyed by (student_id,); checkout reloads it
+CART_CONTEXT_CACHE = cache.register("cart_contexts", ttl=CART_TTL, max_entries=20000, max_bytes=32 * 1024 * 1024)
 
 async def get_current_semester() -> SemesterType:
     """Helper function to get the current semester"""
-    settings = await semester_settings_collection.find_one({"_id": SETTINGS_ID})
-    
-    if not settings:
-        # If no settings exist, default to Fall
-        return SemesterType.FALL
-    
-    return settings.get("current_semester", SemesterType.FALL)
+    snapshot = await semester_settings.get()
+    return snapshot.current_semester
+
+async def describe_missing_prerequisites(missing_prerequisites: List[str]) -> str:
+    """Build the error message for missing prerequisites, with course names"""
+    snapshot = await catalog.get()
+    prereq_courses = snapshot.courses(missing_prerequisites)
+    prereq_names = [f"{c['course_id']} ({c['name']})" for c in prereq_courses]
+    return f"Missing prerequisites: {', '.join(prereq_names)}"
 
-@timed_cache(ttl_seconds=300)
-async def validate_prerequisites(student_id: str, course_id: str) -> tuple[bool, str]:
+async def validate_enrollment(student_id: str, course_id: str):
     """
-    Check if student has completed all prerequisites for a course
-    Returns: (prerequisites_met, error_message)
+    Validate enrollment requirements.
+    Every lookup is issued concurrently in one round; the rules are then
+    evaluated in memory in the same order as before.
     """
-    course = await courses_collection.find_one({"course_id": course_id})
-    if not course or not course.get("prerequisites"):
-        return True, ""
+    student, catalog_snapshot, existing, (_, completed_mask), snapshot = await asyncio.gather(
+        users_collection.find_one({"student_id": student_id.strip()}),
+        catalog.get(),
+        enrollments_collection.find_one(
+            {
+                "student_id": student_id,
+                "course_id": course_id,
+                "status": {"$in": [EnrollmentStatus.PENDING, EnrollmentStatus.COMPLETED]}
+            },
+            {"_id": 1}
+        ),
+        prerequisite_index.load(student_id),
+        semester_settings.get()
+    )
+    
+    course = catalog_snapshot.course(course_id)
     
-    # Get student's completed courses
-    completed_courses = await enrollments_collection.find({
-        "student_id": student_id,
-        "status": EnrollmentStatus.COMPLETED
-    }).to_list(None)
-    
-    completed_course_ids = {enrollment["course_id"] for enrollment in completed_courses}
-    missing_prerequisites = [
-        prereq for prereq in course["prerequisites"]
-        if prereq not in completed_course_ids
-    ]
-    
-    if missing_prerequisites:
-        # Get course names for better error message
-        prereq_courses = await courses_collection.find(
-            {"course_id": {"$in": missing_prerequisites}}
-        ).to_list(None)
-        prereq_names = [f"{c['course_id']} ({c['name']})" for c in prereq_courses]
-        return False, f"Missing prerequisites: {', '.join(prereq_names)}"
-    
-    return True, ""
-
-async def validate_enrollment(student_id: str, course_id: str):
-    """Validate enrollment requirements"""
     # Check if student exists
-    student = await users_collection.find_one({"student_id": student_id.strip()})
     if not student:
         raise EnrollmentError("Student not found")
     
     # Check if course exists
-    course = await courses_collection.find_one({"course_id": course_id})
     if not course:
         raise EnrollmentError("Course not found")
     
     # Check prerequisites
-    prereqs_met, error_message = await validate_prerequisites(student_id, course_id)
-    if not prereqs_met:
-        raise EnrollmentError(error_message)
+    missing_prerequisites = prerequisite_index.ids_of(
+        prerequisite_index.missing_mask(course_id, completed_mask)
+    )
+    if missing_prerequisites:
+        raise EnrollmentError(await describe_missing_prerequisites(missing_prerequisites))
     
     # Check credit hours
     if student["credit_hours"] < course["credit_hours"]:
@@ -139,110 +111,24 @@ async def validate_enrollment(student_id: str, course_id: str):
         )
     
     # Check existing enrollment
-    existing = await enrollments_collection.find_one({
-        "student_id": student_id,
-        "course_id": course_id,
-        "status": {"$in": [EnrollmentStatus.PENDING, EnrollmentStatus.COMPLETED]}
-    })
     if existing:
         raise EnrollmentError("Already enrolled in this course")
     
     # Check if course is offered in current semester
-    current_semester = await get_current_semester()
+    current_semester = snapshot.current_semester
     if not course.get("semesters") or current_semester not in course.get("semesters", []):
         raise EnrollmentError(f"Course not offered in the current {current_semester} semester")
     
     return student, course
 
-@timed_cache(ttl_seconds=600)  # Cache for 10 minutes
 async def get_course_tree_flattened():
     """
     Get a flattened list of all courses in the course tree
     Returns: Set of course_ids present in the course tree
     """
-    # Check if data is in cache
-    if COURSE_TREE_CACHE["data"] and COURSE_TREE_CACHE["timestamp"]:
-        if time.time() - COURSE_TREE_CACHE["timestamp"] < COURSE_TREE_CACHE["ttl"]:
-            print("✅ Using cached course tree data")
-            return COURSE_TREE_CACHE["data"]
-    
-    print("❌ Course tree cache miss, fetching from database")
-    start_time = time.time()
-    
-    try:
-        # Build query to get all courses in the tree
-        query = {}
-        
-        # Get all courses based on query
-        courses = await courses_collection.find(query).to_list(1000)
-        
-        # Create a dictionary to store all courses by their ID for easy lookup
-        course_dict = {course["course_id"]: course for course in courses}
-        
-        # Build the tree structure
-        root_nodes = []
-        processed_courses = set()
-        
-        # First pass: identify root nodes (courses without prerequisites)
-        for course_id, course in course_dict.items():
-            # If course has no prerequisites or prerequisites are empty, it's a root node
-            if not course.get("prerequisites") or len(course["prerequisites"]) == 0:
-                root_data = {
-                    "course_id": course["course_id"],
-                    "name": course["name"],
-                    "children": [],
-                }
-                root_nodes.append(root_data)
-                processed_courses.add(course_id)
-        
-        # Function to recursively build the tree
-        def build_children(parent_id):
-            children = []
-            for course_id, course in course_dict.items():
-                if course_id not in processed_courses and course.get("prerequisites") and parent_id in course["prerequisites"]:
-                    child_data = {
-                        "course_id": course["course_id"],
-                        "name": course["name"],
-                        "children": [],
-                    }
-                    processed_courses.add(course_id)
-                    child_data["children"] = build_children(course_id)
-                    children.append(child_data)
-            return children
-        
-        # Build the tree for each root node
-        for root in root_nodes:
-            root["children"] = build_children(root["course_id"])
-        
-        # Extract all course IDs from the tree
-        all_tree_courses = set()
-        
-        def extract_course_ids(nodes):
-            course_ids = set()
-            for node in nodes:
-                course_ids.add(node["course_id"])
-                if node.get("children"):
-                    course_ids.update(extract_course_ids(node["children"]))
-            return course_ids
-        
-        all_tree_courses = extract_course_ids(root_nodes)
-        
-        # Add any courses not yet processed (might be isolated nodes)
-        for course_id in course_dict:
-            all_tree_courses.add(course_id)
-        
-        # Update cache
-        COURSE_TREE_CACHE["data"] = all_tree_courses
-        COURSE_TREE_CACHE["timestamp"] = time.time()
-        
-        end_time = time.time()
-        print(f"⏱️ Course tree generation time: {end_time - start_time:.2f}s")
-        
-        return all_tree_courses
-        
-    except Exception as e:
-        print(f"Error getting course tree: {str(e)}")
-        return set()  # Return empty set on error
+    # Every catalog course is part of the tree (isolated courses included)
+    graph = await get_course_graph()
+    return graph.course_ids
 
 @router.get("/courses/available", response_model=List[CourseAvailabilityResponse])
 async def get_available_courses(
@@ -269,33 +155,22 @@ async def get_available_courses(
     course_tree_ids = await get_course_tree_flattened()
     
     # Get all courses that are in the course tree and offered in the current semester
-    courses = await courses_collection.find(
-        {
-            "course_id": {"$in": list(course_tree_ids)},
-            "semesters": current_semester
-        }
-    ).to_list(None)
-    
-    # Get student's completed and current courses
-    student_enrollments = await enrollments_collection.find({
-        "student_id": student_id,
-        "status": {"$in": [EnrollmentStatus.PENDING, EnrollmentStatus.COMPLETED]}
-    }).to_list(None)
+    snapshot = await catalog.get()
+    courses = [
+        course for course in snapshot.courses()
+        if course["course_id"] in course_tree_ids and current_semester in (course.get("semesters") or [])
+    ]
     
-    enrolled_courses = {e["course_id"] for e in student_enrollments}
-    completed_courses = {
-        e["course_id"] for e in student_enrollments 
-        if e["status"] == EnrollmentStatus.COMPLETED
-    }
+    # Get student's completed and current courses as bitsets
+    await prerequisite_index.ensure_catalog()
+    enrolled_mask, completed_mask = await prerequisite_index.get_student_masks(student_id)
+    eligible_courses = prerequisite_index.eligible_courses(completed_mask)
     
     # Check each course
     available_courses = []
     for course in courses:
         # Get department name
-        department = await departments_collection.find_one(
-            {"department_id": course.get("department_id")}
-        )
-        department_name = department["name"] if department else "Unknown"
+        department_name = snapshot.department_name(course.get("department_id"))
         
         # Default response
         course_response = CourseAvailabilityResponse(
@@ -310,23 +185,21 @@ async def get_available_courses(
         )
         
         # Check if already enrolled
-        if course["course_id"] in enrolled_courses:
+        if prerequisite_index.has(enrolled_mask, course["course_id"]):
             course_response.can_enroll = False
             course_response.reason = "Already enrolled"
             available_courses.append(course_response)
             continue
         
         # Check prerequisites
-        if course.get("prerequisites"):
-            missing_prereqs = [
-                prereq for prereq in course["prerequisites"]
-                if prereq not in completed_courses
-            ]
-            if missing_prereqs:
-                course_response.can_enroll = False
-                course_response.reason = f"Missing prerequisites: {', '.join(missing_prereqs)}"
-                available_courses.append(course_response)
-                continue
+        if course["course_id"] not in eligible_courses:
+            missing_prereqs = prerequisite_index.ids_of(
+                prerequisite_index.missing_mask(course["course_id"], completed_mask)
+            )
+            course_response.can_enroll = False
+            course_response.reason = f"Missing prerequisites: {', '.join(missing_prereqs)}"
+            available_courses.append(course_response)
+            continue
         
         available_courses.append(course_response)
     
@@ -334,76 +207,101 @@ async def get_available_courses(
 
 async def check_registration_allowed():
     """Check if registration is currently allowed"""
-    settings = await semester_settings_collection.find_one({"_id": SETTINGS_ID})
-    
-    if not settings or "registration_periods" not in settings:
-        return False, "Registration period not configured"
-    
-    reg_periods = settings["registration_periods"]
-    current_time = datetime.now(timezone.utc)
-    
-    # Check if registration is enabled
-    registration_enabled = reg_periods.get("registration_enabled", False)
-    if not registration_enabled:
-        return False, "Course registration is currently disabled"
-    
-    # Check if within valid time period
-    if reg_periods.get("registration_start_date") and reg_periods.get("registration_end_date"):
-        start_date = reg_periods["registration_start_date"]
-        end_date = reg_periods["registration_end_date"]
-        
-        # If dates are strings, convert them to datetime objects
-        if isinstance(start_date, str):
-            start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        if isinstance(end_date, str):
-            end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            
-        if current_time < start_date:
-            return False, f"Course registration period starts on {start_date.isoformat()}"
-        if current_time > end_date:
-            return False, f"Course registration period ended on {end_date.isoformat()}"
-    
-    return True, "Registration allowed"
+    snapshot = await semester_settings.get()
+    return snapshot.registration_status()
 
 async def check_withdrawal_allowed():
     """Check if withdrawal is currently allowed"""
-    settings = await semester_settings_collection.find_one({"_id": SETTINGS_ID})
-    
-    if not settings or "registration_periods" not in settings:
-        return False, "Withdrawal period not configured"
-    
-    reg_periods = settings["registration_periods"]
-    current_time = datetime.now(timezone.utc)
-    
-    # Check if withdrawal is enabled
-    withdrawal_enabled = reg_periods.get("withdrawal_enabled", False)
-    if not withdrawal_enabled:
-        return False, "Course withdrawal is currently disabled"
+    snapshot = await semester_settings.get()
+    return snapshot.withdrawal_status()
+
+async def enroll_student(student_id: str, course_id: str) -> EnrollmentResponse:
+    """
+    Apply one enrollment: validate it, insert the record and charge credit hours.
+    Shared by the direct and queued registration paths.
+    Raises EnrollmentError or HTTPException on validation failures.
+    """
+    # Verify course is in the course tree
+    course_tree_ids = await get_course_tree_flattened()
+    if course_id not in course_tree_ids:
+        raise HTTPException(
+            status_code=400,
+            detail="Course is not available for enrollment"
+        )
     
-    # Check if within valid time period
-    if reg_periods.get("withdrawal_start_date") and reg_periods.get("withdrawal_end_date"):
-        start_date = reg_periods["withdrawal_start_date"]
-        end_date = reg_periods["withdrawal_end_date"]
+    # Validate enrollment requirements
+    student, course = await validate_enrollment(student_id, course_id)
+    
+    # Create enrollment record
+    now = datetime.now(timezone.utc)
+    enrollment_data = Enrollment(
+        student_id=student_id,
+        course_id=course_id,
+        registered_at=now,
+        status=EnrollmentStatus.PENDING,
+        created_at=now,
+        last_updated=now
+    ).model_dump()
+    
+    needed = course["credit_hours"]
+    
+    async def write(session):
+        # Charge credit hours only if the balance still covers the course;
+        # this, not the earlier read in validate_enrollment, is what stops double-spends
+        charged = await users_collection.update_one(
+            {"student_id": student["student_id"], "credit_hours": {"$gte": needed}},
+            {"$inc": {"credit_hours": -needed}},
+            session=session
+        )
+        if charged.modified_count == 0:
+            raise EnrollmentError(f"Insufficient credit hours. Required: {needed}")
         
-        # If dates are strings, convert them to datetime objects
-        if isinstance(start_date, str):
-            start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        if isinstance(end_date, str):
-            end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            
-        if current_time < start_date:
-            return False, f"Course withdrawal period starts on {start_date.isoformat()}"
-        if current_time > end_date:
-            return False, f"Course withdrawal period ended on {end_date.isoformat()}"
-    
-    return True, "Withdrawal allowed"
+        try:
+            await enrollments_collection.insert_one(enrollment_data, session=session)
+        except DuplicateKeyError:
+            # Unique index on active (course_id, student_id): a parallel request won
+            if session is None:
+                await refund_credit_hours(student["student_id"], needed)
+            raise EnrollmentError("Already enrolled in this course")
+    
+    # Charge and insert atomically, retried on transient transaction errors
+    await run_transaction(write)
+    prerequisite_index.apply_enrollment(enrollment_data)
+    invalidate_student_caches(student_id)
+    
+    # Prepare response
+    return EnrollmentResponse(
+        student_id=student_id,
+        course_id=course_id,
+        course_name=course["name"],
+        credit_hours=course["credit_hours"],
+        status=EnrollmentStatus.PENDING,
+        registered_at=now
+    )
 
 @router.post("/enrollments/", response_model=EnrollmentResponse)
 async def register_course(
     enrollment: EnrollmentCreate,
-    user: TokenData = Depends(get_current_user)
+    user: TokenData = Depends(get_current_user),
+    queued: bool = False,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
-    """Register a student for a course"""
+    """
+    Register a student for a course.
+    With queued=true the request is accepted with 202 and a ticket; the enrollment
+    is applied by the registration queue and its result is pushed over
+    /ws/realtime (collection "registrations") or polled from /enrollments/tickets/{ticket_id}.
+    Retries carrying the same Idempotency-Key get the stored response back.
+    """
+    return await run_idempotent(
+        idempotency_key,
+        f"{user.user_id}:POST:/enrollments/",
+        {"enrollment": enrollment, "queued": queued},
+        functools.partial(apply_registration, enrollment, user, queued)
+    )
+
+async def apply_registration(enrollment: EnrollmentCreate, user: TokenData, queued: bool):
+    """Authorize and run (or queue) one registration request"""
     try:
         # Verify student authorization
         if user.role not in ["student", "instructor"]:
@@ -426,61 +324,307 @@ async def register_course(
                 detail=message
             )
         
-        # Verify course is in the course tree
-        course_tree_ids = await get_course_tree_flattened()
-        if enrollment.course_id not in course_tree_ids:
-            raise HTTPException(
-                status_code=400,
-                detail="Course is not available for enrollment"
-            )
-        
         enrollment_student_id = str(enrollment.student_id)
-        # Validate enrollment requirements
-        student, course = await validate_enrollment(
-            enrollment_student_id,
-            enrollment.course_id
-        )
         
-        # Create enrollment record
-        now = datetime.now(timezone.utc)
-        enrollment_data = Enrollment(
-            student_id=enrollment.student_id,
-            course_id=enrollment.course_id,
-            registered_at=now,
-            status=EnrollmentStatus.PENDING,
-            created_at=now,
-            last_updated=now
-        ).model_dump()
+        if queued:
+            try:
+                ticket = await registration_queue.submit(
+                    enrollment_student_id,
+                    enrollment.course_id,
+                    functools.partial(enroll_student, enrollment_student_id, enrollment.course_id)
+                )
+            except QueueFullError as e:
+                raise HTTPException(status_code=503, detail=str(e))
+            return JSONResponse(status_code=202, content=public_ticket(ticket))
         
-        # Insert enrollment
-        await enrollments_collection.insert_one(enrollment_data)
+        return await enroll_student(enrollment_student_id, enrollment.course_id)
         
-        # Update student's credit hours
-        await students_collection.update_one(
-            {"student_id": student["student_id"]},
-            {"$inc": {"credit_hours": -course["credit_hours"]}}
+    except EnrollmentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/enrollments/tickets/{ticket_id}")
+async def get_registration_ticket(
+    ticket_id: str,
+    user: TokenData = Depends(get_current_user)
+):
+    """Poll the result of a queued registration"""
+    ticket = await registration_queue.get_ticket(ticket_id)
+    if not ticket or (user.role != "admin" and str(user.user_id) != ticket["student_id"]):
+        raise HTTPException(
+            status_code=404,
+            detail="Registration ticket not found"
         )
-        
-        # Get department name for response
-        department = await departments_collection.find_one(
-            {"department_id": course.get("department_id")}
+    
+    return public_ticket(ticket)
+
+async def load_student_context(student_id: str) -> Dict[str, Any]:
+    """
+    Load everything needed to validate a student's enrollments in one round:
+    the student record, active enrollments and the current semester.
+    """
+    student, student_enrollments, current_semester = await asyncio.gather(
+        users_collection.find_one({"student_id": student_id.strip()}),
+        enrollments_collection.find(
+            {
+                "student_id": student_id,
+                "status": {"$in": [EnrollmentStatus.PENDING, EnrollmentStatus.COMPLETED]}
+            },
+            {"course_id": 1, "status": 1, "_id": 0}
+        ).to_list(None),
+        get_current_semester()
+    )
+    
+    if not student:
+        raise EnrollmentError("Student not found")
+    
+    return {
+        "student": student,
+        "enrolled": {e["course_id"] for e in student_enrollments},
+        "completed": {
+            e["course_id"] for e in student_enrollments
+            if e["status"] == EnrollmentStatus.COMPLETED
+        },
+        "semester": current_semester
+    }
+
+def check_cart_course(context: Dict[str, Any], course: Dict[str, Any], cart_courses: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    """
+    Validate one course against a student context and the rest of the cart.
+    Returns the reason the course cannot be taken, or None if it can.
+    """
+    course_id = course["course_id"]
+    
+    if course_id in context["enrolled"]:
+        return "Already enrolled in this course"
+    
+    if not course.get("semesters") or context["semester"] not in course.get("semesters", []):
+        return f"Course not offered in the current {context['semester']} semester"
+    
+    missing_prerequisites = [
+        prereq for prereq in course.get("prerequisites") or []
+        if prereq not in context["completed"]
+    ]
+    if missing_prerequisites:
+        return f"Missing prerequisites: {', '.join(missing_prerequisites)}"
+    
+    other_credits = sum(
+        item["credit_hours"] for other_id, item in cart_courses.items() if other_id != course_id
+    )
+    available = context["student"].get("credit_hours", 0)
+    if other_credits + course["credit_hours"] > available:
+        return (
+            f"Insufficient credit hours. Required: {other_credits + course['credit_hours']}, "
+            f"Available: {available}"
+        )
+    
+    return None
+
+async def get_cart(student_id: str) -> Dict[str, Any]:
+    """
+    Get (or start) a student's cart with a cached validation context.
+    Reading the cart touches it, which pushes back its expiry.
+    """
+    document = await carts_collection.find_one_and_update(
+        {"_id": student_id},
+        {"$set": {"last_updated": datetime.now(timezone.utc)}, "$setOnInsert": {"courses": []}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    context = CART_CONTEXT_CACHE.get((student_id,))
+    if context is None:
+        context = await load_student_context(student_id)
+        CART_CONTEXT_CACHE.set((student_id,), context)
+    return {
+        "courses": {item["course_id"]: item for item in document.get("courses", [])},
+        "context": context
+    }
+
+def cart_response(student_id: str, cart: Dict[str, Any]) -> CartResponse:
+    courses = list(cart["courses"].values())
+    return CartResponse(
+        student_id=student_id,
+        courses=[CartItem(**item) for item in courses],
+        total_credit_hours=sum(item["credit_hours"] for item in courses),
+        available_credit_hours=cart["context"]["student"].get("credit_hours", 0)
+    )
+
+def require_student(user: TokenData) -> str:
+    if user.role != "student":
+        raise HTTPException(
+            status_code=403,
+            detail="Only students can use the registration cart"
         )
+    return str(user.user_id)
+
+@router.get("/enrollments/cart", response_model=CartResponse)
+async def view_cart(user: TokenData = Depends(get_current_user)):
+    """Get the student's registration cart"""
+    student_id = require_student(user)
+    try:
+        return cart_response(student_id, await get_cart(student_id))
+    except EnrollmentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/enrollments/cart/checkout", response_model=List[EnrollmentResponse])
+async def checkout_cart(user: TokenData = Depends(get_current_user)):
+    """
+    Enroll in every course in the cart at once.
+    The whole set is validated against a fresh student context in one pass,
+    then the enrollments and the credit-hour decrement are written in one transaction.
+    """
+    student_id = require_student(user)
+    
+    try:
+        registration_allowed, message = await check_registration_allowed()
+        if not registration_allowed:
+            raise HTTPException(status_code=403, detail=message)
         
-        # Prepare response
-        return EnrollmentResponse(
-            student_id=enrollment.student_id,
-            course_id=enrollment.course_id,
-            course_name=course["name"],
-            credit_hours=course["credit_hours"],
-            status=EnrollmentStatus.PENDING,
-            registered_at=now
+        cart = await get_cart(student_id)
+        if not cart["courses"]:
+            raise EnrollmentError("Registration cart is empty")
+        
+        # Re-validate the whole cart against fresh data
+        course_tree_ids = await get_course_tree_flattened()
+        context, snapshot = await asyncio.gather(
+            load_student_context(student_id),
+            catalog.get()
         )
+        courses = snapshot.courses(cart["courses"].keys())
+        cart["context"] = context
+        CART_CONTEXT_CACHE.set((student_id,), context)
+        course_dict = {course["course_id"]: course for course in courses}
         
+        errors = []
+        for course_id in cart["courses"]:
+            course = course_dict.get(course_id)
+            if not course or course_id not in course_tree_ids:
+                errors.append(f"{course_id}: Course is not available for enrollment")
+                continue
+            reason = check_cart_course(context, course, cart["courses"])
+            if reason:
+                errors.append(f"{course_id}: {reason}")
+        if errors:
+            raise EnrollmentError("; ".join(errors))
+        
+        # Build all enrollment records
+        now = datetime.now(timezone.utc)
+        enrollment_docs = [
+            Enrollment(
+                student_id=student_id,
+                course_id=course_id,
+                registered_at=now,
+                status=EnrollmentStatus.PENDING,
+                created_at=now,
+                last_updated=now
+            ).model_dump()
+            for course_id in cart["courses"]
+        ]
+        total_credit_hours = sum(course_dict[course_id]["credit_hours"] for course_id in cart["courses"])
+        
+        async def write(session):
+            # Charge the whole cart only if the balance still covers it
+            charged = await users_collection.update_one(
+                {"student_id": student_id, "credit_hours": {"$gte": total_credit_hours}},
+                {"$inc": {"credit_hours": -total_credit_hours}},
+                session=session
+            )
+            if charged.modified_count == 0:
+                raise EnrollmentError(f"Insufficient credit hours. Required: {total_credit_hours}")
+            
+            try:
+                await enrollments_collection.insert_many(enrollment_docs, session=session)
+            except BulkWriteError:
+                if session is None:
+                    # Undo the partial insert and the charge by hand
+                    await enrollments_collection.delete_many(
+                        {"_id": {"$in": [doc["_id"] for doc in enrollment_docs if "_id" in doc]}}
+                    )
+                    await refund_credit_hours(student_id, total_credit_hours)
+                raise EnrollmentError("Already enrolled in one of the courses in the cart")
+        
+        # Write all enrollments and the credit-hour decrement together
+        await run_transaction(write)
+        for doc in enrollment_docs:
+            prerequisite_index.apply_enrollment(doc)
+        invalidate_student_caches(student_id)
+        
+        await carts_collection.delete_one({"_id": student_id})
+        
+        return [
+            EnrollmentResponse(
+                student_id=student_id,
+                course_id=course_id,
+                course_name=course_dict[course_id]["name"],
+                credit_hours=course_dict[course_id]["credit_hours"],
+                status=EnrollmentStatus.PENDING,
+                registered_at=now
+            )
+            for course_id in cart["courses"]
+        ]
     except EnrollmentError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/enrollments/cart/{course_id}", response_model=CartResponse)
+async def add_to_cart(course_id: str, user: TokenData = Depends(get_current_user)):
+    """Add a course to the cart, validating it against the cached student context"""
+    student_id = require_student(user)
+    
+    try:
+        cart = await get_cart(student_id)
+        if course_id in cart["courses"]:
+            return cart_response(student_id, cart)
+        
+        course_tree_ids = await get_course_tree_flattened()
+        course = (await catalog.get()).course(course_id)
+        if not course or course_id not in course_tree_ids:
+            raise EnrollmentError("Course is not available for enrollment")
+        
+        reason = check_cart_course(cart["context"], course, cart["courses"])
+        if reason:
+            raise EnrollmentError(reason)
+        
+        item = {
+            "course_id": course_id,
+            "course_name": course["name"],
+            "credit_hours": course["credit_hours"]
+        }
+        await carts_collection.update_one(
+            {"_id": student_id, "courses.course_id": {"$ne": course_id}},
+            {"$push": {"courses": item}, "$set": {"last_updated": datetime.now(timezone.utc)}}
+        )
+        cart["courses"][course_id] = item
+        return cart_response(student_id, cart)
+    except EnrollmentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/enrollments/cart/{course_id}", response_model=CartResponse)
+async def remove_from_cart(course_id: str, user: TokenData = Depends(get_current_user)):
+    """Remove a course from the cart"""
+    student_id = require_student(user)
+    
+    try:
+        cart = await get_cart(student_id)
+    except EnrollmentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if course_id not in cart["courses"]:
+        raise HTTPException(status_code=404, detail=f"Course {course_id} is not in the cart")
+    
+    await carts_collection.update_one(
+        {"_id": student_id},
+        {"$pull": {"courses": {"course_id": course_id}}, "$set": {"last_updated": datetime.now(timezone.utc)}}
+    )
+    del cart["courses"][course_id]
+    return cart_response(student_id, cart)
+
 @router.delete("/enrollments/{course_id}")
 async def withdraw_course(
     course_id: str,
@@ -542,49 +686,45 @@ async def withdraw_course(
             )
             
         # Get course details
-        course = await courses_collection.find_one({"course_id": course_id})
+        course = (await catalog.get()).course(course_id)
         if not course:
             raise HTTPException(
                 status_code=404,
                 detail="Course not found"
             )
 
-        # Process withdrawal
-        try:
-            async with await enrollments_collection.database.client.start_session() as session:
-                async with session.start_transaction():
-                    # Update enrollment status
-                    await enrollments_collection.update_one(
-                        {"student_id": student_id, "course_id": course_id},
-                        {"$set": {
-                            "status": EnrollmentStatus.WITHDRAWN,
-                            "last_updated": datetime.now(timezone.utc)
-                        }},
-                        session=session
-                    )
-            
-                    # Restore credit hours
-                    await students_collection.update_one(
-                        {"student_id": student_id},
-                        {"$inc": {"credit_hours": course["credit_hours"]}},
-                        session=session
-                    )
-        except AttributeError:
-            # If start_session is not available, fall back to non-transactional updates
-            # Update enrollment status
-            await enrollments_collection.update_one(
-                {"student_id": student_id, "course_id": course_id},
+        async def write(session):
+            # Only an active enrollment can be withdrawn, so a retried or parallel
+            # withdrawal can't refund the credit hours twice
+            withdrawn = await enrollments_collection.update_one(
+                {
+                    "student_id": student_id,
+                    "course_id": course_id,
+                    "status": {"$in": [EnrollmentStatus.PENDING, EnrollmentStatus.COMPLETED]}
+                },
                 {"$set": {
                     "status": EnrollmentStatus.WITHDRAWN,
                     "last_updated": datetime.now(timezone.utc)
-                }}
+                }},
+                session=session
             )
-        
+            if withdrawn.modified_count == 0:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Enrollment is not active"
+                )
+            
             # Restore credit hours
-            await students_collection.update_one(
-                {"student_id": student_id},
-                {"$inc": {"credit_hours": course["credit_hours"]}}
-            )
+            await refund_credit_hours(student_id, course["credit_hours"], session=session)
+        
+        # Process withdrawal
+        await run_transaction(write)
+        
+        prerequisite_index.invalidate_student(student_id)
+        invalidate_student_caches(student_id)
+        
+        # Give up the course's sections; each freed seat goes to the head of its waitlist
+        await release_course_sections(student_id, course_id)
             
         return {
             "message": f"Successfully withdrawn from {course_id}",
@@ -600,7 +740,7 @@ async def get_student_enrollments(
 ):
     """Get all enrollments for a student"""
     # Cache key includes student ID
-    cache_key = f"enrollments_{student_id}"
+    cache_key = (student_id, "enrollments")
     
     # Check permission
     if user.role not in ["student", "instructor", "admin"] or (
@@ -612,12 +752,10 @@ async def get_student_enrollments(
         )
     
     # Check cache first
-    if cache_key in ENROLLMENTS_CACHE:
-        cache_entry = ENROLLMENTS_CACHE[cache_key]
-        # Check if cache is still valid (5 minutes TTL)
-        if time.time() - cache_entry["timestamp"] < 300:
-            print(f"✅ Cache hit for student enrollments: {student_id}")
-            return cache_entry["data"]
+    cached = ENROLLMENTS_CACHE.get(cache_key)
+    if cached is not None:
+        print(f"✅ Cache hit for student enrollments: {student_id}")
+        return EncodedJSONResponse(cached)
     
     print(f"❌ Cache miss for student enrollments: {student_id}")
     start_time = time.time()
@@ -637,7 +775,7 @@ async def get_student_enrollments(
     # Fetch all courses in one batch
     courses_data = {}
     if course_ids:
-        courses = await courses_collection.find({"course_id": {"$in": course_ids}}).to_list(None)
+        courses = (await catalog.get()).courses(course_ids)
         courses_data = {course["course_id"]: course for course in courses}
     
     # Build responses
@@ -660,18 +798,18 @@ async def get_student_enrollments(
     end_time = time.time()
     print(f"⏱️ Enrollments fetch time: {end_time - start_time:.2f}s")
     
-    # Cache the results
-    ENROLLMENTS_CACHE[cache_key] = {
-        "data": response_enrollments,
-        "timestamp": time.time()
-    }
+    # Cache the encoded body
+    encoded = EncodedJSON(response_enrollments)
+    ENROLLMENTS_CACHE.set(cache_key, encoded)
     
-    return response_enrollments
+    return EncodedJSONResponse(encoded)
 
 @router.get("/courses/tree/available")
 async def get_available_course_tree(
+    response: Response,
     user: TokenData = Depends(get_current_user),
-    semester: Optional[str] = None  # Optional parameter to override current semester
+    semester: Optional[str] = None,  # Optional parameter to override current semester
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Get available courses structured as a tree,
@@ -686,164 +824,50 @@ async def get_available_course_tree(
     
     student_id = str(user.user_id)
     
-    # Cache key combines student ID and semester
     current_semester = semester or await get_current_semester()
-    cache_key = f"course_tree_{student_id}_{current_semester}"
-    
-    # Check cache
-    if cache_key in ENROLLMENTS_CACHE:
-        cache_entry = ENROLLMENTS_CACHE[cache_key]
-        # Check if cache is still valid (2 minutes TTL)
-        if time.time() - cache_entry["timestamp"] < 120:
-            print(f"✅ Cache hit for available course tree: {student_id}")
-            return cache_entry["data"]
-    
-    print(f"❌ Cache miss for available course tree: {student_id}")
-    start_time = time.time()
-    
-    # OPTIMIZATION 1: Use batch queries to get all data upfront
-    
-    # Get student's enrollments in one query
-    student_enrollments = await enrollments_collection.find({
-        "student_id": student_id,
-        "status": {"$in": [EnrollmentStatus.PENDING, EnrollmentStatus.COMPLETED]}
-    }).to_list(None)
-    
-    # Process enrollment data
-    enrolled_courses = {e["course_id"] for e in student_enrollments}
-    completed_courses = {
-        e["course_id"] for e in student_enrollments 
-        if e["status"] == EnrollmentStatus.COMPLETED
-    }
-    
-    # Get all courses in the course tree
-    course_tree_ids = await get_course_tree_flattened()
     
-    # OPTIMIZATION 2: Use a more targeted query with all filters applied at once
-    query = {
-        "course_id": {"$in": list(course_tree_ids)},
-        "semesters": current_semester
-    }
-    
-    # Get all courses based on query
-    courses = await courses_collection.find(query).to_list(1000)
-    
-    # Create a dictionary to store all courses by their ID for easy lookup
-    course_dict = {course["course_id"]: course for course in courses}
-    
-    # OPTIMIZATION 3: Get all department data in one query
-    department_ids = list({course.get("department_id") for course in courses if course.get("department_id")})
-    departments = {}
-    
-    if department_ids:
-        dept_results = await departments_collection.find(
-            {"department_id": {"$in": department_ids}},
-            {"name": 1, "department_id": 1, "_id": 0}
-        ).to_list(None)
-        
-        departments = {dept["department_id"]: dept["name"] for dept in dept_results}
-    
-    # OPTIMIZATION 4: Process courses in one pass with all data available
-    processed_courses = {}
-    
-    for course_id, course in course_dict.items():
-        dept_id = course.get("department_id", "")
-        
-        processed_course = {
-            "course_id": course_id,
-            "name": course["name"],
-            "department_id": dept_id,
-            "department_name": departments.get(dept_id, "Unknown"),
-            "credit_hours": course["credit_hours"],
-            "description": course.get("description", ""),
-            "children": [],
-            "semesters": course.get("semesters", []),
-            "current_semester": current_semester
-        }
-        
-        # Check enrollment status
-        if course_id in enrolled_courses:
-            processed_course["can_enroll"] = False
-            processed_course["enrollment_status"] = "enrolled"
-        elif course_id in completed_courses:
-            processed_course["can_enroll"] = False
-            processed_course["enrollment_status"] = "completed"
-        else:
-            # Check prerequisites
-            if course.get("prerequisites"):
-                missing_prereqs = [
-                    prereq for prereq in course["prerequisites"]
-                    if prereq not in completed_courses
-                ]
-                if missing_prereqs:
-                    processed_course["can_enroll"] = False
-                    processed_course["enrollment_status"] = "prerequisites_missing"
-                else:
-                    processed_course["can_enroll"] = True
-                    processed_course["enrollment_status"] = "available"
-            else:
-                processed_course["can_enroll"] = True
-                processed_course["enrollment_status"] = "available"
-        
-        processed_courses[course_id] = processed_course
-    
-    # OPTIMIZATION 5: Build tree structure more efficiently
-    root_nodes = []
-    processed_course_ids = set()
-    
-    # First pass: identify root nodes (courses without prerequisites)
-    for course_id, course in course_dict.items():
-        if course_id not in processed_course_ids and (not course.get("prerequisites") or len(course["prerequisites"]) == 0):
-            root_nodes.append(processed_courses[course_id])
-            processed_course_ids.add(course_id)
-    
-    # Second pass: build children for each root
-    for root in root_nodes:
-        def build_children(parent_id):
-            children = []
-            for course_id, course in course_dict.items():
-                if (course_id not in processed_course_ids and 
-                    course.get("prerequisites") and 
-                    parent_id in course["prerequisites"]):
-                    
-                    child = processed_courses[course_id]
-                    processed_course_ids.add(course_id)
-                    child["children"] = build_children(course_id)
-                    if "prerequisites" not in child and course.get("prerequisites"):
-                        child["prerequisites"] = course["prerequisites"]
-                    children.append(child)
-            return children
-        
-        root["children"] = build_children(root["course_id"])
-    
-    # Group by department (these are root nodes)
-    departments_dict = {}
-    
-    for course in root_nodes:
-        dept_id = course["department_id"]
-        dept_name = course["department_name"]
-        
-        if dept_id not in departments_dict:
-            departments_dict[dept_id] = {
-                "department_id": dept_id,
-                "department_name": dept_name,
-                "courses": [],
-                "current_semester": current_semester
-            }
-        
-        departments_dict[dept_id]["courses"].append(course)
-    
-    # Convert to list for response
-    result = list(departments_dict.values())
-    
-    end_time = time.time()
-    print(f"⏱️ Available course tree generation time: {end_time - start_time:.2f}s")
-    
-    # Cache the results
-    ENROLLMENTS_CACHE[cache_key] = {
-        "data": result,
-        "timestamp": time.time()
-    }
-    
-    return result
+    # The tree is fully determined by the catalog version, the semester and the student's enrollments
+    active_mask, completed_mask = await prerequisite_index.load(student_id)
+    etag = make_etag(
+        "available_tree", student_id, prerequisite_index.catalog_version,
+        current_semester, hex(active_mask), hex(completed_mask)
+    )
+    not_modified = check_etag(response, if_none_match, etag, private=True)
+    if not_modified:
+        return not_modified
+    
+    # Not cached per student: only the ETag inputs above are kept. The shared skeleton for
+    # (catalog version, semester) is merged with this student's status overlay
+    encoded = EncodedJSON(await available_tree.render(student_id, current_semester))
+    return EncodedJSONResponse(encoded, headers=response.headers)
+
+async def refund_credit_hours(student_id: str, credit_hours: int, session=None):
+    """Give credit hours back to a student"""
+    await users_collection.update_one(
+        {"student_id": student_id},
+        {"$inc": {"credit_hours": credit_hours}},
+        session=session
+    )
+
+def invalidate_student_caches(student_id: str):
+    """Evict every cached response derived from one student's enrollments"""
+    ENROLLMENTS_CACHE.invalidate_prefix((student_id,))
+    CART_CONTEXT_CACHE.invalidate((student_id,))
+
+def on_enrollment_change(event: Dict[str, Any]):
+    """An enrollment write evicts that student's enrollment list"""
+    document = event.get("document")
+    if document and document.get("student_id"):
+        invalidate_student_caches(document["student_id"])
+    else:
+        # Deletes carry no student_id
+        ENROLLMENTS_CACHE.clear()
+        CART_CONTEXT_CACHE.clear()
+
+def on_catalog_change(event: Dict[str, Any]):
+    """Course or department writes change the course names in the enrollment lists"""
+    ENROLLMENTS_CACHE.clear()
 
+add_change_listener("enrollments", on_enrollment_change)
+add_change_listener("courses", on_catalog_change)
+add_change_listener("departments", on_catalog_change)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
-from database import rooms_collection
+from database import rooms_collection, time_slots_collection
 from models.Rooms import Room, RoomUpdate
 from helpers.auth import get_current_user
 from helpers.helpers import generate_room_id
+from helpers.catalog import catalog, CatalogKind
 import traceback
 from fastapi.responses import JSONResponse
 
@@ -45,6 +46,7 @@ async def create_room(room: Room, user: dict = Depends(get_current_user)):
         
         print(f"Inserting room with data: {room_data}")
         await rooms_collection.insert_one(room_data)
+        await catalog.refresh(CatalogKind.ROOMS, generated_room_id)
         
         return {"message": "Room created successfully", "room_id": generated_room_id}
     except Exception as e:
@@ -129,6 +131,8 @@ async def update_room(room_id: str, room: RoomUpdate, user: dict = Depends(get_c
             new_room_data = {**existing_room, **update_data, "room_id": new_room_id}
             new_room_data.pop("_id")  # Remove the _id field
             await rooms_collection.insert_one(new_room_data)
+            catalog.remove(CatalogKind.ROOMS, room_id)
+            await catalog.refresh(CatalogKind.ROOMS, new_room_id)
             
             return {"message": "Room updated successfully", "new_room_id": new_room_id}
         else:
@@ -142,6 +146,15 @@ async def update_room(room_id: str, room: RoomUpdate, user: dict = Depends(get_c
             if result.matched_count == 0:
                 raise HTTPException(status_code=404, detail="Room not found")
             
+            # Propagate the new capacity to the seat counters of this room's time slots
+            if "capacity" in update_data:
+                await time_slots_collection.update_many(
+                    {"room_id": room_id},
+                    {"$set": {"capacity": update_data["capacity"]}}
+                )
+            
+            await catalog.refresh(CatalogKind.ROOMS, room_id)
+            
             return {"message": "Room updated successfully"}
     except HTTPException:
         raise
@@ -167,6 +180,8 @@ async def delete_room(room_id: str, user: dict = Depends(get_current_user)):
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Room not found")
         
+        catalog.remove(CatalogKind.ROOMS, room_id)
+        
         return {"message": f"Room {room_id} deleted successfully"}
     except HTTPException:
         raise
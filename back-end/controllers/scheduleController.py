@@ -1,152 +1,278 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List, Dict, Optional, Any
+from fastapi import APIRouter, HTTPException, Depends, Header, status
+from typing import List, Dict, Optional, Any, Set, Tuple
 from datetime import datetime, time, timezone
 from models.Enrollments import EnrollmentStatus
 from models.Schedules import (
     TimeSlotCreate,
-    TimeSlot,
     TimeSlotResponse,
     ScheduleResponse,
+    TimetableRecommendationsResponse,
+    ScheduleAuditResponse,
     ScheduleConflictResponse,
     DayOfWeek,
-    TimeSlotType
+    TimeSlotType,
+    WaitlistCreate,
+    WaitlistEntryResponse,
+    WaitlistStatus
 )
 from database import (
     enrollments_collection,
     time_slots_collection,
-    courses_collection,
     users_collection,
-    rooms_collection,
-    schedules_collection
+    schedules_collection,
+    waitlist_collection,
+    add_change_listener,
+    notify_entity_subscribers
 )
 from helpers.auth import get_current_active_user, TokenData
 from helpers.exceptions import ScheduleError
-import time as time_module
+from helpers.cache import cache
+from helpers.idempotency import run_idempotent
+from helpers.catalog import catalog, CatalogKind
+from helpers.encoded_response import EncodedJSON, EncodedJSONResponse
+from helpers.schedule_index import (
+    schedule_index,
+    WeekSchedule,
+    time_to_minutes,
+    format_minutes,
+    slot_bitmap,
+    slot_minutes,
+    stored_time_fields
+)
+from helpers.schedule_solver import ScheduleSolver, Requirement, build_requirement
+from helpers.schedule_audit import AuditRows
+from helpers.seat_broadcast import seat_broadcast, SEAT_FIELDS
+import functools
+import logging
+from time import time_ns
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Cache for time slots to improve performance
-TIME_SLOTS_CACHE = {
-    "data": {},
-    "timestamp": {},
-    "ttl": 300 # 5 minutes
-}
-
-# Cache for time slot seats
-SEAT_COUNT_CACHE = {
-    "data": {},
-    "timestamp": {},
-    "ttl": 60  # 1 minute - shorter TTL since this data changes more frequently
-}
-
-def time_to_minutes(t: time | str) -> int:
-    """Convert time to minutes since midnight for easier comparison"""
-    if isinstance(t, time):
-        return t.hour * 60 + t.minute
-    
-    # Handle string time formats
+# Cache for time slots to improve performance, keyed by (course_id, slot_type)
+# Both caches are evicted by write events (see the change listeners at the bottom of this module)
+TIME_SLOTS_CACHE = cache.register("time_slots", ttl=1800, max_entries=5000, max_bytes=16 * 1024 * 1024)
+
+# Cache for time slot seats as encoded responses (EncodedJSON), keyed by (course_id,)
+# Shorter TTL since this data changes more frequently
+SEAT_COUNT_CACHE = cache.register("seat_counts", ttl=300, max_entries=5000, max_bytes=16 * 1024 * 1024)
+
+# course_id of every slot whose seats were cached, by the slot's ObjectId. Seat counter
+# updates arrive from the change stream without the document; this finds their course.
+# Entries are refreshed with the course's seats and dropped when the slot is deleted
+SLOT_COURSES: Dict[str, str] = {}
+
+# Upper bound on the number of complete timetables one recommendations request returns
+MAX_RECOMMENDED_SCHEDULES = 20
+
+async def ensure_seat_counters(slots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Make sure time slot documents carry the capacity and seats_taken fields
+    used by the guarded seat updates. Slots created before seat counters existed
+    are backfilled once from the room capacity and the current schedule rows:
+    one aggregation counts the rows of every such slot, one bulk write stores
+    the counters, and one query reads the slots back.
+    """
+    missing = [slot for slot in slots if "capacity" not in slot or "seats_taken" not in slot]
+    if not missing:
+        return slots
+    
+    # Schedule rows per slot, for all the slots at once
+    slot_ids = [slot["slot_id"] for slot in missing]
+    counts = {
+        group["_id"]: group["count"]
+        async for group in schedules_collection.aggregate([
+            {"$match": {"slot_id": {"$in": slot_ids}}},
+            {"$group": {"_id": "$slot_id", "count": {"$sum": 1}}}
+        ])
+    }
+    
+    # Each field is only set if still missing, so a concurrent backfill or reservation wins
+    snapshot = await catalog.get()
+    operations = []
+    for slot in missing:
+        if "capacity" not in slot:
+            room = snapshot.room(slot.get("room_id"))
+            operations.append(UpdateOne(
+                {"slot_id": slot["slot_id"], "capacity": {"$exists": False}},
+                {"$set": {"capacity": room.get("capacity", 0) if room else 0}}
+            ))
+        if "seats_taken" not in slot:
+            operations.append(UpdateOne(
+                {"slot_id": slot["slot_id"], "seats_taken": {"$exists": False}},
+                {"$set": {"seats_taken": counts.get(slot["slot_id"], 0)}}
+            ))
+    await time_slots_collection.bulk_write(operations, ordered=False)
+    
+    backfilled = {
+        slot["slot_id"]: slot
+        for slot in await time_slots_collection.find({"slot_id": {"$in": slot_ids}}).to_list(None)
+    }
+    return [backfilled.get(slot["slot_id"], slot) for slot in slots]
+
+async def ensure_seat_counter(slot: Dict[str, Any]) -> Dict[str, Any]:
+    """ensure_seat_counters for a single slot"""
+    return (await ensure_seat_counters([slot]))[0]
+
+async def reserve_seat(slot_id: str) -> bool:
+    """
+    Atomically take one seat in a time slot.
+    The increment only applies while seats_taken < capacity, so concurrent
+    requests can never overbook a section. Returns False when the slot is full.
+    """
+    result = await time_slots_collection.update_one(
+        {
+            "slot_id": slot_id,
+            "$expr": {"$lt": [{"$ifNull": ["$seats_taken", 0]}, "$capacity"]}
+        },
+        {"$inc": {"seats_taken": 1}}
+    )
+    return result.modified_count == 1
+
+async def release_seat(slot_id: str) -> None:
+    """Atomically give back one seat in a time slot (never drops below zero)"""
+    await time_slots_collection.update_one(
+        {"slot_id": slot_id, "seats_taken": {"$gt": 0}},
+        {"$inc": {"seats_taken": -1}}
+    )
+
+def invalidate_seat_cache(course_id: str) -> None:
+    """Drop the cached seat counts for a course after a seat changes hands, and tell the seat subscribers"""
+    SEAT_COUNT_CACHE.invalidate((course_id,))
+    seat_broadcast.touch(course_id)
+
+def parse_time(value: time | str) -> time:
+    """Stored slot time as datetime.time; admin writes store HH:MM:SS, so the fast path nearly always hits"""
+    if isinstance(value, time):
+        return value
     try:
-        # Clean up the input string
-        t = t.strip().upper()
-        
-        # Try different time formats
-        formats = [
-            "%H:%M:%S",  # 24-hour with seconds
-            "%H:%M",     # 24-hour without seconds
-            "%I:%M:%S %p",  # 12-hour with seconds
-            "%I:%M %p",     # 12-hour without seconds
-            "%H",           # Just hours in 24-hour format
-            "%I %p"         # Just hours in 12-hour format
-        ]
-        
-        for fmt in formats:
-            try:
-                parsed_time = datetime.strptime(t, fmt).time()
-                return parsed_time.hour * 60 + parsed_time.minute
-            except ValueError:
-                continue
-                
-        raise ValueError(f"Invalid time format: {t}")
-    except Exception as e:
-        raise ValueError(f"Error parsing time: {str(e)}")
+        return time.fromisoformat(value)
+    except (TypeError, ValueError):
+        minutes = time_to_minutes(value)
+        return time(minutes // 60, minutes % 60)
+
+def time_slot_row(slot: Dict[str, Any], room_name: str, instructor_name: Optional[str]) -> Dict[str, Any]:
+    """
+    TimeSlot-shaped dict for a stored slot (or schedule row).
+    Slots are validated when they are written, so reads build plain dicts
+    instead of re-validating every slot through pydantic on every request.
+    """
+    return {
+        "slot_id": slot["slot_id"],
+        "course_id": slot["course_id"],
+        "day": slot["day"],
+        "start_time": parse_time(slot["start_time"]),
+        "end_time": parse_time(slot["end_time"]),
+        "type": slot["type"],
+        "room_id": slot["room_id"],
+        "room_name": room_name,
+        "instructor_id": slot.get("instructor_id"),
+        "instructor_name": instructor_name
+    }
 
-def check_time_overlap(start1: time | str, end1: time | str, start2: time | str, end2: time | str) -> bool:
-    """Check if two time periods overlap"""
-    start1_mins = time_to_minutes(start1)
-    end1_mins = time_to_minutes(end1)
-    start2_mins = time_to_minutes(start2)
-    end2_mins = time_to_minutes(end2)
+# TimeSlotResponse fields after course_name
+TIME_SLOT_RESPONSE_TAIL = (
+    "day", "start_time", "end_time", "type", "room_id", "room_name", "instructor_id", "instructor_name"
+)
 
-    return max(start1_mins, start2_mins) < min(end1_mins, end2_mins)
+def time_slot_response_row(row: Dict[str, Any], course_name: str) -> Dict[str, Any]:
+    """TimeSlotResponse-shaped dict (same field order) from a time_slot_row"""
+    return {
+        "slot_id": row["slot_id"],
+        "course_id": row["course_id"],
+        "course_name": course_name,
+        **{field: row[field] for field in TIME_SLOT_RESPONSE_TAIL}
+    }
 
-async def get_available_time_slots(course_id: str, slot_type: TimeSlotType) -> List[TimeSlot]:
-    """Get all available time slots for a course and slot type"""
+async def get_available_time_slots(course_id: str, slot_type: TimeSlotType) -> List[Dict[str, Any]]:
+    """Get all available time slots for a course and slot type, as TimeSlot-shaped dicts"""
     # Check cache first
-    cache_key = f"time_slots_{course_id}_{slot_type}"
-    if cache_key in TIME_SLOTS_CACHE["data"] and cache_key in TIME_SLOTS_CACHE["timestamp"]:
-        if time_module.time() - TIME_SLOTS_CACHE["timestamp"][cache_key] < TIME_SLOTS_CACHE["ttl"]:
-            return TIME_SLOTS_CACHE["data"][cache_key]
+    cache_key = (course_id, slot_type)
+    cached = TIME_SLOTS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
     # Get time slots fro the course and type
     time_slots = await time_slots_collection.find({"course_id": course_id, "type": slot_type}).to_list(None)
     
     # Get room details for each time slot
+    snapshot = await catalog.get()
     result = []
     for slot in time_slots:
-        room = await rooms_collection.find_one({"room_id": slot["room_id"]})
-        room_name = f"{room['building']}-{room['room_number']}" if room else "Unknown"
+        room_name = snapshot.room_name(slot["room_id"])
+        instructor_name = snapshot.instructor_name(slot.get("instructor_id"))
+        row = time_slot_row(slot, room_name, instructor_name)
+        # Week occupancy bitmap for one-AND conflict filtering (not part of the response)
+        row["week_bitmap"] = slot_bitmap(slot)
+        result.append(row)
+    
+    # Update cache
+    TIME_SLOTS_CACHE.set(cache_key, result)
+    return result
+
+async def get_courses_time_slots(course_ids: List[str]) -> Dict[tuple, List[Dict[str, Any]]]:
+    """
+    get_available_time_slots for every type of several courses, keyed by
+    (course_id, slot_type). Courses missing from the cache are loaded with a
+    single query and cached per type, empty types included.
+    """
+    result = {}
+    missing = []
+    for course_id in course_ids:
+        for slot_type in TimeSlotType:
+            cached = TIME_SLOTS_CACHE.get((course_id, slot_type))
+            if cached is None:
+                missing.append(course_id)
+                break
+            result[(course_id, slot_type)] = cached
+    
+    if missing:
+        time_slots = await time_slots_collection.find({"course_id": {"$in": missing}}).to_list(None)
         
-        instructor = None
-        if slot.get("instructor_id"):
-            instructor = await users_collection.find_one({"instructor_id": slot['instructor_id']})
+        snapshot = await catalog.get()
+        loaded = {(course_id, slot_type): [] for course_id in missing for slot_type in TimeSlotType}
+        for slot in time_slots:
+            rows = loaded.get((slot["course_id"], slot["type"]))
+            if rows is None:
+                continue
+            row = time_slot_row(slot, snapshot.room_name(slot["room_id"]), snapshot.instructor_name(slot.get("instructor_id")))
+            row["week_bitmap"] = slot_bitmap(slot)
+            rows.append(row)
         
-        result.append(TimeSlot(
-            slot_id=slot["slot_id"],
-            course_id=slot["course_id"],
-            day=slot["day"],
-            start_time=slot["start_time"],
-            end_time=slot["end_time"],
-            type=slot["type"],
-            room_id=slot["room_id"],
-            room_name=room_name,
-            instructor_id=slot.get("instructor_id"),
-            instructor_name=instructor["name"] if instructor else None
-        ))
+        for key, rows in loaded.items():
+            TIME_SLOTS_CACHE.set(key, rows)
+        result.update(loaded)
     
-    # Update cache
-    TIME_SLOTS_CACHE["data"][cache_key] = result
-    TIME_SLOTS_CACHE["timestamp"][cache_key] = time_module.time()
     return result
 
 async def check_schedule_conflicts(
     student_id: str,
     day: DayOfWeek,
-    start_time: time,
-    end_time: time,
+    start_min: int,
+    end_min: int,
 ) -> tuple[bool, str]:
     """
-    Check if time slot conflicts with the student's existing schedule
+    Check if [start_min, end_min) on day conflicts with the student's existing schedule
     Returns: (has_conflict, conflict_details)
     """
-    # Get student's current schedule
-    schedule = await schedules_collection.find({
-        "student_id": student_id,
-        "day": day
-    }).to_list(None)
-
-    for slot in schedule:
-        if check_time_overlap(start_time, end_time, slot["start_time"], slot["end_time"]):
-            # Get course details for better error message
-            course = await courses_collection.find_one({"course_id": slot["course_id"]})
-            course_name = course["name"] if course else slot["course_id"]
-            
-            # Format time strings
-            start_str = slot["start_time"] if isinstance(slot["start_time"], str) else slot["start_time"].strftime("%H:%M")
-            end_str = slot["end_time"] if isinstance(slot["end_time"], str) else slot["end_time"].strftime("%H:%M")
-            
-            return True, f"Time conflict with {course_name} at {slot['type']} on {day} at {start_str} - {end_str}"
+    # Per-day interval index of the student's schedule: one bisect per check
+    student_schedule = await schedule_index.get(student_id)
+    conflict = student_schedule.find_conflict(day, start_min, end_min)
+    if conflict is None:
+        return False, ""
+    
+    # Get course details for better error message
+    slot = conflict.slot
+    course = (await catalog.get()).course(slot["course_id"])
+    course_name = course["name"] if course else slot["course_id"]
     
-    return False, ""
+    return True, (
+        f"Time conflict with {course_name} at {slot['type']} on {day} at "
+        f"{format_minutes(conflict.start)} - {format_minutes(conflict.end)}"
+    )
 
 @router.get("/schedule/time-slots/{course_id}", response_model=Dict[str, List[TimeSlotResponse]])
 async def get_course_time_slots(
@@ -173,74 +299,39 @@ async def get_course_time_slots(
     tutorial_slots = await get_available_time_slots(course_id, TimeSlotType.TUTORIAL)
     
     # Get course details
-    course = await courses_collection.find_one({"course_id": course_id})
+    course = (await catalog.get()).course(course_id)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Course {course_id} not found"
         )
         
-    # Convert to response model
-    lecture_responses = [
-        TimeSlotResponse(
-            slot_id=slot.slot_id,
-            course_id=slot.course_id,
-            course_name=course["name"],
-            day=slot.day,
-            start_time=slot.start_time,
-            end_time=slot.end_time,
-            type=slot.type,
-            room_id=slot.room_id,
-            room_name=slot.room_name,
-            instructor_id=slot.instructor_id,
-            instructor_name=slot.instructor_name
-        )for slot in lecture_slots
-    ]
-    
-    lab_responses = [
-        TimeSlotResponse(
-            slot_id=slot.slot_id,
-            course_id=slot.course_id,
-            course_name=course["name"],
-            day=slot.day,
-            start_time=slot.start_time,
-            end_time=slot.end_time,
-            type=slot.type,
-            room_id=slot.room_id,
-            room_name=slot.room_name,
-            instructor_id=slot.instructor_id,
-            instructor_name=slot.instructor_name
-        ) for slot in lab_slots
-    ]
-    
-    tutorial_responses = [
-        TimeSlotResponse(
-            slot_id=slot.slot_id,
-            course_id=slot.course_id,
-            course_name=course["name"],
-            day=slot.day,
-            start_time=slot.start_time,
-            end_time=slot.end_time,
-            type=slot.type,
-            room_id=slot.room_id,
-            room_name=slot.room_name,
-            instructor_id=slot.instructor_id,
-            instructor_name=slot.instructor_name
-        ) for slot in tutorial_slots
-    ]
-    
-    return {
-        "lecture": lecture_responses,
-        "lab": lab_responses,
-        "tutorial": tutorial_responses
-    }
+    # Emit the trusted rows directly; response_model only documents the shape
+    return EncodedJSONResponse(EncodedJSON({
+        "lecture": [time_slot_response_row(slot, course["name"]) for slot in lecture_slots],
+        "lab": [time_slot_response_row(slot, course["name"]) for slot in lab_slots],
+        "tutorial": [time_slot_response_row(slot, course["name"]) for slot in tutorial_slots]
+    }))
     
 @router.post("/schedule/select-time-slot", response_model=TimeSlotResponse)
 async def select_time_slot(
     time_slot: TimeSlotCreate,
-    user: TokenData = Depends(get_current_active_user)
+    user: TokenData = Depends(get_current_active_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
-    """Select a time slot for a course"""
+    """
+    Select a time slot for a course.
+    Retries carrying the same Idempotency-Key get the stored response back.
+    """
+    return await run_idempotent(
+        idempotency_key,
+        f"{user.user_id}:POST:/schedule/select-time-slot",
+        time_slot,
+        functools.partial(apply_time_slot_selection, time_slot, user)
+    )
+
+async def apply_time_slot_selection(time_slot: TimeSlotCreate, user: TokenData) -> TimeSlotResponse:
+    """Reserve a seat and record a time slot in the student's schedule"""
     if user.role != "student":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -276,67 +367,14 @@ async def select_time_slot(
             detail="Time slot does not match the specified course"
         )
         
-    # Check if student already has a time slot for this course
-    existing_slot = await schedules_collection.find_one({
-        "student_id": student_id,
-        "course_id": time_slot.course_id,
-        "type": slot["type"]
-    })
-    
-    if existing_slot:
-        # Update existing slot
-        await schedules_collection.update_one(
-            {"_id": existing_slot["_id"]},
-            {"$set": {
-                "slot_id": slot["slot_id"],
-                "day": slot["day"],
-                "start_time": slot["start_time"],
-                "end_time": slot["end_time"],
-                "room_id": slot["room_id"],
-                "instructor_id": slot.get("instructor_id"),
-                "last_updated": datetime.now(timezone.utc)
-            }}
-        )
-    else:
-        # Check for time slot conflicts
-        has_conflict, conflict_details = await check_schedule_conflicts(
-            student_id,
-            slot["day"],
-            slot["start_time"],
-            slot["end_time"]
-        )
-        
-        if has_conflict:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=conflict_details
-            )
-        
-        # Add new slot to schedule
-        await schedules_collection.insert_one({
-            "student_id": student_id,
-            "course_id": time_slot.course_id,
-            "slot_id": slot["slot_id"],
-            "type": slot["type"],
-            "day": slot["day"],
-            "start_time": slot["start_time"],
-            "end_time": slot["end_time"],
-            "room_id": slot["room_id"],
-            "instructor_id": slot.get("instructor_id"),
-            "created_at": datetime.now(timezone.utc),
-            "last_updated": datetime.now(timezone.utc)
-        })
+    # Record the slot in the schedule, taking a seat in the section
+    await assign_slot(student_id, time_slot.course_id, slot)
         
     # Get course, room, and instructor details for response
-    course = await courses_collection.find_one({"course_id": time_slot.course_id})
-    room = await rooms_collection.find_one({"room_id": slot["room_id"]})
-    room_name = f"{room['building']}-{room['room_number']}" if room else "Unknown"
-    
-    instructor = None
-    instructor_name = None
-    if slot.get("instructor_id"):
-        instructor = await users_collection.find_one({"instructor_id": slot["instructor_id"]})
-        instructor_name = instructor["name"] if instructor else None
+    snapshot = await catalog.get()
+    course = snapshot.course(time_slot.course_id)
+    room_name = snapshot.room_name(slot["room_id"])
+    instructor_name = snapshot.instructor_name(slot.get("instructor_id"))
     
     return TimeSlotResponse(
         slot_id=slot["slot_id"],
@@ -352,6 +390,249 @@ async def select_time_slot(
         instructor_name=instructor_name
     )
     
+async def assign_slot(student_id: str, course_id: str, slot: Dict[str, Any], seat_reserved: bool = False):
+    """
+    Put a time slot in a student's schedule, replacing their current section
+    of the same type. The seat in the new section is taken before the old one
+    is given back. Pass seat_reserved=True when the caller already holds the
+    seat (waitlist promotion); it is released again whenever the slot isn't assigned.
+    """
+    try:
+        # Check if student already has a time slot for this course
+        existing_slot = await schedules_collection.find_one({
+            "student_id": student_id,
+            "course_id": course_id,
+            "type": slot["type"]
+        })
+        
+        # Make sure the slot has seat counters before reserving
+        slot = await ensure_seat_counter(slot)
+        
+        if existing_slot and existing_slot.get("slot_id") == slot["slot_id"]:
+            # Same section selected again - nothing to reserve
+            if seat_reserved:
+                await release_seat(slot["slot_id"])
+            return
+        
+        if not existing_slot:
+            # Check for time slot conflicts
+            has_conflict, conflict_details = await check_schedule_conflicts(
+                student_id,
+                slot["day"],
+                *slot_minutes(slot)
+            )
+            
+            if has_conflict:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=conflict_details
+                )
+    except BaseException:
+        if seat_reserved:
+            await release_seat(slot["slot_id"])
+        raise
+    
+    # Take a seat in the section
+    if not seat_reserved and not await reserve_seat(slot["slot_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Time slot {slot['slot_id']} is full"
+        )
+    
+    # Schedule rows carry the same display strings and integer minutes as the slot
+    time_fields = stored_time_fields(slot["start_time"], slot["end_time"])
+    
+    try:
+        if existing_slot:
+            # Update existing slot
+            await schedules_collection.update_one(
+                {"_id": existing_slot["_id"]},
+                {"$set": {
+                    "slot_id": slot["slot_id"],
+                    "day": slot["day"],
+                    **time_fields,
+                    "room_id": slot["room_id"],
+                    "instructor_id": slot.get("instructor_id"),
+                    "last_updated": datetime.now(timezone.utc)
+                }}
+            )
+        else:
+            # Add new slot to schedule
+            await schedules_collection.insert_one({
+                "student_id": student_id,
+                "course_id": course_id,
+                "slot_id": slot["slot_id"],
+                "type": slot["type"],
+                "day": slot["day"],
+                **time_fields,
+                "room_id": slot["room_id"],
+                "instructor_id": slot.get("instructor_id"),
+                "created_at": datetime.now(timezone.utc),
+                "last_updated": datetime.now(timezone.utc)
+            })
+    except BaseException:
+        await release_seat(slot["slot_id"])
+        raise
+    
+    schedule_index.invalidate(student_id)
+    invalidate_seat_cache(course_id)
+    
+    # The student is seated; drop any waitlist entry they held for this section
+    await waitlist_collection.delete_one({
+        "student_id": student_id,
+        "slot_id": slot["slot_id"],
+        "status": WaitlistStatus.WAITING
+    })
+    
+    # Free the seat in the previous section
+    if existing_slot:
+        await free_seat(existing_slot["slot_id"], course_id)
+
+async def free_seat(slot_id: str, course_id: str):
+    """Give a seat back to a section and hand it to the head of its waitlist"""
+    await release_seat(slot_id)
+    invalidate_seat_cache(course_id)
+    await promote_waitlist(slot_id)
+
+async def release_course_sections(student_id: str, course_id: str):
+    """Drop every section a student holds in a course, e.g. after withdrawing from it"""
+    sections = await schedules_collection.find(
+        {"student_id": student_id, "course_id": course_id},
+        {"slot_id": 1}
+    ).to_list(None)
+    
+    for section in sections:
+        removed = await schedules_collection.find_one_and_delete({"_id": section["_id"]})
+        if removed and removed.get("slot_id"):
+            await free_seat(removed["slot_id"], course_id)
+    schedule_index.invalidate(student_id)
+    
+    # Waiting for another section of a course they left makes no sense either
+    await waitlist_collection.update_many(
+        {"student_id": student_id, "course_id": course_id, "status": WaitlistStatus.WAITING},
+        {"$set": {"status": WaitlistStatus.CANCELLED, "last_updated": datetime.now(timezone.utc)}}
+    )
+
+async def waitlist_positions(entries: List[Dict[str, Any]]) -> Dict[str, int]:
+    """1-based place of each of a student's waiting entries in its section's queue, by slot_id, in one aggregation"""
+    own = {entry["slot_id"]: entry["position"] for entry in entries if entry["status"] == WaitlistStatus.WAITING}
+    if not own:
+        return {}
+    ahead = {
+        group["_id"]: group["count"]
+        async for group in waitlist_collection.aggregate([
+            {"$match": {
+                "status": WaitlistStatus.WAITING,
+                "$or": [{"slot_id": slot_id, "position": {"$lt": position}} for slot_id, position in own.items()]
+            }},
+            {"$group": {"_id": "$slot_id", "count": {"$sum": 1}}}
+        ])
+    }
+    return {slot_id: ahead.get(slot_id, 0) + 1 for slot_id in own}
+
+async def notify_waitlist(student_id: str, operation: str, entry: Dict[str, Any], detail: Optional[str] = None):
+    """Push a waitlist event to the student's /ws/realtime subscribers"""
+    try:
+        await notify_entity_subscribers("waitlist", student_id, {
+            "collection": "waitlist",
+            "operation": operation,
+            "document_id": entry["slot_id"],
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "document": {
+                "slot_id": entry["slot_id"],
+                "course_id": entry["course_id"],
+                "type": entry.get("type"),
+                "detail": detail
+            }
+        })
+    except Exception as e:
+        logger.error(f"Error notifying waitlist event for {student_id}: {str(e)}")
+
+async def promote_waitlist(slot_id: str) -> Optional[str]:
+    """
+    Hand a freed seat to the first student waiting for the section.
+    The head entry is claimed with a single find_one_and_update, so two
+    concurrent withdrawals never promote the same student, and the seat is
+    taken with the same guarded increment as a normal selection. Entries that
+    can no longer be seated (no enrollment, time conflict) are skipped. If the
+    promotion fails with any other error, the seat is released and the entry
+    goes back to waiting before the error is raised.
+    Returns the promoted student_id, or None.
+    """
+    while True:
+        # Claim the head of the queue
+        entry = await waitlist_collection.find_one_and_update(
+            {"slot_id": slot_id, "status": WaitlistStatus.WAITING},
+            {"$set": {"status": WaitlistStatus.PROMOTING, "last_updated": datetime.now(timezone.utc)}},
+            sort=[("position", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if not entry:
+            return None
+        
+        student_id = entry["student_id"]
+        
+        # Someone else may have taken the seat first; put the entry back
+        if not await reserve_seat(slot_id):
+            await waitlist_collection.update_one(
+                {"_id": entry["_id"], "status": WaitlistStatus.PROMOTING},
+                {"$set": {"status": WaitlistStatus.WAITING}}
+            )
+            return None
+        
+        failure = None
+        seat_held = True
+        try:
+            slot = await time_slots_collection.find_one({"slot_id": slot_id})
+            enrollment = await enrollments_collection.find_one({
+                "student_id": student_id,
+                "course_id": entry["course_id"],
+                "status": {"$in": [EnrollmentStatus.PENDING, EnrollmentStatus.COMPLETED]}
+            })
+            
+            if not slot:
+                failure = "This section no longer exists"
+            elif not enrollment:
+                failure = "You are no longer enrolled in this course"
+            else:
+                # From here on assign_slot gives the seat back whenever it raises
+                seat_held = False
+                try:
+                    await assign_slot(student_id, entry["course_id"], slot, seat_reserved=True)
+                except HTTPException as e:
+                    failure = e.detail
+            
+            if failure and seat_held:
+                seat_held = False
+                await release_seat(slot_id)
+        except BaseException:
+            if seat_held:
+                await release_seat(slot_id)
+            await waitlist_collection.update_one(
+                {"_id": entry["_id"], "status": WaitlistStatus.PROMOTING},
+                {"$set": {"status": WaitlistStatus.WAITING, "last_updated": datetime.now(timezone.utc)}}
+            )
+            raise
+        
+        if failure:
+            # Skip this student and offer the seat to the next one
+            await waitlist_collection.update_one(
+                {"_id": entry["_id"]},
+                {"$set": {"status": WaitlistStatus.SKIPPED, "reason": failure, "last_updated": datetime.now(timezone.utc)}}
+            )
+            await notify_waitlist(student_id, "waitlist_skipped", entry, failure)
+            if not slot:
+                # No seat left to offer
+                return None
+            continue
+        
+        await waitlist_collection.update_one(
+            {"_id": entry["_id"]},
+            {"$set": {"status": WaitlistStatus.PROMOTED, "last_updated": datetime.now(timezone.utc)}}
+        )
+        await notify_waitlist(student_id, "waitlist_promoted", entry)
+        return student_id
+
 @router.delete("/schedule/delete-time-slot/{course_id}/{slot_type}")
 async def remove_time_slot(
     course_id: str,
@@ -368,20 +649,160 @@ async def remove_time_slot(
     student_id = str(user.user_id)
     
     # Check if student has this time slot
-    result = await schedules_collection.delete_one({
+    removed = await schedules_collection.find_one_and_delete({
         "student_id": student_id,
         "course_id": course_id,
         "type": slot_type
     })
     
-    if result.deleted_count == 0:
+    if not removed:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Time slot {slot_type} for course {course_id} not found in schedule"
         )
+    schedule_index.invalidate(student_id)
+    
+    # Give the seat back to the section (and to the head of its waitlist)
+    if removed.get("slot_id"):
+        await free_seat(removed["slot_id"], course_id)
     
     return {"message": f"Successfully removed time slot {slot_type} for course {course_id}"}
 
+@router.post("/schedule/waitlist", response_model=WaitlistEntryResponse)
+async def join_waitlist(
+    entry: WaitlistCreate,
+    user: TokenData = Depends(get_current_active_user)
+):
+    """
+    Join the waitlist of a full section.
+    The student is promoted automatically when a seat frees up and gets a
+    "waitlist_promoted" event on /ws/realtime (collection "waitlist").
+    """
+    if user.role != "student":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only students can join a waitlist"
+        )
+    
+    student_id = str(user.user_id)
+    
+    # Check if student is enrolled in the course
+    enrollment = await enrollments_collection.find_one({
+        "student_id": student_id,
+        "course_id": entry.course_id,
+        "status": {"$in": [EnrollmentStatus.PENDING, EnrollmentStatus.COMPLETED]}
+    })
+    if not enrollment:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You must be enrolled in this course to join its waitlist"
+        )
+    
+    slot = await time_slots_collection.find_one({"slot_id": entry.slot_id})
+    if not slot:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Time slot {entry.slot_id} not found"
+        )
+    
+    if slot["course_id"] != entry.course_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Time slot does not match the specified course"
+        )
+    
+    # Only full sections have a waitlist
+    slot = await ensure_seat_counter(slot)
+    if slot.get("seats_taken", 0) < slot.get("capacity", 0):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Time slot {entry.slot_id} has free seats; select it directly"
+        )
+    
+    if await schedules_collection.find_one({"student_id": student_id, "slot_id": entry.slot_id}):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Time slot {entry.slot_id} is already in your schedule"
+        )
+    
+    document = {
+        "student_id": student_id,
+        "course_id": entry.course_id,
+        "slot_id": entry.slot_id,
+        "type": slot["type"],
+        "status": WaitlistStatus.WAITING,
+        # Nanosecond join time orders the queue; ties are practically impossible
+        "position": time_ns(),
+        "created_at": datetime.now(timezone.utc),
+        "last_updated": datetime.now(timezone.utc)
+    }
+    try:
+        await waitlist_collection.insert_one(document)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"You are already on the waitlist for {entry.slot_id}"
+        )
+    
+    # A seat may have been freed between the capacity check and the insert
+    await promote_waitlist(entry.slot_id)
+    document = await waitlist_collection.find_one({"_id": document["_id"]}) or document
+    
+    positions = await waitlist_positions([document])
+    return waitlist_entry_response(document, positions.get(document["slot_id"]))
+
+@router.get("/schedule/waitlist", response_model=List[WaitlistEntryResponse])
+async def get_my_waitlist(user: TokenData = Depends(get_current_active_user)):
+    """List the sections the student is waiting for, with their place in each queue"""
+    if user.role != "student":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only students can view their waitlist"
+        )
+    
+    entries = await waitlist_collection.find({
+        "student_id": str(user.user_id),
+        "status": WaitlistStatus.WAITING
+    }).sort("created_at", 1).to_list(None)
+    
+    positions = await waitlist_positions(entries)
+    return [waitlist_entry_response(entry, positions.get(entry["slot_id"])) for entry in entries]
+
+@router.delete("/schedule/waitlist/{slot_id}")
+async def leave_waitlist(
+    slot_id: str,
+    user: TokenData = Depends(get_current_active_user)
+):
+    """Leave the waitlist of a section"""
+    if user.role != "student":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only students can leave a waitlist"
+        )
+    
+    result = await waitlist_collection.delete_one({
+        "student_id": str(user.user_id),
+        "slot_id": slot_id,
+        "status": WaitlistStatus.WAITING
+    })
+    if result.deleted_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"You are not on the waitlist for {slot_id}"
+        )
+    
+    return {"message": f"Successfully left the waitlist for {slot_id}"}
+
+def waitlist_entry_response(entry: Dict[str, Any], position: Optional[int]) -> WaitlistEntryResponse:
+    return WaitlistEntryResponse(
+        slot_id=entry["slot_id"],
+        course_id=entry["course_id"],
+        type=entry["type"],
+        status=entry["status"],
+        position=position,
+        created_at=entry["created_at"]
+    )
+
 @router.get("/schedule/", response_model=ScheduleResponse)
 async def get_student_schedule(
     user: TokenData = Depends(get_current_active_user),
@@ -401,27 +822,15 @@ async def get_student_schedule(
         "student_id": student_id
     }).to_list(None)
     
-    # Get course details for all courses in schedule
-    course_ids = list(set(slot["room_id"] for slot in schedule))
-    courses = {}
-    if course_ids:
-        course_list = await courses_collection.find({
-            "course_id": {"$in": course_ids}
-        }).to_list(None)
-        courses = {course["course_id"]: course["name"] for course in course_list}
-    
-    # Get room details for all rooms in schedule
-    room_ids = list(set(slot["room_id"] for slot in schedule))
-    rooms = {}
-    if room_ids:
-        room_list = await rooms_collection.find({"room_id": {"$in": room_ids}}).to_list(None)
-        rooms = {room["room_id"]: room for room in room_list}
-    # Get instructor details for all instructors in schedule
-    instructor_ids = list(set(slot["instructor_id"] for slot in schedule if "instructor_id" in slot))
-    instructors = {}
-    if instructor_ids:
-        instructor_list = await users_collection.find({"instructor_id": {"$in": instructor_ids}}).to_list(None)
-        instructors = {instructor["instructor_id"]: instructor for instructor in instructor_list}
+    # Get course, room and instructor details for everything in the schedule
+    snapshot = await catalog.get()
+    course_ids = list(set(slot["course_id"] for slot in schedule))
+    courses = {course["course_id"]: course for course in snapshot.courses(course_ids)}
+    rooms = {slot["room_id"]: snapshot.room(slot["room_id"]) or {} for slot in schedule}
+    instructors = {
+        slot["instructor_id"]: snapshot.instructor(slot["instructor_id"]) or {}
+        for slot in schedule if slot.get("instructor_id")
+    }
         
     # Organize schedule by day
     daily_schedule = {day: [] for day in DayOfWeek}
@@ -433,25 +842,16 @@ async def get_student_schedule(
         
         room_name = f"{room.get('building', '')}-{room.get('room_number', '')}" if room else 'Unknown'
         
-        time_slot = TimeSlotResponse(
-            slot_id=slot["slot_id"],
-            course_id=slot["course_id"],
-            course_name=course.get("name", slot["course_id"]),
-            day=slot["day"],
-            start_time=slot["start_time"],
-            end_time=slot["end_time"],
-            type=slot["type"],
-            room_id=slot["room_id"],
-            room_name=room_name,
-            instructor_id=slot.get("instructor_id"),
-            instructor_name=instructor.get("name") if instructor else None
+        time_slot = time_slot_response_row(
+            time_slot_row(slot, room_name, instructor.get("name") if instructor else None),
+            course.get("name", slot["course_id"])
         )
         
         daily_schedule[slot["day"]].append(time_slot)
         
     # Sort time slots by start time
     for day in daily_schedule:
-        daily_schedule[day].sort(key=lambda x: time_to_minutes(x.start_time))
+        daily_schedule[day].sort(key=lambda x: x["start_time"])
         
     # Calculate statistics
     total_courses = len(course_ids)
@@ -460,18 +860,18 @@ async def get_student_schedule(
     # Calculate weekly class hours
     weekly_hours = 0
     for slot in schedule:
-        start_mins = time_to_minutes(slot["start_time"])
-        end_mins = time_to_minutes(slot["end_time"])
+        start_mins, end_mins = slot_minutes(slot)
         weekly_hours += (end_mins - start_mins) / 60
         
-    return ScheduleResponse(
-        student_id=student_id,
-        semester=semester or "Current",
-        total_courses=total_courses,
-        total_credit_hours=total_credit_hours,
-        weekly_class_hours=weekly_hours,
-        schedule=daily_schedule
-    )
+    # ScheduleResponse shape, emitted without re-validating the rows
+    return EncodedJSONResponse(EncodedJSON({
+        "student_id": student_id,
+        "semester": semester or "Current",
+        "total_courses": total_courses,
+        "total_credit_hours": total_credit_hours,
+        "weekly_class_hours": float(weekly_hours),
+        "schedule": daily_schedule
+    }))
      
 @router.get("/schedule/conflicts", response_model=List[ScheduleConflictResponse])
 async def check_schedule_conflicts_endpoint(
@@ -486,67 +886,45 @@ async def check_schedule_conflicts_endpoint(
         
     student_id = str(user.user_id)
     
-    # Get student's current schedule
-    schedule = await schedules_collection.find({
-        "student_id": student_id
-    }).to_list(None)
-    
-    # Group by day
-    schedule_by_day = {}
-    for slot in schedule:
-        day = slot["day"]
-        if day not in schedule_by_day:
-            schedule_by_day[day] = []
-        schedule_by_day[day].append(slot)
+    # Sweep each day of the student's interval index once
+    student_schedule = await schedule_index.get(student_id)
+    snapshot = await catalog.get()
     
-    # Check for conflicts
     conflicts = []
-    
-    for day, slots in schedule_by_day.items():
-        # Sort by start time
-        slot.sort(key=lambda x: time_to_minutes(x["start_time"]))
-        
-        # Check each pair of slots
-        for i in range(len(slots)):
-            for j in range(i + 1, len(slots)):
-                slot1 = slots[i]
-                slot2 = slots[j]
-                
-                if check_time_overlap(
-                    slot1["start_time"], slot1["end_time"],
-                    slot2["start_time"], slot2["end_time"]
-                ):
-                    # Get course details
-                    course1 = await courses_collection.find_one({"course_id": slot1["course_id"]})
-                    course2 = await courses_collection.find_one({"course_id": slot2["course_id"]})
-                    
-                    conflicts.append(ScheduleConflictResponse(
-                        day=day,
-                        course1_id=slot1["course_id"],
-                        course1_name=course1["name"] if course1 else slot1["course_id"],
-                        course1_type=slot1["type"],
-                        course1_time=f"{slot1['start_time'].strftime('%H:%M')} - {slot1['end_time'].strftime('%H:%M')}",
-                        course2_id=slot2["course_id"],
-                        course2_name=course2["name"] if course2 else slot2["course_id"],
-                        course2_type=slot2["type"],
-                        course2_time=f"{slot2['start_time'].strftime('%H:%M')} - {slot2['end_time'].strftime('%H:%M')}"
-                    ))
+    for day, first, second in student_schedule.conflicts():
+        slot1, slot2 = first.slot, second.slot
+        course1 = snapshot.course(slot1["course_id"])
+        course2 = snapshot.course(slot2["course_id"])
+        
+        conflicts.append(ScheduleConflictResponse(
+            day=day,
+            course1_id=slot1["course_id"],
+            course1_name=course1["name"] if course1 else slot1["course_id"],
+            course1_type=slot1["type"],
+            course1_time=f"{format_minutes(first.start)} - {format_minutes(first.end)}",
+            course2_id=slot2["course_id"],
+            course2_name=course2["name"] if course2 else slot2["course_id"],
+            course2_type=slot2["type"],
+            course2_time=f"{format_minutes(second.start)} - {format_minutes(second.end)}"
+        ))
                     
     return conflicts
 
-@router.get("/schedule/recommendations", response_model=Dict[str, Dict[str, List[TimeSlotResponse]]])
-async def get_schedule_recommendations(
-    user: TokenData = Depends(get_current_active_user)
-):
-    """Get recommended time slots for courses that don't have time slots selected yet"""
-    if user.role != "student":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only students can get schedule recommendations"
-        )
-        
-    student_id = str(user.user_id)
-    
+async def open_section_ids(course_ids: List[str]) -> Set[str]:
+    """slot_ids of the courses' sections that still have a free seat, read from the live seat counters"""
+    slots = await time_slots_collection.find(
+        {"course_id": {"$in": course_ids}},
+        {"_id": 0, "slot_id": 1, "room_id": 1, "capacity": 1, "seats_taken": 1}
+    ).to_list(None)
+    slots = await ensure_seat_counters(slots)
+    return {slot["slot_id"] for slot in slots if slot.get("seats_taken", 0) < slot.get("capacity", 0)}
+
+async def open_requirements(student_id: str) -> Tuple[WeekSchedule, List[Requirement]]:
+    """
+    The student's current schedule, and one requirement per section type an
+    enrolled course offers and the student hasn't picked yet. Requirements keep
+    only the sections with a free seat that fit around the current schedule.
+    """
     # Get student's enrollments
     enrollments = await enrollments_collection.find({
         "student_id": student_id,
@@ -554,96 +932,121 @@ async def get_schedule_recommendations(
     }).to_list(None)
     
     # Get student's current schedule
-    schedule = await schedules_collection.find({
-        "student_id": student_id
-    }).to_list(None)
+    student_schedule = await schedule_index.get(student_id)
     
     # Find courses that need time slots
     scheduled_courses = {
         (slot["course_id"], slot["type"]) 
-        for slot in schedule
+        for slot in student_schedule.rows
     }
     
-    recommendations = {}
+    snapshot = await catalog.get()
+    course_ids = list(dict.fromkeys(
+        enrollment["course_id"] for enrollment in enrollments
+        if snapshot.course(enrollment["course_id"])
+    ))
     
-    for enrollment in enrollments:
-        course_id = enrollment["course_id"]
-        course = await courses_collection.find_one({"course_id": course_id})
-        
-        if not course:
-            continue
-        
-        # Check which slot types are needed
-        needed_types = []
-        
-        # Most courses need a lecture
-        if (course_id, TimeSlotType.LECTURE) not in scheduled_courses:
-            needed_types.append(TimeSlotType.LECTURE)
-        
-        # Check if course has lab or tutorial requirements
-        has_lab = await time_slots_collection.find_one({
-            "course_id": course_id,
-            "type": TimeSlotType.LAB
-        })
-        
-        has_tutorial = await time_slots_collection.find_one({
-            "course_id": course_id,
-            "type": TimeSlotType.TUTORIAL
-        })
-        
-        if has_lab and (course_id, TimeSlotType.LAB) not in scheduled_courses:
-            needed_types.append(TimeSlotType.LAB)
-        
-        if has_tutorial and (course_id, TimeSlotType.TUTORIAL) not in scheduled_courses:
-            needed_types.append(TimeSlotType.TUTORIAL)
-        
-        # If no slots needed, skip this course
-        if not needed_types:
-            continue
-        
-        # Get available time slots for each needed type
-        course_recommendations = {}
+    # Every section of every enrolled course, in one query for whatever isn't cached;
+    # the cached rows don't follow the seat counters, so full sections are read separately
+    course_slots = await get_courses_time_slots(course_ids)
+    open_ids = await open_section_ids(course_ids)
+    
+    requirements = [
+        build_requirement(student_schedule, course_id, slot_type, [
+            row for row in course_slots[(course_id, slot_type)] if row["slot_id"] in open_ids
+        ])
+        for course_id in course_ids
+        for slot_type in TimeSlotType
+        if course_slots[(course_id, slot_type)] and (course_id, slot_type) not in scheduled_courses
+    ]
+    return student_schedule, requirements
+
+async def recommendation_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """TimeSlotResponse-shaped dicts for time slot rows"""
+    snapshot = await catalog.get()
+    return [time_slot_response_row(row, snapshot.course(row["course_id"])["name"]) for row in rows]
+
+@router.get("/schedule/recommendations", response_model=Dict[str, Dict[str, List[TimeSlotResponse]]])
+async def get_schedule_recommendations(
+    user: TokenData = Depends(get_current_active_user)
+):
+    """
+    Get recommended time slots for courses that don't have time slots selected yet:
+    per course and section type, the sections with a free seat that fit the current schedule
+    """
+    if user.role != "student":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only students can get schedule recommendations"
+        )
         
-        for slot_type in needed_types:
-            available_slots = await get_available_time_slots(course_id, slot_type)
-            
-            # Filter out slots that conflict with existing schedule
-            non_conflicting_slots = []
-            
-            for slot in available_slots:
-                has_conflict = False
-                
-                for scheduled_slot in schedule:
-                    if (scheduled_slot["day"] == slot.day and 
-                        check_time_overlap(
-                            scheduled_slot["start_time"], scheduled_slot["end_time"],
-                            slot.start_time, slot.end_time
-                        )):
-                        has_conflict = True
-                        break
-                
-                if not has_conflict:
-                    non_conflicting_slots.append(TimeSlotResponse(
-                        slot_id=slot.slot_id,
-                        course_id=slot.course_id,
-                        course_name=course["name"],
-                        day=slot.day,
-                        start_time=slot.start_time,
-                        end_time=slot.end_time,
-                        type=slot.type,
-                        room_id=slot.room_id,
-                        room_name=slot.room_name,
-                        instructor_id=slot.instructor_id,
-                        instructor_name=slot.instructor_name
-                    ))
-            
-            if non_conflicting_slots:
-                course_recommendations[slot_type] = non_conflicting_slots
+    student_id = str(user.user_id)
+    
+    _, requirements = await open_requirements(student_id)
+    
+    # Courses and types with no section that fits are left out
+    recommendations: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    for requirement in requirements:
+        if requirement.sections:
+            recommendations.setdefault(requirement.course_id, {})[requirement.slot_type] = await recommendation_rows(
+                [section.row for section in requirement.sections]
+            )
+    
+    # Trusted rows; response_model only documents the shape
+    return EncodedJSONResponse(EncodedJSON(recommendations))
+
+@router.get("/schedule/recommendations/timetables", response_model=TimetableRecommendationsResponse)
+async def get_timetable_recommendations(
+    limit: int = 5,
+    earliest_start: time = time(9, 0),
+    user: TokenData = Depends(get_current_active_user)
+):
+    """
+    Recommend complete timetables: the best conflict-free choices of a section
+    with a free seat for every lecture, lab and tutorial the student still needs,
+    scored for fewer campus days, fewer idle gaps and no classes before earliest_start
+    """
+    if user.role != "student":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only students can get schedule recommendations"
+        )
+    
+    if limit < 1 or limit > MAX_RECOMMENDED_SCHEDULES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"limit must be between 1 and {MAX_RECOMMENDED_SCHEDULES}"
+        )
         
-        if course_recommendations:
-            recommendations[course_id] = course_recommendations
+    student_id = str(user.user_id)
+    
+    student_schedule, requirements = await open_requirements(student_id)
     
-    return recommendations
+    solver = ScheduleSolver(student_schedule, requirements, limit, time_to_minutes(earliest_start))
+    result = solver.solve()
+    
+    unschedulable: Dict[str, List[str]] = {}
+    for requirement in requirements:
+        if not requirement.sections:
+            unschedulable.setdefault(requirement.course_id, []).append(requirement.slot_type)
+    
+    recommendations = {
+        "schedules": [
+            {
+                "penalty": option.penalty,
+                "campus_days": option.campus_days,
+                "idle_minutes": option.idle_minutes,
+                "early_minutes": option.early_minutes,
+                "sections": await recommendation_rows(option.sections)
+            }
+            for option in result.options
+        ],
+        "unschedulable": unschedulable,
+        "exhaustive": result.exhaustive
+    }
+    
+    # Trusted rows; response_model only documents the shape
+    return EncodedJSONResponse(EncodedJSON(recommendations))
 
 @router.get("/admin/time-slots", response_model=List[Dict[str, Any]])
 async def get_all_time_slots(
@@ -666,21 +1069,22 @@ async def get_all_time_slots(
     time_slots = await time_slots_collection.find(query).to_list(None)
     
     # Get course, room, and instructor details
+    snapshot = await catalog.get()
     result = []
     for slot in time_slots:
-        course = await courses_collection.find_one({"course_id": slot["course_id"]})
-        room = await rooms_collection.find_one({"room_id": slot["room_id"]})
-        instructor = None
-        if slot.get("instructor_id"):
-            instructor = await users_collection.find_one({"instructor_id": slot["instructor_id"]})
+        course = snapshot.course(slot["course_id"])
+        room = snapshot.room(slot["room_id"])
+        instructor = snapshot.instructor(slot.get("instructor_id"))
+        
+        start, end = slot_minutes(slot)
         
         result.append({
             "slot_id": slot["slot_id"],
             "course_id": slot["course_id"],
             "course_name": course["name"] if course else "Unknown",
             "day": slot["day"],
-            "start_time": slot["start_time"].strftime("%H:%M"),
-            "end_time": slot["end_time"].strftime("%H:%M"),
+            "start_time": format_minutes(start),
+            "end_time": format_minutes(end),
             "type": slot["type"],
             "room_id": slot["room_id"],
             "room_name": f"{room['building']}-{room['room_number']}" if room else "Unknown",
@@ -711,14 +1115,15 @@ async def get_all_student_schedules(
     schedules = await schedules_collection.find(query).to_list(None)
     
     # Get student, course, room, and instructor details
+    snapshot = await catalog.get()
     result = []
     for schedule in schedules:
         student = await users_collection.find_one({"student_id": schedule["student_id"]})
-        course = await courses_collection.find_one({"course_id": schedule["course_id"]})
-        room = await rooms_collection.find_one({"room_id": schedule["room_id"]})
-        instructor = None
-        if schedule.get("instructor_id"):
-            instructor = await users_collection.find_one({"instructor_id": schedule["instructor_id"]})
+        course = snapshot.course(schedule["course_id"])
+        room = snapshot.room(schedule["room_id"])
+        instructor = snapshot.instructor(schedule.get("instructor_id"))
+        
+        start, end = slot_minutes(schedule)
         
         result.append({
             "student_id": schedule["student_id"],
@@ -726,8 +1131,8 @@ async def get_all_student_schedules(
             "course_id": schedule["course_id"],
             "course_name": course["name"] if course else "Unknown",
             "day": schedule["day"],
-            "start_time": schedule["start_time"].strftime("%H:%M"),
-            "end_time": schedule["end_time"].strftime("%H:%M"),
+            "start_time": format_minutes(start),
+            "end_time": format_minutes(end),
             "type": schedule["type"],
             "room_id": schedule["room_id"],
             "room_name": f"{room['building']}-{room['room_number']}" if room else "Unknown",
@@ -737,6 +1142,54 @@ async def get_all_student_schedules(
     
     return result
 
+def audit_conflicts(rows: List[Dict[str, Any]], owner_field: str) -> List[Dict[str, Any]]:
+    """Overlapping pairs of rows sharing owner_field, as ScheduleAuditConflict-shaped dicts"""
+    def section(row: Dict[str, Any]) -> Dict[str, Any]:
+        start, end = slot_minutes(row)
+        return {
+            "slot_id": row["slot_id"],
+            "course_id": row["course_id"],
+            "type": row["type"],
+            "time": f"{format_minutes(start)} - {format_minutes(end)}"
+        }
+    
+    return [
+        {"owner_id": str(first[owner_field]), "day": first["day"], "first": section(first), "second": section(second)}
+        for first, second in AuditRows(rows, owner_field).conflicts()
+    ]
+
+@router.get("/admin/schedule-audit", response_model=ScheduleAuditResponse)
+async def audit_schedules(user: TokenData = Depends(get_current_active_user)):
+    """
+    Every time conflict in the institution (admin only): students booked into
+    overlapping sections, and rooms or instructors booked into overlapping
+    time slots. Each collection is read once and checked in one sort and sweep.
+    """
+    if user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can audit schedules"
+        )
+    
+    # Only the fields the audit needs
+    fields = {
+        "_id": 0, "slot_id": 1, "course_id": 1, "type": 1, "day": 1,
+        "start_time": 1, "end_time": 1, "start_min": 1, "end_min": 1
+    }
+    schedules = await schedules_collection.find({}, {**fields, "student_id": 1}).to_list(None)
+    time_slots = await time_slots_collection.find({}, {**fields, "room_id": 1, "instructor_id": 1}).to_list(None)
+    
+    audit = {
+        "schedule_rows": len(schedules),
+        "time_slots": len(time_slots),
+        "student_conflicts": audit_conflicts(schedules, "student_id"),
+        "room_double_bookings": audit_conflicts(time_slots, "room_id"),
+        "instructor_double_bookings": audit_conflicts(time_slots, "instructor_id")
+    }
+    
+    # Trusted rows; response_model only documents the shape
+    return EncodedJSONResponse(EncodedJSON(audit))
+
 @router.get("/schedule/course/{course_id}", response_model=List[TimeSlotResponse])
 async def get_course_schedule(
     course_id: str,
@@ -758,7 +1211,8 @@ async def get_course_schedule(
             )
     
     # Get course details
-    course = await courses_collection.find_one({"course_id": course_id})
+    snapshot = await catalog.get()
+    course = snapshot.course(course_id)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -773,14 +1227,8 @@ async def get_course_schedule(
     # Get room and instructor details
     result = []
     for slot in time_slots:
-        room = await rooms_collection.find_one({"room_id": slot["room_id"]})
-        room_name = f"{room['building']}-{room['room_number']}" if room else "Unknown"
-        
-        instructor = None
-        instructor_name = None
-        if slot.get("instructor_id"):
-            instructor = await users_collection.find_one({"instructor_id": slot["instructor_id"]})
-            instructor_name = instructor["name"] if instructor else None
+        room_name = snapshot.room_name(slot["room_id"])
+        instructor_name = snapshot.instructor_name(slot.get("instructor_id"))
         
         result.append(TimeSlotResponse(
             slot_id=slot["slot_id"],
@@ -819,7 +1267,8 @@ async def get_time_slots_with_seats(
                 )
         
         # Get the course information
-        course = await courses_collection.find_one({"course_id": course_id})
+        snapshot = await catalog.get()
+        course = snapshot.course(course_id)
         if not course:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -827,62 +1276,40 @@ async def get_time_slots_with_seats(
             )
         
         # Check cache first
-        cache_key = f"time_slots_seats_{course_id}"
-        if (cache_key in SEAT_COUNT_CACHE["data"] and 
-            cache_key in SEAT_COUNT_CACHE["timestamp"] and
-            time_module.time() - SEAT_COUNT_CACHE["timestamp"][cache_key] < SEAT_COUNT_CACHE["ttl"]):
-            return SEAT_COUNT_CACHE["data"][cache_key]
+        cache_key = (course_id,)
+        cached = SEAT_COUNT_CACHE.get(cache_key)
+        if cached is not None:
+            return EncodedJSONResponse(cached)
         
         # Get all time slots for this course
         time_slots = await time_slots_collection.find({"course_id": course_id}).to_list(None)
         
-        # Get the room capacities
-        room_ids = list(set(slot["room_id"] for slot in time_slots if "room_id" in slot))
-        rooms = {
-            room["room_id"]: room 
-            for room in await rooms_collection.find({"room_id": {"$in": room_ids}}).to_list(None)
-        }
-        
-        # Get the enrollment counts for each time slot
-        # Count how many students have selected each time slot
-        slot_ids = [slot["slot_id"] for slot in time_slots]
-        enrolled_counts = {}
-        
-        for slot_id in slot_ids:
-            count = await schedules_collection.count_documents({"selected_slots": slot_id})
-            enrolled_counts[slot_id] = count
+        # Seat usage comes straight from the per-slot counters, backfilled in one batch where missing
+        time_slots = await ensure_seat_counters(time_slots)
+        for object_id in [object_id for object_id, slot_course in SLOT_COURSES.items() if slot_course == course_id]:
+            del SLOT_COURSES[object_id]
+        SLOT_COURSES.update((str(slot["_id"]), course_id) for slot in time_slots if "_id" in slot)
         
         # Prepare the response
         time_slots_with_seats = []
         
         for slot in time_slots:
             # Get room capacity
-            room = rooms.get(slot.get("room_id"))
-            room_capacity = room.get("capacity", 0) if room else 0
+            room = snapshot.room(slot.get("room_id"))
+            room_capacity = slot.get("capacity", room.get("capacity", 0) if room else 0)
             
             # Get room details
             room_name = f"{room.get('building', '')}-{room.get('room_number', '')}" if room else "Unknown"
             
             # Get instructor details
-            instructor = None
-            instructor_name = None
-            if slot.get("instructor_id"):
-                instructor = await users_collection.find_one({"instructor_id": slot["instructor_id"]})
-                instructor_name = instructor.get("name") if instructor else None
+            instructor_name = snapshot.instructor_name(slot.get("instructor_id"))
             
             # Calculate seats available
-            enrolled_count = enrolled_counts.get(slot["slot_id"], 0)
+            enrolled_count = slot.get("seats_taken", 0)
             seats_available = max(0, room_capacity - enrolled_count)
             
             # Format times for display
-            start_time = slot["start_time"]
-            end_time = slot["end_time"]
-            if isinstance(start_time, str):
-                start_time_parts = start_time.split(":")
-                start_time = f"{start_time_parts[0]}:{start_time_parts[1]}"
-            if isinstance(end_time, str):
-                end_time_parts = end_time.split(":")
-                end_time = f"{end_time_parts[0]}:{end_time_parts[1]}"
+            start_min, end_min = slot_minutes(slot)
             
             # Add to results
             time_slots_with_seats.append({
@@ -890,8 +1317,8 @@ async def get_time_slots_with_seats(
                 "course_id": slot["course_id"],
                 "course_name": course.get("name", "Unknown Course"),
                 "day": slot["day"],
-                "start_time": start_time,
-                "end_time": end_time,
+                "start_time": format_minutes(start_min),
+                "end_time": format_minutes(end_min),
                 "type": slot["type"],
                 "room_id": slot["room_id"],
                 "room_name": room_name,
@@ -919,13 +1346,54 @@ async def get_time_slots_with_seats(
         result["course_name"] = course.get("name", "Unknown Course")
         result["course_code"] = course.get("code", course_id)
         
-        # Update cache
-        SEAT_COUNT_CACHE["data"][cache_key] = result
-        SEAT_COUNT_CACHE["timestamp"][cache_key] = time_module.time()
+        # Cache the encoded body
+        encoded = EncodedJSON(result)
+        SEAT_COUNT_CACHE.set(cache_key, encoded)
         
-        return result
+        return EncodedJSONResponse(encoded)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error retrieving time slots with seats: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+def on_time_slot_change(event: Dict[str, Any]):
+    """A time slot write evicts that course's slot and seat caches; seat counter updates only the seats"""
+    document = event.get("document")
+    if event.get("operation") == "delete":
+        course_id = SLOT_COURSES.pop(event.get("document_id"), None)
+    elif document:
+        course_id = document.get("course_id")
+    else:
+        course_id = SLOT_COURSES.get(event.get("document_id"))
+    updated_fields = event.get("updated_fields")
+    seats_only = event.get("operation") == "update" and bool(updated_fields) and updated_fields.keys() <= SEAT_FIELDS
+    
+    if course_id:
+        if not seats_only:
+            TIME_SLOTS_CACHE.invalidate_prefix((course_id,))
+        SEAT_COUNT_CACHE.invalidate((course_id,))
+    elif seats_only:
+        # Seats of a slot never cached here; nothing to evict
+        return
+    else:
+        # Deletes and other updates of slots never cached here carry no course_id
+        TIME_SLOTS_CACHE.clear()
+        SEAT_COUNT_CACHE.clear()
+
+def on_reference_change(event: Dict[str, Any]):
+    """Course, room and instructor names are embedded in the cached slot responses"""
+    document = event.get("document")
+    if event["collection"] == "users":
+        if document and document.get("role") != "instructor":
+            return
+        # Updates come without the document; most are students' credit hour counters
+        if not document and not catalog.affects(CatalogKind.INSTRUCTORS, event):
+            return
+    TIME_SLOTS_CACHE.clear()
+    SEAT_COUNT_CACHE.clear()
+
+add_change_listener("time_slots", on_time_slot_change)
+add_change_listener("courses", on_reference_change)
+add_change_listener("rooms", on_reference_change)
+add_change_listener("users", on_reference_change)
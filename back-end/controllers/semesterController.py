@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from database import semester_settings_collection
 from models.SemesterSettings import SemesterSettings, SemesterUpdate, SemesterType, RegistrationPeriodSettings
 from helpers.auth import get_current_user, TokenData
+from helpers.semester_settings import semester_settings
 from datetime import datetime, timezone
 
 router = APIRouter()
@@ -27,6 +28,7 @@ async def get_current_semester():
             )
         )
         await semester_settings_collection.insert_one({"_id": SETTINGS_ID, **default_settings.model_dump()})
+        await semester_settings.refresh()
         return default_settings
     
     # Remove MONGODB _id field
@@ -69,8 +71,9 @@ async def update_semester_settings(settings_update: SemesterUpdate, user: TokenD
             {"$set": update_data}
         )
         
-    # Get updated settings
+    # Get updated settings and refresh the in-memory snapshot
     updated_settings = await semester_settings_collection.find_one({"_id": SETTINGS_ID})
+    await semester_settings.refresh()
     
     # Remove MONGODB _id field
     if "_id" in updated_settings:
@@ -108,8 +111,9 @@ async def update_registration_periods(
             {"$set": {"registration_periods": registration_periods.model_dump()}}
         )
     
-    # Get updated settings
+    # Get updated settings and refresh the in-memory snapshot
     updated_settings = await semester_settings_collection.find_one({"_id": SETTINGS_ID})
+    await semester_settings.refresh()
     
     # Remove MONGODB _id field
     if "_id" in updated_settings:
@@ -120,49 +124,22 @@ async def update_registration_periods(
 @router.get("/semester/registration/status")
 async def check_registration_status():
     """Check if course registration is currently allowed"""
-    settings = await semester_settings_collection.find_one({"_id": SETTINGS_ID})
+    snapshot = await semester_settings.get()
     
-    if not settings or "registration_periods" not in settings:
+    if not snapshot.registration_periods:
         return {
             "registration_allowed": False,
             "withdrawal_allowed": False,
             "message": "Registration period not configured"
         }
     
-    reg_periods = settings["registration_periods"]
     current_time = datetime.now(timezone.utc)
-    
-    # Check if registration is enabled and in valid time period
-    registration_allowed = reg_periods.get("registration_enabled", False)
-    if registration_allowed and reg_periods.get("registration_start_date") and reg_periods.get("registration_end_date"):
-        start_date = reg_periods["registration_start_date"]
-        end_date = reg_periods["registration_end_date"]
-        
-        # If dates are strings, convert them to datetime objects
-        if isinstance(start_date, str):
-            start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        if isinstance(end_date, str):
-            end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            
-        registration_allowed = start_date <= current_time <= end_date
-    
-    # Check if withdrawal is enabled and in valid time period
-    withdrawal_allowed = reg_periods.get("withdrawal_enabled", False)
-    if withdrawal_allowed and reg_periods.get("withdrawal_start_date") and reg_periods.get("withdrawal_end_date"):
-        start_date = reg_periods["withdrawal_start_date"]
-        end_date = reg_periods["withdrawal_end_date"]
-        
-        # If dates are strings, convert them to datetime objects
-        if isinstance(start_date, str):
-            start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        if isinstance(end_date, str):
-            end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            
-        withdrawal_allowed = start_date <= current_time <= end_date
+    registration_allowed, _ = snapshot.registration_status(current_time)
+    withdrawal_allowed, _ = snapshot.withdrawal_status(current_time)
     
     return {
         "registration_allowed": registration_allowed,
         "withdrawal_allowed": withdrawal_allowed,
         "current_time": current_time.isoformat(),
-        "registration_periods": reg_periods
+        "registration_periods": snapshot.registration_periods
     }
\ No newline at end of file
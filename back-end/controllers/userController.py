@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends,Body
-from database import users_collection, departments_collection
+from database import users_collection
 from models.Users import Student, Instructor, Admin, UpdateUserModel
 from helpers.helpers import get_next_id, serialize_doc
 from helpers.auth import get_current_user
+from helpers.catalog import catalog, CatalogKind
 from bcrypt import hashpw, gensalt
 
 router = APIRouter()
@@ -18,7 +19,7 @@ async def create_user(user: Student | Instructor | Admin):
         role = "instructor"
         
         #Validate if the department exists
-        department = await departments_collection.find_one({"department_id": user.department_id})
+        department = (await catalog.get()).department(user.department_id)
         
         if not department:
             raise HTTPException(status_code=400, detail="Invalid department ID. Please select a valid department")
@@ -36,6 +37,8 @@ async def create_user(user: Student | Instructor | Admin):
     user_data["password"] = hashpw(user_data["password"].encode(), gensalt()).decode()
     
     await users_collection.insert_one(user_data)
+    if role == "instructor":
+        await catalog.refresh(CatalogKind.INSTRUCTORS, user_id)
     return {"message": f"{role.capitalize} created successfully", "id":user_id}
 
 #user: dict = Depends(get_current_user)
@@ -46,10 +49,10 @@ async def get_users():
     #     raise HTTPException(status_code=403, detail="Unauthorized access")
     
     users = await users_collection.find().to_list(100)
+    snapshot = await catalog.get()
     for user in users:
         if "department_id" in user:
-            department = await departments_collection.find_one({"department_id": user["department_id"]}, {"_id": 0, "name": 1})
-            user["department_name"] = department["name"] if department else "Unknown"
+            user["department_name"] = snapshot.department_name(user["department_id"])
     
     return [serialize_doc(user) for user in users]
 
@@ -75,7 +78,7 @@ async def update_user(user_id: str, updated_data: UpdateUserModel = Body(...)):
     print(f"Updating user {user_id} with data: {update_fields}")
     
     if "department_id" in update_fields:
-        department = await departments_collection.find_one({"department_id": update_fields["department_id"]})
+        department = (await catalog.get()).department(update_fields["department_id"])
         if not department:
             raise HTTPException(status_code=400, detail="Invalid department ID. Please select a valid department")
     
@@ -92,6 +95,9 @@ async def update_user(user_id: str, updated_data: UpdateUserModel = Body(...)):
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    
+    # No-op unless the user is an instructor
+    await catalog.refresh(CatalogKind.INSTRUCTORS, user_id)
     return {"message": "User updated successfully"}
 
 # Delete User
@@ -109,6 +115,8 @@ async def delete_user(user_id: str):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    catalog.remove(CatalogKind.INSTRUCTORS, user_id)
+    
     return {"message": "User deleted successfully"}
 
 # Delete all users
@@ -124,6 +132,8 @@ async def delete_all_users(user: dict = Depends(get_current_user)):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="No users found to delete")
     
+    catalog.invalidate()
+    
     return {
         "message": f"Successfully deleted {result.deleted_count} users",
         "deleted_count": result.deleted_count
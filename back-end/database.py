@@ -28,6 +28,10 @@ rooms_collection = database.get_collection("Rooms")
 time_slots_collection = database.get_collection("TimeSlots")
 semester_settings_collection = database.get_collection("SemesterSettings")
 majors_collection = database.get_collection("Majors")
+idempotency_collection = database.get_collection("IdempotencyKeys")
+carts_collection = database.get_collection("RegistrationCarts")
+tickets_collection = database.get_collection("RegistrationTickets")
+waitlist_collection = database.get_collection("Waitlist")
 
 # Dictionary to store active change streams
 active_change_streams = {}
@@ -39,11 +43,22 @@ subscribers: Dict[str, Dict[str, Set[str]]] = {
     "time_slots": {},   # Map of course_id -> set of websocket_ids
     "users": {},        # Map of user_id -> set of websocket_ids
     "courses": {},      # Map of course_id -> set of websocket_ids
+    "registrations": {}, # Map of student_id -> set of websocket_ids (queued registration results)
+    "waitlist": {},      # Map of student_id -> set of websocket_ids (waitlist promotions)
+    "seats": {},         # Map of course_id -> set of websocket_ids (coalesced seat availability)
+}
+
+# Subscription topics fed by another collection's change stream
+topic_collections = {
+    "seats": "time_slots",
 }
 
 # WebSocket connection storage
 websocket_connections = {}
 
+# In-process listeners called for every change stream event: collection -> [callback(event)]
+change_listeners: Dict[str, List[Callable[[Dict[str, Any]], Any]]] = {}
+
 # Collection mapping for change streams
 collection_mapping = {
     "enrollments": enrollments_collection,
@@ -51,8 +66,18 @@ collection_mapping = {
     "time_slots": time_slots_collection,
     "users": users_collection,
     "courses": courses_collection,
+    "rooms": rooms_collection,
+    "departments": departments_collection,
+    "semester_settings": semester_settings_collection,
 }
 
+# Collections whose in-process listeners need the current document on update events.
+# Every other collection is watched without updateLookup, so its updates cost no extra read
+lookup_collections = {"enrollments", "schedules", "courses", "rooms", "departments"}
+
+# Fields never sent to WebSocket clients
+CLIENT_HIDDEN_FIELDS = {"password", "hashed_password"}
+
 # Function to create a change stream for a collection
 async def create_change_stream(collection_name: str):
     """Create a change stream to monitor changes to a specific collection"""
@@ -73,7 +98,11 @@ async def create_change_stream(collection_name: str):
         ]
         
         # Store the change stream in the dictionary
-        change_stream = collection.watch(pipeline)
+        # updateLookup attaches the current document to update events as well, where listeners need it
+        if collection_name in lookup_collections:
+            change_stream = collection.watch(pipeline, full_document="updateLookup")
+        else:
+            change_stream = collection.watch(pipeline)
         active_change_streams[collection_name] = change_stream
         
         # Start a background task to process the change stream
@@ -100,9 +129,9 @@ async def process_change_stream(collection_name: str, change_stream):
                 if operation_type == "update" and "updateDescription" in change:
                     updated_fields = change["updateDescription"].get("updatedFields", {})
                 
-                # For inserts and replacements, get the full document
+                # For inserts, replacements and looked-up updates, get the full document
                 full_document = None
-                if operation_type in ["insert", "replace"] and "fullDocument" in change:
+                if operation_type in ["insert", "replace", "update"] and change.get("fullDocument"):
                     full_document = change["fullDocument"]
                 
                 # Create a structured event to send to clients
@@ -119,8 +148,18 @@ async def process_change_stream(collection_name: str, change_stream):
                 if full_document:
                     event["document"] = full_document
                 
-                # Identify which subscribers should receive this update
-                await notify_subscribers(collection_name, event)
+                # Let in-process listeners (caches, indexes) react first
+                await notify_change_listeners(collection_name, event)
+                
+                # Identify which subscribers should receive this update. Clients get the
+                # document of inserts and replacements only, as before updateLookup,
+                # and never the hidden fields
+                client_event = {key: value for key, value in event.items() if key != "document"}
+                if full_document and operation_type != "update":
+                    client_event["document"] = {
+                        key: value for key, value in full_document.items() if key not in CLIENT_HIDDEN_FIELDS
+                    }
+                await notify_subscribers(collection_name, client_event)
                 
     except PyMongoError as e:
         logger.error(f"Error in change stream for {collection_name}: {str(e)}")
@@ -136,6 +175,22 @@ async def process_change_stream(collection_name: str, change_stream):
     except Exception as e:
         logger.error(f"Unexpected error in change stream for {collection_name}: {str(e)}")
 
+# Function to register an in-process change listener
+def add_change_listener(collection_name: str, callback: Callable[[Dict[str, Any]], Any]):
+    """Call callback(event) for every change stream event on a collection"""
+    change_listeners.setdefault(collection_name, []).append(callback)
+
+# Function to run the in-process listeners for a change event
+async def notify_change_listeners(collection_name: str, event: Dict[str, Any]):
+    """Run every listener registered for a collection, isolating failures"""
+    for callback in change_listeners.get(collection_name, []):
+        try:
+            result = callback(event)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.error(f"Error in change listener for {collection_name}: {str(e)}")
+
 # Function to notify subscribers of changes
 async def notify_subscribers(collection_name: str, event: Dict[str, Any]):
     """Notify relevant subscribers about a change event"""
@@ -190,12 +245,36 @@ async def notify_subscribers(collection_name: str, event: Dict[str, Any]):
         if websocket_id in websocket_connections:
             websocket = websocket_connections[websocket_id]
             try:
-                await websocket.send_text(json.dumps(event))
+                await websocket.send_text(json.dumps(event, default=str))
             except Exception as e:
                 logger.error(f"Error sending update to websocket {websocket_id}: {str(e)}")
                 # Clean up if the connection is dead
                 unregister_websocket(websocket_id)
 
+# Function to push an application event to the subscribers of one entity
+async def notify_entity_subscribers(collection_name: str, entity_id: str, event: Dict[str, Any]):
+    """Send an event to every WebSocket subscribed to collection_name/entity_id"""
+    await broadcast_text(collection_name, entity_id, json.dumps(event, default=str))
+
+# Function to fan one serialized message out to the subscribers of one entity
+async def broadcast_text(collection_name: str, entity_id: str, message: str):
+    """Send message to every WebSocket subscribed to collection_name/entity_id, concurrently"""
+    websocket_ids = [
+        websocket_id
+        for websocket_id in subscribers.get(collection_name, {}).get(entity_id, set())
+        if websocket_id in websocket_connections
+    ]
+    
+    async def send(websocket_id: str):
+        try:
+            await websocket_connections[websocket_id].send_text(message)
+        except Exception as e:
+            logger.error(f"Error sending update to websocket {websocket_id}: {str(e)}")
+            # Clean up if the connection is dead
+            unregister_websocket(websocket_id)
+    
+    await asyncio.gather(*(send(websocket_id) for websocket_id in websocket_ids))
+
 # Function to register a websocket connection
 def register_websocket(websocket_id: str, websocket):
     """Register a new WebSocket connection"""
@@ -231,8 +310,10 @@ def subscribe_to_updates(collection_name: str, entity_id: str, websocket_id: str
     subscribers[collection_name][entity_id].add(websocket_id)
     logger.info(f"WebSocket {websocket_id} subscribed to {collection_name}/{entity_id}")
     
-    # Ensure a change stream exists for this collection
-    asyncio.create_task(create_change_stream(collection_name))
+    # Ensure a change stream exists for this collection (or the collection behind this topic)
+    source_collection = topic_collections.get(collection_name, collection_name)
+    if source_collection in collection_mapping:
+        asyncio.create_task(create_change_stream(source_collection))
 
 # Function to unsubscribe a websocket from updates for a specific entity
 def unsubscribe_from_updates(collection_name: str, entity_id: str, websocket_id: str):
@@ -395,6 +476,76 @@ async def create_indexes():
             logger.error(f"Failed to create index time_slots.slot_id: {str(e)}")
             index_results["failed"].append("time_slots.slot_id")
         
+        # Room-overlap checks are numeric range queries on start minutes
+        try:
+            await time_slots_collection.create_index(
+                [("room_id", 1), ("day", 1), ("start_min", 1)],
+                name="room_day_start_min",
+                background=True
+            )
+            index_results["success"].append("time_slots.room_day_start_min")
+        except Exception as e:
+            logger.error(f"Failed to create index time_slots.room_day_start_min: {str(e)}")
+            index_results["failed"].append("time_slots.room_day_start_min")
+        
+        # At most one active enrollment per student and course, even under parallel registrations
+        try:
+            await enrollments_collection.create_index(
+                [("course_id", 1), ("student_id", 1)],
+                unique=True,
+                partialFilterExpression={"status": {"$in": ["Pending", "Completed"]}},
+                name="active_enrollment_unique",
+                background=True
+            )
+            index_results["success"].append("enrollments.active_enrollment_unique")
+        except Exception as e:
+            logger.error(f"Failed to create index enrollments.active_enrollment_unique: {str(e)}")
+            index_results["failed"].append("enrollments.active_enrollment_unique")
+        
+        # TTL index so stored idempotency keys expire after 24 hours
+        try:
+            await idempotency_collection.create_index("created_at", expireAfterSeconds=86400, background=True)
+            index_results["success"].append("idempotency_keys.created_at")
+        except Exception as e:
+            logger.error(f"Failed to create index idempotency_keys.created_at: {str(e)}")
+            index_results["failed"].append("idempotency_keys.created_at")
+        
+        # TTL index so registration carts expire 30 minutes after they were last touched
+        try:
+            await carts_collection.create_index("last_updated", expireAfterSeconds=1800, background=True)
+            index_results["success"].append("registration_carts.last_updated")
+        except Exception as e:
+            logger.error(f"Failed to create index registration_carts.last_updated: {str(e)}")
+            index_results["failed"].append("registration_carts.last_updated")
+        
+        # TTL index so registration tickets are dropped at their expires_at
+        try:
+            await tickets_collection.create_index("expires_at", expireAfterSeconds=0, background=True)
+            index_results["success"].append("registration_tickets.expires_at")
+        except Exception as e:
+            logger.error(f"Failed to create index registration_tickets.expires_at: {str(e)}")
+            index_results["failed"].append("registration_tickets.expires_at")
+        
+        # Waitlist queue order per section, and one waiting entry per student and section
+        try:
+            await waitlist_collection.create_index([("slot_id", 1), ("status", 1), ("position", 1)], background=True)
+            index_results["success"].append("waitlist.slot_id_status_position")
+        except Exception as e:
+            logger.error(f"Failed to create index waitlist.slot_id_status_position: {str(e)}")
+            index_results["failed"].append("waitlist.slot_id_status_position")
+        
+        try:
+            await waitlist_collection.create_index(
+                [("student_id", 1), ("slot_id", 1)],
+                unique=True,
+                partialFilterExpression={"status": "waiting"},
+                background=True
+            )
+            index_results["success"].append("waitlist.student_id_slot_id")
+        except Exception as e:
+            logger.error(f"Failed to create index waitlist.student_id_slot_id: {str(e)}")
+            index_results["failed"].append("waitlist.student_id_slot_id")
+        
         # Log results
         logger.info(f"Successfully created {len(index_results['success'])} indexes: {', '.join(index_results['success'])}")
         if index_results["failed"]:
@@ -0,0 +1,189 @@
+import logging
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from helpers.cache import cache
+from helpers.catalog import catalog
+from helpers.course_graph import get_course_graph, group_by_department
+from helpers.prerequisite_index import prerequisite_index
+
+logger = logging.getLogger(__name__)
+
+# StudentOverlay by (student_id,). The overlay follows the student's masks on every read,
+# so eviction only costs one eligibility pass over the catalog
+OVERLAY_CACHE = cache.register("tree_overlays", ttl=1800, max_entries=20000, max_bytes=16 * 1024 * 1024)
+
+class TreeSkeleton:
+    """
+    The student-independent part of /courses/tree/available for one
+    (catalog version, semester): node fields, the rendered parent -> children
+    layout and the department grouping, all keyed by course_id.
+    """
+
+    def __init__(self, version: int, semester: str):
+        self.version = version
+        self.semester = semester
+        self.order: List[str] = []
+        self.fields: Dict[str, Dict[str, Any]] = {}
+        self.children: Dict[str, List[str]] = {}
+        self.departments: List[Tuple[Dict[str, Any], List[str]]] = []
+
+    def render(self, overlay: "StudentOverlay") -> List[Dict[str, Any]]:
+        """Fresh response tree: skeleton fields merged with the student's status flags, O(V)"""
+        nodes = {}
+        for course_id in self.order:
+            can_enroll, enrollment_status = overlay.status(course_id)
+            nodes[course_id] = {
+                **self.fields[course_id],
+                "can_enroll": can_enroll,
+                "enrollment_status": enrollment_status
+            }
+        for course_id in self.order:
+            nodes[course_id]["children"] = [nodes[child_id] for child_id in self.children[course_id]]
+
+        return [
+            {**department, "courses": [nodes[course_id] for course_id in root_ids]}
+            for department, root_ids in self.departments
+        ]
+
+class StudentOverlay:
+    """
+    Per-student part of the available tree, as bitsets over the prerequisite
+    index positions: active and completed enrollments plus the courses whose
+    prerequisites are met. A few hundred bytes per student.
+    """
+
+    __slots__ = ("catalog_version", "active", "completed", "eligible")
+
+    def __init__(self, catalog_version: int, active: int, completed: int, eligible: int):
+        self.catalog_version = catalog_version
+        self.active = active
+        self.completed = completed
+        self.eligible = eligible
+
+    def __sizeof__(self) -> int:
+        # Slotted, so estimate_size can't walk it; the masks grow with the catalog
+        return object.__sizeof__(self) + sum(
+            sys.getsizeof(mask) for mask in (self.catalog_version, self.active, self.completed, self.eligible)
+        )
+
+    def status(self, course_id: str) -> Tuple[bool, str]:
+        """(can_enroll, enrollment_status) for one course"""
+        if prerequisite_index.has(self.completed, course_id):
+            return False, "completed"
+        if prerequisite_index.has(self.active, course_id):
+            return False, "enrolled"
+        if not prerequisite_index.has(self.eligible, course_id):
+            return False, "prerequisites_missing"
+        return True, "available"
+
+class AvailableTreeCache:
+    """
+    Skeletons are built once per (catalog version, semester) and shared by
+    every student. Overlays live in a bounded cache namespace and follow the
+    student's masks in the prerequisite index: when they move, only the dependents of newly (un)completed courses
+    are re-checked instead of rebuilding the student's tree.
+    """
+
+    def __init__(self):
+        self.skeletons: Dict[Tuple[int, str], TreeSkeleton] = {}
+
+    async def skeleton(self, semester: str) -> TreeSkeleton:
+        snapshot = await catalog.get()
+        graph = await get_course_graph()
+        key = (graph.version, semester)
+        skeleton = self.skeletons.get(key)
+        if skeleton is None:
+            # Skeletons of older catalog versions are never read again
+            self.skeletons = {k: v for k, v in self.skeletons.items() if k[0] == graph.version}
+            skeleton = self.build_skeleton(snapshot, graph, semester)
+            self.skeletons[key] = skeleton
+        return skeleton
+
+    def build_skeleton(self, snapshot, graph, semester: str) -> TreeSkeleton:
+        start_time = time.time()
+        skeleton = TreeSkeleton(graph.version, semester)
+
+        # Courses offered this semester, in catalog order
+        courses = [
+            course for course in snapshot.courses()
+            if semester in (course.get("semesters") or [])
+        ]
+
+        nodes = {}
+        for course in courses:
+            course_id = course["course_id"]
+            dept_id = course.get("department_id", "")
+            fields = {
+                "course_id": course_id,
+                "name": course["name"],
+                "department_id": dept_id,
+                "department_name": snapshot.department_name(dept_id),
+                "credit_hours": course["credit_hours"],
+                "description": course.get("description", ""),
+                "semesters": course.get("semesters", []),
+                "current_semester": semester
+            }
+            if course.get("prerequisites"):
+                fields["prerequisites"] = course["prerequisites"]
+            skeleton.order.append(course_id)
+            skeleton.fields[course_id] = fields
+            nodes[course_id] = {**fields, "children": []}
+
+        # Lay the tree out once; only the child IDs are kept
+        root_ids = [course["course_id"] for course in courses if not course.get("prerequisites")]
+        root_nodes = graph.render_forest(nodes, root_ids)
+        for course_id, node in nodes.items():
+            skeleton.children[course_id] = [child["course_id"] for child in node["children"]]
+
+        for department in group_by_department(root_nodes, {"current_semester": semester}):
+            root_ids = [course["course_id"] for course in department.pop("courses")]
+            skeleton.departments.append((department, root_ids))
+
+        logger.info(
+            f"Available tree skeleton for {semester} (catalog v{graph.version}) built "
+            f"in {time.time() - start_time:.2f}s"
+        )
+        return skeleton
+
+    async def overlay(self, student_id: str) -> StudentOverlay:
+        active, completed = await prerequisite_index.load(student_id)
+        version = prerequisite_index.catalog_version
+        overlay = OVERLAY_CACHE.get((student_id,))
+
+        if overlay is None or overlay.catalog_version != version:
+            eligible = prerequisite_index.mask_of(prerequisite_index.eligible_courses(completed))
+            overlay = StudentOverlay(version, active, completed, eligible)
+            OVERLAY_CACHE.set((student_id,), overlay)
+            return overlay
+
+        if overlay.completed != completed:
+            overlay.eligible = await self.update_eligible(overlay.eligible, overlay.completed ^ completed, completed)
+        overlay.active = active
+        overlay.completed = completed
+        return overlay
+
+    async def update_eligible(self, eligible: int, changed: int, completed: int) -> int:
+        """Re-check only the courses that depend on the changed completions"""
+        graph = await get_course_graph()
+        changed_ids = prerequisite_index.ids_of(changed)
+        if any(course_id not in graph.course_ids for course_id in changed_ids):
+            # Completions of courses no longer in the catalog; recompute everything
+            return prerequisite_index.mask_of(prerequisite_index.eligible_courses(completed))
+
+        for course_id in changed_ids:
+            for dependent_id in graph.dependents[course_id]:
+                bit = prerequisite_index.bit(dependent_id)
+                if prerequisite_index.is_eligible(dependent_id, completed):
+                    eligible |= bit
+                else:
+                    eligible &= ~bit
+        return eligible
+
+    async def render(self, student_id: str, semester: str) -> List[Dict[str, Any]]:
+        skeleton = await self.skeleton(semester)
+        overlay = await self.overlay(student_id)
+        return skeleton.render(overlay)
+
+available_tree = AvailableTreeCache()
@@ -0,0 +1,166 @@
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cache keys are tuples of hashable parts, e.g. ("2301000012", "Fall")
+CacheKey = Tuple[Hashable, ...]
+
+def estimate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """Approximate deep memory footprint of a cached value in bytes"""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += estimate_size(vars(value), _seen)
+    return size
+
+class CacheNamespace:
+    """
+    One bounded cache region with LRU + TTL eviction and a memory budget.
+    Entries are evicted when they expire, when the namespace holds more than
+    max_entries, or when the estimated size goes over max_bytes.
+    """
+
+    SWEEP_EVERY = 256  # Full expiry sweep every N writes
+
+    def __init__(self, name: str, ttl: float, max_entries: int, max_bytes: int):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[CacheKey, Tuple[Any, float, int]]" = OrderedDict()
+        self.bytes = 0
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey, default: Any = None) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at, _ = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return default
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: CacheKey, value: Any, ttl: Optional[float] = None):
+        if key in self.entries:
+            self._remove(key)
+
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            logger.warning(f"Cache value for {self.name}{key} exceeds the namespace budget; not cached")
+            return
+
+        self.entries[key] = (value, time.time() + (self.ttl if ttl is None else ttl), size)
+        self.bytes += size
+
+        self.writes += 1
+        if self.writes % self.SWEEP_EVERY == 0:
+            self.purge_expired()
+
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key: CacheKey) -> bool:
+        if key in self.entries:
+            self._remove(key)
+            return True
+        return False
+
+    def invalidate_prefix(self, prefix: CacheKey) -> int:
+        """Remove every key whose leading parts equal prefix"""
+        length = len(prefix)
+        keys = [key for key in self.entries if key[:length] == prefix]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def purge_expired(self):
+        now = time.time()
+        for key in [key for key, (_, expires_at, _) in self.entries.items() if expires_at <= now]:
+            self._remove(key)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: CacheKey):
+        _, _, size = self.entries.pop(key)
+        self.bytes -= size
+
+class CacheRegistry:
+    """Process-wide registry of named cache namespaces"""
+
+    def __init__(self):
+        self.namespaces: Dict[str, CacheNamespace] = {}
+
+    def register(
+        self,
+        namespace: str,
+        ttl: float,
+        max_entries: int = 10000,
+        max_bytes: int = 32 * 1024 * 1024
+    ) -> CacheNamespace:
+        """Create a namespace (or return the existing one with the same name)"""
+        if namespace not in self.namespaces:
+            self.namespaces[namespace] = CacheNamespace(namespace, ttl, max_entries, max_bytes)
+        return self.namespaces[namespace]
+
+    def get(self, namespace: str, key: CacheKey, default: Any = None) -> Any:
+        return self.namespaces[namespace].get(key, default)
+
+    def set(self, namespace: str, key: CacheKey, value: Any, ttl: Optional[float] = None):
+        self.namespaces[namespace].set(key, value, ttl)
+
+    def invalidate(self, namespace: str, key: CacheKey) -> bool:
+        return self.namespaces[namespace].invalidate(key)
+
+    def invalidate_prefix(self, namespace: str, prefix: CacheKey) -> int:
+        return self.namespaces[namespace].invalidate_prefix(prefix)
+
+    def clear(self, namespace: Optional[str] = None):
+        if namespace is None:
+            for region in self.namespaces.values():
+                region.clear()
+        else:
+            self.namespaces[namespace].clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: region.stats() for name, region in self.namespaces.items()}
+
+cache = CacheRegistry()
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from database import (
+    courses_collection,
+    departments_collection,
+    rooms_collection,
+    users_collection,
+    add_change_listener
+)
+
+logger = logging.getLogger(__name__)
+
+# Fields never kept in the in-memory instructor map
+INSTRUCTOR_PROJECTION = {"password": 0, "hashed_password": 0}
+
+class CatalogKind:
+    COURSES = "courses"
+    DEPARTMENTS = "departments"
+    ROOMS = "rooms"
+    INSTRUCTORS = "instructors"
+
+# kind -> (collection, key field, base query)
+CATALOG_SOURCES = {
+    CatalogKind.COURSES: (courses_collection, "course_id", {}),
+    CatalogKind.DEPARTMENTS: (departments_collection, "department_id", {}),
+    CatalogKind.ROOMS: (rooms_collection, "room_id", {}),
+    CatalogKind.INSTRUCTORS: (users_collection, "instructor_id", {"role": "instructor"}),
+}
+
+class CatalogSnapshot:
+    """
+    Process-wide, versioned copy of the reference data most requests need:
+    courses, departments, rooms and instructors, each indexed by its business key.
+    Loaded once, then patched document by document from change stream events
+    (or from the admin write paths via refresh()). Every applied change bumps
+    version, so derived structures can tell when they are stale.
+
+    Documents are shared between requests; callers must copy before mutating.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.version = 0
+        self.maps: Dict[str, Dict[str, Dict[str, Any]]] = {kind: {} for kind in CATALOG_SOURCES}
+        self.keys_by_object_id: Dict[str, Dict[str, str]] = {kind: {} for kind in CATALOG_SOURCES}
+        self.courses_by_department: Dict[str, List[str]] = {}
+        self.lock = asyncio.Lock()
+
+    async def get(self) -> "CatalogSnapshot":
+        if not self.loaded:
+            async with self.lock:
+                if not self.loaded:
+                    await self.load()
+        return self
+
+    async def load(self):
+        """(Re)load all four maps in one concurrent round"""
+        kinds = list(CATALOG_SOURCES)
+        results = await asyncio.gather(*(
+            CATALOG_SOURCES[kind][0].find(
+                CATALOG_SOURCES[kind][2],
+                INSTRUCTOR_PROJECTION if kind == CatalogKind.INSTRUCTORS else None
+            ).to_list(None)
+            for kind in kinds
+        ))
+
+        for kind, documents in zip(kinds, results):
+            key_field = CATALOG_SOURCES[kind][1]
+            self.maps[kind] = {doc[key_field]: doc for doc in documents if doc.get(key_field)}
+            self.keys_by_object_id[kind] = {
+                str(doc["_id"]): doc[key_field] for doc in documents if doc.get(key_field)
+            }
+        self.rebuild_department_index()
+
+        self.version += 1
+        self.loaded = True
+        logger.info(
+            "Catalog snapshot v%d loaded: %s",
+            self.version,
+            ", ".join(f"{len(self.maps[kind])} {kind}" for kind in kinds)
+        )
+
+    def rebuild_department_index(self):
+        by_department: Dict[str, List[str]] = {}
+        for course_id, course in self.maps[CatalogKind.COURSES].items():
+            by_department.setdefault(course.get("department_id"), []).append(course_id)
+        self.courses_by_department = by_department
+
+    # Lookups
+
+    def course(self, course_id: str) -> Optional[Dict[str, Any]]:
+        return self.maps[CatalogKind.COURSES].get(course_id)
+
+    def courses(self, course_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Courses for the given IDs (unknown IDs skipped), or every course"""
+        courses = self.maps[CatalogKind.COURSES]
+        if course_ids is None:
+            return list(courses.values())
+        return [courses[course_id] for course_id in course_ids if course_id in courses]
+
+    def department_courses(self, department_id: str) -> List[Dict[str, Any]]:
+        return self.courses(self.courses_by_department.get(department_id, []))
+
+    def department(self, department_id: str) -> Optional[Dict[str, Any]]:
+        return self.maps[CatalogKind.DEPARTMENTS].get(department_id)
+
+    def department_name(self, department_id: str, default: str = "Unknown") -> str:
+        department = self.department(department_id)
+        return department["name"] if department else default
+
+    def departments(self) -> List[Dict[str, Any]]:
+        return list(self.maps[CatalogKind.DEPARTMENTS].values())
+
+    def room(self, room_id: str) -> Optional[Dict[str, Any]]:
+        return self.maps[CatalogKind.ROOMS].get(room_id)
+
+    def room_name(self, room_id: str, default: str = "Unknown") -> str:
+        room = self.room(room_id)
+        return f"{room['building']}-{room['room_number']}" if room else default
+
+    def rooms(self) -> List[Dict[str, Any]]:
+        return list(self.maps[CatalogKind.ROOMS].values())
+
+    def instructor(self, instructor_id: str) -> Optional[Dict[str, Any]]:
+        return self.maps[CatalogKind.INSTRUCTORS].get(instructor_id) if instructor_id else None
+
+    def instructor_name(self, instructor_id: str, default: Optional[str] = None) -> Optional[str]:
+        instructor = self.instructor(instructor_id)
+        return instructor["name"] if instructor else default
+
+    # Updates
+
+    def apply(self, kind: str, document: Dict[str, Any]):
+        """Insert or replace one document"""
+        key_field = CATALOG_SOURCES[kind][1]
+        key = document.get(key_field)
+        object_id = str(document.get("_id"))
+        previous_key = self.keys_by_object_id[kind].get(object_id)
+
+        if kind == CatalogKind.INSTRUCTORS:
+            if document.get("role") != "instructor":
+                # Students and admins share the users collection; ignore them
+                if previous_key is None:
+                    return
+                key = None
+            else:
+                document = {k: v for k, v in document.items() if k not in INSTRUCTOR_PROJECTION}
+
+        # The business key itself may have changed
+        if previous_key and previous_key != key:
+            self.maps[kind].pop(previous_key, None)
+
+        if key:
+            self.maps[kind][key] = document
+            self.keys_by_object_id[kind][object_id] = key
+        else:
+            self.keys_by_object_id[kind].pop(object_id, None)
+
+        if kind == CatalogKind.COURSES:
+            self.rebuild_department_index()
+        self.version += 1
+
+    def remove(self, kind: str, key: str):
+        """Drop one document by its business key"""
+        document = self.maps[kind].pop(key, None)
+        if document is not None:
+            self.keys_by_object_id[kind].pop(str(document.get("_id")), None)
+            if kind == CatalogKind.COURSES:
+                self.rebuild_department_index()
+            self.version += 1
+
+    async def refresh(self, kind: str, key: str):
+        """Re-read one document after a local write (the change stream may not be running)"""
+        if not self.loaded:
+            return
+        collection, key_field, query = CATALOG_SOURCES[kind]
+        document = await collection.find_one({**query, key_field: key})
+        if document:
+            self.apply(kind, document)
+        else:
+            self.remove(kind, key)
+
+    def invalidate(self):
+        """Force a full reload on the next read"""
+        self.loaded = False
+
+    def affects(self, kind: str, event: Dict[str, Any]) -> bool:
+        """
+        Whether a change event may touch this kind. Only instructors can be told
+        apart without the document: users updates arrive without one, and most of
+        them are students' credit hour counters.
+        """
+        if kind != CatalogKind.INSTRUCTORS or event.get("document") or not self.loaded:
+            return True
+        if event.get("document_id") in self.keys_by_object_id[kind]:
+            return True
+        if event.get("operation") == "delete":
+            return False
+        # Someone may have become an instructor
+        updated_fields = event.get("updated_fields")
+        return not updated_fields or "role" in updated_fields
+
+    def on_change(self, kind: str, event: Dict[str, Any]):
+        if not self.loaded:
+            return
+        document = event.get("document")
+        if document:
+            self.apply(kind, document)
+        elif not self.affects(kind, event):
+            return
+        elif event.get("operation") == "delete":
+            key = self.keys_by_object_id[kind].get(event.get("document_id"))
+            if key:
+                self.remove(kind, key)
+        else:
+            # Update without a looked-up document; reload lazily
+            self.invalidate()
+
+catalog = CatalogSnapshot()
+
+add_change_listener("courses", lambda event: catalog.on_change(CatalogKind.COURSES, event))
+add_change_listener("departments", lambda event: catalog.on_change(CatalogKind.DEPARTMENTS, event))
+add_change_listener("rooms", lambda event: catalog.on_change(CatalogKind.ROOMS, event))
+add_change_listener("users", lambda event: catalog.on_change(CatalogKind.INSTRUCTORS, event))
@@ -0,0 +1,290 @@
+import logging
+from collections import deque
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from helpers.catalog import catalog
+
+logger = logging.getLogger(__name__)
+
+class CourseGraph:
+    """
+    Prerequisite graph for one catalog version, built once in O(V+E).
+
+    prerequisites[c] lists the (known) prerequisites of c and dependents[p]
+    lists the courses that require p, both in catalog order so rendered trees
+    keep the same sibling order as before. Transitive closures are memoized
+    per course, so repeated chain queries share work across a request and
+    across requests until the catalog changes.
+    """
+
+    def __init__(self, courses: Iterable[Dict[str, Any]], version: int):
+        self.version = version
+        self.order: List[str] = []
+        self.prerequisites: Dict[str, List[str]] = {}
+        self.dependents: Dict[str, List[str]] = {}
+
+        raw_prerequisites = {}
+        for course in courses:
+            course_id = course["course_id"]
+            self.order.append(course_id)
+            self.dependents[course_id] = []
+            raw_prerequisites[course_id] = course.get("prerequisites") or []
+
+        self.course_ids: FrozenSet[str] = frozenset(self.order)
+
+        # Reverse (course -> prerequisites) and forward (prerequisite -> dependents) adjacency
+        for course_id in self.order:
+            prerequisites = list(dict.fromkeys(
+                prereq_id for prereq_id in raw_prerequisites[course_id] if prereq_id in self.course_ids
+            ))
+            self.prerequisites[course_id] = prerequisites
+            for prereq_id in prerequisites:
+                self.dependents[prereq_id].append(course_id)
+
+        self.topological_order, self.cyclic = self.sort_topologically()
+        self.ancestor_memo: Dict[str, FrozenSet[str]] = {}
+        self.descendant_memo: Dict[str, FrozenSet[str]] = {}
+        self.scc_cache: Optional[List[List[str]]] = None
+
+    def sort_topologically(self):
+        """Kahn's algorithm, ties broken by catalog order; returns (order, courses left in cycles)"""
+        in_degree = {course_id: len(self.prerequisites[course_id]) for course_id in self.order}
+        queue = deque(course_id for course_id in self.order if in_degree[course_id] == 0)
+        order = []
+        while queue:
+            course_id = queue.popleft()
+            order.append(course_id)
+            for dependent_id in self.dependents[course_id]:
+                in_degree[dependent_id] -= 1
+                if in_degree[dependent_id] == 0:
+                    queue.append(dependent_id)
+
+        cyclic = {course_id for course_id, degree in in_degree.items() if degree > 0}
+        if cyclic:
+            logger.warning(f"Prerequisite cycle involving {len(cyclic)} courses")
+        return order, cyclic
+
+    # Transitive closures
+
+    def ancestors(self, course_id: str) -> FrozenSet[str]:
+        """Every course that must be completed before course_id"""
+        return self.closure(course_id, self.prerequisites, self.ancestor_memo)
+
+    def descendants(self, course_id: str) -> FrozenSet[str]:
+        """Every course that (transitively) requires course_id"""
+        return self.closure(course_id, self.dependents, self.descendant_memo)
+
+    def closure(self, course_id: str, adjacency: Dict[str, List[str]], memo: Dict[str, FrozenSet[str]]) -> FrozenSet[str]:
+        if course_id not in self.course_ids:
+            return frozenset()
+        if course_id in memo:
+            return memo[course_id]
+        if self.cyclic:
+            # Post-order memoization needs a DAG; fall back to a plain search
+            return self.reachable(course_id, adjacency)
+
+        # Iterative post-order DFS: a node's closure is the union of its neighbours' closures
+        stack = [(course_id, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node in memo:
+                continue
+            if expanded:
+                result: Set[str] = set()
+                for neighbour in adjacency[node]:
+                    result.add(neighbour)
+                    result |= memo[neighbour]
+                memo[node] = frozenset(result)
+            else:
+                stack.append((node, True))
+                stack.extend((neighbour, False) for neighbour in adjacency[node] if neighbour not in memo)
+        return memo[course_id]
+
+    def reachable(self, course_id: str, adjacency: Dict[str, List[str]]) -> FrozenSet[str]:
+        seen: Set[str] = set()
+        queue = deque(adjacency[course_id])
+        while queue:
+            node = queue.popleft()
+            if node not in seen:
+                seen.add(node)
+                queue.extend(adjacency[node])
+        return frozenset(seen)
+
+    # Cycle detection
+
+    def strongly_connected_components(self) -> List[List[str]]:
+        """
+        Tarjan's SCC over the whole graph in one O(V+E) pass (iterative, so deep
+        chains don't hit the recursion limit). Only components that form a cycle
+        are returned: more than one course, or a course that requires itself.
+        """
+        if self.scc_cache is not None:
+            return self.scc_cache
+
+        index_of: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        components: List[List[str]] = []
+        position = {course_id: i for i, course_id in enumerate(self.order)}
+        counter = 0
+
+        for start in self.order:
+            if start in index_of:
+                continue
+            work = [(start, iter(self.prerequisites[start]))]
+            index_of[start] = lowlink[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack.add(start)
+
+            while work:
+                node, neighbours = work[-1]
+                advanced = False
+                for neighbour in neighbours:
+                    if neighbour not in index_of:
+                        index_of[neighbour] = lowlink[neighbour] = counter
+                        counter += 1
+                        stack.append(neighbour)
+                        on_stack.add(neighbour)
+                        work.append((neighbour, iter(self.prerequisites[neighbour])))
+                        advanced = True
+                        break
+                    if neighbour in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[neighbour])
+                if advanced:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in self.prerequisites[node]:
+                        components.append(sorted(component, key=position.__getitem__))
+
+        self.scc_cache = components
+        return components
+
+    def cycle_path(self, component: List[str]) -> List[str]:
+        """One concrete cycle inside a strongly connected component, e.g. [A, B, C, A]"""
+        members = set(component)
+        start = component[0]
+        parents: Dict[str, Optional[str]] = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for prereq_id in self.prerequisites[node]:
+                if prereq_id == start:
+                    path = [node]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    return path[::-1] + [start]
+                if prereq_id in members and prereq_id not in parents:
+                    parents[prereq_id] = node
+                    queue.append(prereq_id)
+        return component
+
+    def find_path(self, source: str, target: str, adjacency: Dict[str, List[str]]) -> Optional[List[str]]:
+        """Shortest path from source to target along adjacency, or None; stops as soon as target is reached"""
+        if source not in self.course_ids or target not in self.course_ids:
+            return None
+        parents: Dict[str, Optional[str]] = {source: None}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                path = [node]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                return path[::-1]
+            for neighbour in adjacency[node]:
+                if neighbour not in parents:
+                    parents[neighbour] = node
+                    queue.append(neighbour)
+        return None
+
+    def cycle_if_added(self, course_id: str, prereq_id: str) -> Optional[List[str]]:
+        """
+        The cycle that making prereq_id a prerequisite of course_id would close, or None.
+        The new edge closes a cycle exactly when course_id is already (transitively)
+        a prerequisite of prereq_id. Uses the memoized closure when it is available,
+        otherwise searches only the part of the graph above prereq_id.
+        """
+        if course_id == prereq_id:
+            return [course_id, course_id]
+        memo = self.ancestor_memo.get(prereq_id)
+        if memo is not None and course_id not in memo:
+            return None
+        # prereq_id -> ... -> course_id along prerequisites, then the new edge back
+        path = self.find_path(prereq_id, course_id, self.prerequisites)
+        return [course_id] + path if path else None
+
+    # Tree rendering
+
+    def render_forest(
+        self,
+        nodes: Dict[str, Dict[str, Any]],
+        roots: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Attach the given node dicts (each with a "children" list) into a forest.
+        A course is placed once, under the first parent that reaches it in
+        depth-first order from the roots. By default the roots are the nodes
+        with no prerequisite among the nodes. Iterative, O(V+E).
+        """
+        if roots is None:
+            roots = [
+                course_id for course_id in nodes
+                if not any(prereq_id in nodes for prereq_id in self.prerequisites.get(course_id, []))
+            ]
+
+        placed = set(roots)
+        for root_id in roots:
+            stack = [(nodes[root_id], iter(self.dependents.get(root_id, [])))]
+            while stack:
+                node, children = stack[-1]
+                for child_id in children:
+                    if child_id in nodes and child_id not in placed:
+                        placed.add(child_id)
+                        child = nodes[child_id]
+                        node["children"].append(child)
+                        stack.append((child, iter(self.dependents.get(child_id, []))))
+                        break
+                else:
+                    stack.pop()
+
+        return [nodes[root_id] for root_id in roots]
+
+_graph: Optional[CourseGraph] = None
+
+async def get_course_graph() -> CourseGraph:
+    """Graph for the current catalog snapshot, rebuilt only when the catalog version moves"""
+    global _graph
+    snapshot = await catalog.get()
+    if _graph is None or _graph.version != snapshot.version:
+        _graph = CourseGraph(snapshot.courses(), snapshot.version)
+    return _graph
+
+def group_by_department(roots: List[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Group rendered root nodes by department, keeping first-seen order"""
+    departments: Dict[str, Dict[str, Any]] = {}
+    for course in roots:
+        dept_id = course["department_id"]
+        if dept_id not in departments:
+            departments[dept_id] = {
+                "department_id": dept_id,
+                "department_name": course["department_name"],
+                "courses": [],
+                **(extra or {})
+            }
+        departments[dept_id]["courses"].append(course)
+    return list(departments.values())
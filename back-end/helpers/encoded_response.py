@@ -0,0 +1,77 @@
+import gzip
+import json
+import sys
+from typing import Any, Mapping, Optional
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+
+def dumps(content: Any) -> bytes:
+    """JSON-encode content the way FastAPI would, via orjson when it is installed"""
+    if orjson is not None:
+        # Anything orjson can't encode natively (models, ObjectIds) goes through FastAPI's encoder;
+        # enum keys (e.g. DayOfWeek) are allowed like FastAPI allows them
+        return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(jsonable_encoder(content), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+class EncodedJSON:
+    """
+    A response body encoded once, plus its gzip form once a client asks for it.
+    Stored in the data caches in place of the Python object graph, so a
+    cache hit skips response_model validation, JSON encoding and compression.
+    """
+
+    __slots__ = ("body", "gzipped")
+
+    def __init__(self, content: Any):
+        self.body = dumps(content)
+        self.gzipped: Optional[bytes] = None
+
+    def __sizeof__(self) -> int:
+        # Slotted, so estimate_size can't walk it; count the bodies here for the cache byte budgets
+        size = object.__sizeof__(self) + sys.getsizeof(self.body)
+        if self.gzipped is not None:
+            size += sys.getsizeof(self.gzipped)
+        return size
+
+    @property
+    def compressible(self) -> bool:
+        return len(self.body) >= GZIP_MIN_SIZE
+
+    def gzip_body(self) -> bytes:
+        if self.gzipped is None:
+            self.gzipped = gzip.compress(self.body, GZIP_LEVEL)
+        return self.gzipped
+
+def accepts_gzip(scope) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == b"accept-encoding":
+            return b"gzip" in value.lower()
+    return False
+
+class EncodedJSONResponse(Response):
+    """Sends an EncodedJSON as is, choosing the gzip body when the client accepts it"""
+
+    media_type = "application/json"
+
+    def __init__(self, encoded: EncodedJSON, status_code: int = 200, headers: Optional[Mapping[str, str]] = None):
+        self.encoded = encoded
+        super().__init__(content=encoded.body, status_code=status_code, headers=headers)
+        if encoded.compressible:
+            self.headers["Vary"] = "Accept-Encoding"
+
+    async def __call__(self, scope, receive, send):
+        if self.encoded.compressible and accepts_gzip(scope):
+            self.body = self.encoded.gzip_body()
+            self.headers["Content-Encoding"] = "gzip"
+            self.headers["Content-Length"] = str(len(self.body))
+        await super().__call__(scope, receive, send)
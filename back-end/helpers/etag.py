@@ -0,0 +1,37 @@
+import hashlib
+import uuid
+from typing import Any, Optional
+
+from fastapi import Response
+
+# Version counters are per process; salting with an instance ID keeps another
+# worker's tag for the same counter value from ever matching here
+INSTANCE_ID = uuid.uuid4().hex
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag for a response fully determined by parts, e.g. ("courses", catalog.version)"""
+    digest = hashlib.blake2b(repr((INSTANCE_ID,) + parts).encode("utf-8"), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def check_etag(response: Response, if_none_match: Optional[str], etag: str, private: bool = False) -> Optional[Response]:
+    """
+    Tag the outgoing response and return a 304 if the client already has this
+    version, so the caller can skip building and serializing the body.
+    """
+    headers = {
+        "ETag": etag,
+        # Cache, but revalidate on every use
+        "Cache-Control": "private, no-cache" if private else "no-cache"
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pymongo.errors import DuplicateKeyError
+
+from database import idempotency_collection
+from helpers.cache import cache
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = 86400  # Keys are remembered for 24 hours (TTL index on created_at)
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# An in-progress claim older than this is treated as abandoned (crashed worker) and taken over
+IDEMPOTENCY_LEASE = timedelta(seconds=60)
+
+# Completed responses, keyed by (record_id,)
+IDEMPOTENCY_CACHE = cache.register("idempotency", ttl=IDEMPOTENCY_TTL, max_entries=50000, max_bytes=32 * 1024 * 1024)
+
+class IdempotencyStatus:
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+
+def request_fingerprint(payload: Any) -> str:
+    """Stable hash of a request body, used to reject a key reused for a different request"""
+    encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def replay_response(record: dict) -> JSONResponse:
+    return JSONResponse(
+        status_code=record["status_code"],
+        content=record["body"],
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+def check_fingerprint(record: dict, fingerprint: str):
+    if record.get("fingerprint") != fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{IDEMPOTENCY_HEADER} was already used for a different request"
+        )
+
+def claim_expired(record: dict, now: datetime) -> bool:
+    claimed_at = record.get("claimed_at") or record.get("created_at")
+    if claimed_at is None:
+        return True
+    # Motor returns naive UTC datetimes unless the client is tz_aware
+    if claimed_at.tzinfo is None:
+        claimed_at = claimed_at.replace(tzinfo=timezone.utc)
+    return now - claimed_at > IDEMPOTENCY_LEASE
+
+async def begin(record_id: str, fingerprint: str, claim: str) -> Optional[JSONResponse]:
+    """
+    Claim an idempotency key for the request identified by claim.
+    Returns the stored response for a replay, None if the caller should run the request.
+    Raises 409 while another request with the same key is still running.
+    """
+    now = datetime.now(timezone.utc)
+    cached = IDEMPOTENCY_CACHE.get((record_id,))
+    if cached is not None:
+        check_fingerprint(cached, fingerprint)
+        return replay_response(cached)
+
+    try:
+        await idempotency_collection.insert_one({
+            "_id": record_id,
+            "status": IdempotencyStatus.IN_PROGRESS,
+            "fingerprint": fingerprint,
+            "claim": claim,
+            "claimed_at": now,
+            "created_at": now
+        })
+        return None
+    except DuplicateKeyError:
+        pass
+
+    record = await idempotency_collection.find_one({"_id": record_id})
+    if not record:
+        # Expired or abandoned between the insert and the lookup; treat as new
+        return await begin(record_id, fingerprint, claim)
+
+    check_fingerprint(record, fingerprint)
+    if record["status"] != IdempotencyStatus.COMPLETED:
+        if claim_expired(record, now):
+            # The previous claimant never finished; take the key over unless someone else just did
+            result = await idempotency_collection.update_one(
+                {"_id": record_id, "status": IdempotencyStatus.IN_PROGRESS, "claim": record.get("claim")},
+                {"$set": {"claim": claim, "claimed_at": now}}
+            )
+            if result.modified_count:
+                return None
+            return await begin(record_id, fingerprint, claim)
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed"
+        )
+
+    IDEMPOTENCY_CACHE.set((record_id,), record)
+    return replay_response(record)
+
+async def complete(record_id: str, fingerprint: str, claim: str, status_code: int, body: Any):
+    """Store the final response for a key, unless the claim was taken over meanwhile"""
+    record = {
+        "status": IdempotencyStatus.COMPLETED,
+        "fingerprint": fingerprint,
+        "status_code": status_code,
+        "body": body
+    }
+    result = await idempotency_collection.update_one({"_id": record_id, "claim": claim}, {"$set": record})
+    if result.matched_count:
+        IDEMPOTENCY_CACHE.set((record_id,), record)
+
+async def abandon(record_id: str, claim: str):
+    """Release a key after a server error or cancellation so the client can retry"""
+    await idempotency_collection.delete_one(
+        {"_id": record_id, "status": IdempotencyStatus.IN_PROGRESS, "claim": claim}
+    )
+
+async def run_idempotent(
+    idempotency_key: Optional[str],
+    scope: str,
+    payload: Any,
+    handler: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Run handler at most once per (scope, Idempotency-Key).
+    Successful responses and 4xx errors are stored and replayed verbatim;
+    5xx errors release the key so a retry runs the request again.
+    """
+    if not idempotency_key:
+        return await handler()
+
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} is too long")
+
+    record_id = f"{scope}:{idempotency_key}"
+    fingerprint = request_fingerprint(payload)
+    claim = uuid.uuid4().hex
+
+    replay = await begin(record_id, fingerprint, claim)
+    if replay is not None:
+        return replay
+
+    try:
+        result = await handler()
+    except HTTPException as e:
+        if e.status_code < 500:
+            await complete(record_id, fingerprint, claim, e.status_code, {"detail": e.detail})
+        else:
+            await abandon(record_id, claim)
+        raise
+    except BaseException:
+        # Includes cancellation (a disconnected client), which is not an Exception
+        await abandon(record_id, claim)
+        raise
+
+    if isinstance(result, Response):
+        await complete(record_id, fingerprint, claim, result.status_code, json.loads(result.body))
+    else:
+        await complete(record_id, fingerprint, claim, 200, jsonable_encoder(result))
+    return result
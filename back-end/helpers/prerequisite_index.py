@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from database import enrollments_collection, add_change_listener
+from models.Enrollments import EnrollmentStatus
+from helpers.catalog import catalog
+from helpers.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# (active_mask, completed_mask) by (student_id,). Kept current from local writes and
+# enrollment change events; the TTL bounds how stale a student's masks can get when
+# another process writes without a change stream
+STUDENT_MASKS_CACHE = cache.register("student_masks", ttl=300, max_entries=20000, max_bytes=16 * 1024 * 1024)
+
+class PrerequisiteIndex:
+    """
+    Bitset index for prerequisite eligibility.
+
+    Every course_id gets a dense, append-only bit position. Each course's
+    prerequisites and each student's completed / active enrollments are stored
+    as Python int bitsets, so checking one course is a single AND/compare:
+        prereq_mask & ~completed_mask == 0
+    The catalog masks are rebuilt whenever the catalog snapshot version moves.
+    The student masks live in a bounded cache namespace and are kept current
+    from enrollment change events.
+    """
+
+    def __init__(self):
+        self.positions: Dict[str, int] = {}
+        self.course_ids: List[str] = []
+        self.prereq_masks: Dict[str, int] = {}
+        self.catalog_version: Optional[int] = None
+        self.lock = asyncio.Lock()
+
+    def bit(self, course_id: str) -> int:
+        """Bit for a course, assigning the next position on first sight"""
+        position = self.positions.get(course_id)
+        if position is None:
+            position = len(self.course_ids)
+            self.positions[course_id] = position
+            self.course_ids.append(course_id)
+        return 1 << position
+
+    def mask_of(self, course_ids) -> int:
+        mask = 0
+        for course_id in course_ids:
+            mask |= self.bit(course_id)
+        return mask
+
+    def ids_of(self, mask: int) -> List[str]:
+        """Course IDs whose bits are set in mask"""
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(self.course_ids[low.bit_length() - 1])
+            mask ^= low
+        return result
+
+    async def ensure_catalog(self):
+        """Build the per-course prerequisite masks if they are missing or stale"""
+        snapshot = await catalog.get()
+        if self.catalog_version == snapshot.version:
+            return
+        async with self.lock:
+            if self.catalog_version == snapshot.version:
+                return
+            version = snapshot.version
+            self.prereq_masks = {
+                course["course_id"]: self.mask_of(course.get("prerequisites") or [])
+                for course in snapshot.courses()
+            }
+            self.catalog_version = version
+            logger.info(f"Prerequisite index built for {len(self.prereq_masks)} courses")
+
+    async def get_student_masks(self, student_id: str) -> Tuple[int, int]:
+        """(active_mask, completed_mask) for a student; loaded with one query on first use"""
+        masks = STUDENT_MASKS_CACHE.get((student_id,))
+        if masks is not None:
+            return masks
+
+        enrollments = await enrollments_collection.find(
+            {
+                "student_id": student_id,
+                "status": {"$in": [EnrollmentStatus.PENDING, EnrollmentStatus.COMPLETED]}
+            },
+            {"course_id": 1, "status": 1, "_id": 0}
+        ).to_list(None)
+
+        active = self.mask_of(e["course_id"] for e in enrollments)
+        completed = self.mask_of(
+            e["course_id"] for e in enrollments if e["status"] == EnrollmentStatus.COMPLETED
+        )
+        STUDENT_MASKS_CACHE.set((student_id,), (active, completed))
+        return active, completed
+
+    async def load(self, student_id: str) -> Tuple[int, int]:
+        """Make sure the catalog masks are built and return the student's masks"""
+        await self.ensure_catalog()
+        return await self.get_student_masks(student_id)
+
+    def has(self, mask: int, course_id: str) -> bool:
+        position = self.positions.get(course_id)
+        return position is not None and bool(mask >> position & 1)
+
+    def missing_mask(self, course_id: str, completed_mask: int) -> int:
+        """Prerequisite bits of a course that are not in completed_mask"""
+        return self.prereq_masks.get(course_id, 0) & ~completed_mask
+
+    def is_eligible(self, course_id: str, completed_mask: int) -> bool:
+        return self.missing_mask(course_id, completed_mask) == 0
+
+    def eligible_courses(self, completed_mask: int) -> Set[str]:
+        """Every catalog course whose prerequisites are all in completed_mask, in one pass"""
+        return {
+            course_id for course_id, mask in self.prereq_masks.items()
+            if mask & ~completed_mask == 0
+        }
+
+    async def missing_prerequisites(self, student_id: str, course_id: str) -> List[str]:
+        """Prerequisites of course_id the student has not completed"""
+        _, completed = await self.load(student_id)
+        return self.ids_of(self.missing_mask(course_id, completed))
+
+    def apply_enrollment(self, document: Dict[str, Any]):
+        """Fold one enrollment document into the student's masks"""
+        student_id = document.get("student_id")
+        course_id = document.get("course_id")
+        masks = STUDENT_MASKS_CACHE.get((student_id,)) if student_id else None
+        if masks is None:
+            return
+
+        status = document.get("status")
+        active, completed = masks
+        if status == EnrollmentStatus.PENDING:
+            active |= self.bit(course_id)
+        elif status == EnrollmentStatus.COMPLETED:
+            active |= self.bit(course_id)
+            completed |= self.bit(course_id)
+        else:
+            # Withdrawals can't be un-set safely if other records exist; reload lazily
+            self.invalidate_student(student_id)
+            return
+        STUDENT_MASKS_CACHE.set((student_id,), (active, completed))
+
+    def invalidate_student(self, student_id: str):
+        STUDENT_MASKS_CACHE.invalidate((student_id,))
+
+    def invalidate_catalog(self):
+        self.catalog_version = None
+
+    def on_enrollment_change(self, event: Dict[str, Any]):
+        document = event.get("document")
+        if document:
+            self.apply_enrollment(document)
+        elif event.get("operation") == "delete":
+            # Deletes carry no student_id; drop everything and reload lazily
+            STUDENT_MASKS_CACHE.clear()
+
+prerequisite_index = PrerequisiteIndex()
+
+add_change_listener("enrollments", prerequisite_index.on_enrollment_change)
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import os
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from helpers.exceptions import EnrollmentError
+from database import tickets_collection, notify_entity_subscribers
+
+logger = logging.getLogger(__name__)
+
+QUEUE_WORKERS = int(os.getenv("REGISTRATION_QUEUE_WORKERS", "8"))
+QUEUE_MAX_PENDING = int(os.getenv("REGISTRATION_QUEUE_MAX_PENDING", "10000"))
+# Tickets are stored in tickets_collection so any worker process can answer a poll;
+# a TTL index on expires_at drops them
+FINISHED_TICKET_TTL = timedelta(minutes=15)  # Finished tickets can be polled for 15 minutes
+PENDING_TICKET_TTL = timedelta(days=1)  # Bounds tickets left behind by a process that died
+
+class TicketStatus:
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class QueueFullError(Exception):
+    """Raised when the registration queue cannot accept more work"""
+    pass
+
+class RegistrationQueue:
+    """
+    Queue of pending enrollments applied by a pool of asyncio workers.
+    Jobs are partitioned by course_id, so every request for the same course
+    lands on the same worker and is applied one at a time. A burst on a hot
+    course becomes a local queue instead of concurrent DB write conflicts.
+    Ticket state is stored in tickets_collection, so a poll that lands on
+    another worker process still finds the ticket.
+    """
+
+    def __init__(self, workers: int = QUEUE_WORKERS, max_pending: int = QUEUE_MAX_PENDING):
+        self.worker_count = max(1, workers)
+        self.max_pending = max_pending
+        self.queues: List[asyncio.Queue] = []
+        self.workers: List[asyncio.Task] = []
+        # Queued and processing tickets of this process, updated in place by the workers
+        self.tickets: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self.workers)
+
+    def partition(self, course_id: str) -> int:
+        """Stable partition index for a course"""
+        return zlib.crc32(course_id.encode("utf-8")) % self.worker_count
+
+    async def start(self):
+        """Start the worker pool"""
+        if self.running:
+            return
+        per_queue = max(1, self.max_pending // self.worker_count)
+        self.queues = [asyncio.Queue(maxsize=per_queue) for _ in range(self.worker_count)]
+        self.workers = [
+            asyncio.create_task(self._worker(index, queue))
+            for index, queue in enumerate(self.queues)
+        ]
+        logger.info(f"Registration queue started with {self.worker_count} workers")
+
+    async def stop(self):
+        """Cancel the worker pool"""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self.queues = []
+        logger.info("Registration queue stopped")
+
+    async def submit(
+        self,
+        student_id: str,
+        course_id: str,
+        handler: Callable[[], Awaitable[Any]]
+    ) -> Dict[str, Any]:
+        """
+        Queue an enrollment and return its ticket.
+        Raises QueueFullError when the course's partition is saturated.
+        """
+        if not self.running:
+            raise QueueFullError("Registration queue is not running")
+
+        queue = self.queues[self.partition(course_id)]
+        if queue.full():
+            raise QueueFullError("Registration queue is full, please retry shortly")
+
+        now = datetime.now(timezone.utc)
+        ticket = {
+            "ticket_id": str(uuid.uuid4()),
+            "student_id": student_id,
+            "course_id": course_id,
+            "status": TicketStatus.QUEUED,
+            "submitted_at": now.isoformat(),
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "status_code": None,
+        }
+
+        # Stored before it is queued, so the worker's updates always find it
+        await tickets_collection.insert_one({
+            "_id": ticket["ticket_id"],
+            **ticket,
+            "expires_at": now + PENDING_TICKET_TTL
+        })
+
+        try:
+            queue.put_nowait((ticket, handler))
+        except asyncio.QueueFull:
+            await tickets_collection.delete_one({"_id": ticket["ticket_id"]})
+            raise QueueFullError("Registration queue is full, please retry shortly")
+
+        self.tickets[ticket["ticket_id"]] = ticket
+        return ticket
+
+    async def get_ticket(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a ticket by ID: pending tickets of this process from memory, any other from the collection"""
+        ticket = self.tickets.get(ticket_id)
+        if ticket is not None:
+            return ticket
+        return await tickets_collection.find_one({"_id": ticket_id})
+
+    async def _save(self, ticket: Dict[str, Any], **fields):
+        """Write ticket fields to the collection; a failed write is logged, not raised into the worker"""
+        try:
+            await tickets_collection.update_one({"_id": ticket["ticket_id"]}, {"$set": fields})
+        except Exception as e:
+            logger.error(f"Error saving ticket {ticket['ticket_id']}: {str(e)}")
+
+    async def _worker(self, index: int, queue: asyncio.Queue):
+        """Apply queued enrollments for one partition, one at a time"""
+        while True:
+            ticket, handler = await queue.get()
+            ticket["status"] = TicketStatus.PROCESSING
+            try:
+                await self._save(ticket, status=ticket["status"])
+                result = await handler()
+                ticket["status"] = TicketStatus.COMPLETED
+                ticket["status_code"] = 200
+                ticket["result"] = result.model_dump(mode="json") if hasattr(result, "model_dump") else result
+            except EnrollmentError as e:
+                ticket["status"] = TicketStatus.FAILED
+                ticket["status_code"] = 400
+                ticket["error"] = str(e)
+            except HTTPException as e:
+                ticket["status"] = TicketStatus.FAILED
+                ticket["status_code"] = e.status_code
+                ticket["error"] = e.detail
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Registration worker {index} failed ticket {ticket['ticket_id']}: {str(e)}")
+                ticket["status"] = TicketStatus.FAILED
+                ticket["status_code"] = 500
+                ticket["error"] = str(e)
+            finally:
+                queue.task_done()
+
+            now = datetime.now(timezone.utc)
+            ticket["finished_at"] = now.isoformat()
+            await self._save(
+                ticket,
+                **{field: ticket[field] for field in ("status", "status_code", "result", "error", "finished_at")},
+                expires_at=now + FINISHED_TICKET_TTL
+            )
+            # Finished tickets are read back from the collection
+            self.tickets.pop(ticket["ticket_id"], None)
+            await self._notify(ticket)
+
+    async def _notify(self, ticket: Dict[str, Any]):
+        """Push the ticket result to the student's realtime subscribers"""
+        try:
+            await notify_entity_subscribers("registrations", ticket["student_id"], {
+                "collection": "registrations",
+                "operation": "ticket_" + ticket["status"],
+                "document_id": ticket["ticket_id"],
+                "timestamp": ticket["finished_at"],
+                "document": public_ticket(ticket),
+            })
+        except Exception as e:
+            logger.error(f"Error notifying ticket {ticket['ticket_id']}: {str(e)}")
+
+# Ticket fields returned to clients, without the stored _id and expires_at
+PUBLIC_TICKET_FIELDS = (
+    "ticket_id", "student_id", "course_id", "status", "submitted_at",
+    "finished_at", "result", "error", "status_code"
+)
+
+def public_ticket(ticket: Dict[str, Any]) -> Dict[str, Any]:
+    """Ticket fields safe to return to clients"""
+    return {field: ticket.get(field) for field in PUBLIC_TICKET_FIELDS}
+
+registration_queue = RegistrationQueue()
+
+async def start_registration_queue():
+    await registration_queue.start()
+
+async def stop_registration_queue():
+    await registration_queue.stop()
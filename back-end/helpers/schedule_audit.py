@@ -0,0 +1,87 @@
+from bisect import bisect_left
+from typing import Any, Dict, Hashable, List, Tuple
+
+from helpers.schedule_index import slot_minutes
+from models.Schedules import DayOfWeek
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is listed in requirements.txt
+    numpy = None
+
+MINUTES_PER_DAY = 24 * 60
+DAY_INDEXES = {day.value: index for index, day in enumerate(DayOfWeek)}
+
+def overlapping_pairs(keys: List[int], starts: List[int], ends: List[int]) -> List[Tuple[int, int]]:
+    """
+    Every pair (i, j) of intervals with the same key (an owner and a day,
+    as one int) that overlap, in one sort and one sweep: O(n log n + k).
+
+    Intervals are placed on one line at key * MINUTES_PER_DAY + minute and
+    sorted by start. An interval overlaps exactly the ones after it that start
+    before it ends, i.e. the positions up to one binary search of its end.
+    """
+    if numpy is not None:
+        return numpy_overlapping_pairs(keys, starts, ends)
+
+    line_starts = [key * MINUTES_PER_DAY + start for key, start in zip(keys, starts)]
+    order = sorted(range(len(keys)), key=line_starts.__getitem__)
+    sorted_starts = [line_starts[i] for i in order]
+
+    pairs = []
+    for position, i in enumerate(order):
+        stop = bisect_left(sorted_starts, keys[i] * MINUTES_PER_DAY + ends[i])
+        for other in range(position + 1, stop):
+            pairs.append((i, order[other]))
+    return pairs
+
+def numpy_overlapping_pairs(keys: List[int], starts: List[int], ends: List[int]) -> List[Tuple[int, int]]:
+    """overlapping_pairs with the sort, the searches and the pair expansion done as array operations"""
+    keys_array = numpy.asarray(keys, dtype=numpy.int64) * MINUTES_PER_DAY
+    line_starts = keys_array + numpy.asarray(starts, dtype=numpy.int64)
+    line_ends = keys_array + numpy.asarray(ends, dtype=numpy.int64)
+
+    order = numpy.argsort(line_starts, kind="stable")
+    sorted_starts = line_starts[order]
+    positions = numpy.arange(len(order))
+    stops = numpy.searchsorted(sorted_starts, line_ends[order], side="left")
+    counts = numpy.maximum(stops - positions - 1, 0)
+
+    # Position p pairs with p + 1 .. p + counts[p]
+    total = int(counts.sum())
+    first = numpy.repeat(positions, counts)
+    run_starts = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    second = first + (numpy.arange(total) - run_starts) + 1
+    return list(zip(order[first].tolist(), order[second].tolist()))
+
+class AuditRows:
+    """Rows grouped by owner (a student, room or instructor) as parallel columns for overlapping_pairs"""
+
+    def __init__(self, rows: List[Dict[str, Any]], owner_field: str):
+        self.rows: List[Dict[str, Any]] = []
+        self.keys: List[int] = []
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        owners: Dict[Hashable, int] = {}
+
+        for row in rows:
+            owner = row.get(owner_field)
+            day = DAY_INDEXES.get(row.get("day"))
+            if owner is None or day is None:
+                continue
+            start, end = slot_minutes(row)
+            # Empty intervals can't overlap anything
+            if start >= end:
+                continue
+            owner_index = owners.setdefault(owner, len(owners))
+            self.rows.append(row)
+            self.keys.append(owner_index * len(DAY_INDEXES) + day)
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def conflicts(self) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Overlapping row pairs of the same owner, earlier start first"""
+        return [
+            (self.rows[i], self.rows[j])
+            for i, j in overlapping_pairs(self.keys, self.starts, self.ends)
+        ]
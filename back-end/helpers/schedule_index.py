@@ -0,0 +1,214 @@
+import heapq
+from bisect import bisect_left
+from datetime import datetime, time
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from database import schedules_collection, add_change_listener
+from helpers.cache import cache
+from models.Schedules import DayOfWeek
+
+# Built WeekSchedule objects of students, keyed by (student_id,)
+# Evicted by schedule writes (local write paths and the change listener below);
+# the TTL bounds staleness when change streams are not running
+SCHEDULE_INDEX_CACHE = cache.register("schedule_index", ttl=300, max_entries=20000, max_bytes=32 * 1024 * 1024)
+
+# The week as 7 x 288 five-minute buckets, packed into one Python int:
+# bit (day_index * 288 + minute // 5) is set when that bucket is occupied
+BUCKET_MINUTES = 5
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+DAY_OFFSETS = {day.value: index * BUCKETS_PER_DAY for index, day in enumerate(DayOfWeek)}
+
+# Fallback formats for time strings that are not ISO HH:MM[:SS]
+TIME_FORMATS = [
+    "%H:%M:%S",     # 24-hour with seconds
+    "%H:%M",        # 24-hour without seconds
+    "%I:%M:%S %p",  # 12-hour with seconds
+    "%I:%M %p",     # 12-hour without seconds
+    "%H",           # Just hours in 24-hour format
+    "%I %p"         # Just hours in 12-hour format
+]
+
+def time_to_minutes(t: time | str) -> int:
+    """Convert time to minutes since midnight for easier comparison"""
+    if isinstance(t, time):
+        return t.hour * 60 + t.minute
+
+    # Stored slots use HH:MM:SS; parse that without trying strptime formats
+    try:
+        parsed_time = time.fromisoformat(t)
+        return parsed_time.hour * 60 + parsed_time.minute
+    except (TypeError, ValueError):
+        pass
+
+    # Handle other string time formats
+    try:
+        t = t.strip().upper()
+        for fmt in TIME_FORMATS:
+            try:
+                parsed_time = datetime.strptime(t, fmt).time()
+                return parsed_time.hour * 60 + parsed_time.minute
+            except ValueError:
+                continue
+
+        raise ValueError(f"Invalid time format: {t}")
+    except Exception as e:
+        raise ValueError(f"Error parsing time: {str(e)}")
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def slot_minutes(row: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    (start, end) minutes of a time slot or schedule row. Stored rows carry
+    start_min / end_min next to the display strings; rows written before
+    those fields existed (see migrate_time_minutes.py) are parsed instead.
+    """
+    start, end = row.get("start_min"), row.get("end_min")
+    if start is None or end is None:
+        return time_to_minutes(row["start_time"]), time_to_minutes(row["end_time"])
+    return start, end
+
+def stored_time_fields(start_time: time | str, end_time: time | str) -> Dict[str, Any]:
+    """The time fields a time slot or schedule row is stored with: HH:MM:SS strings plus integer minutes"""
+    start, end = time_to_minutes(start_time), time_to_minutes(end_time)
+    return {
+        "start_time": f"{format_minutes(start)}:00",
+        "end_time": f"{format_minutes(end)}:00",
+        "start_min": start,
+        "end_min": end
+    }
+
+def interval_bitmap(day: str, start: int, end: int) -> int:
+    """
+    Week bitmap of [start, end) minutes on a day. Partially covered buckets
+    count as occupied, so disjoint bitmaps guarantee there is no overlap.
+    """
+    offset = DAY_OFFSETS.get(day)
+    if offset is None or start >= end:
+        return 0
+    first = start // BUCKET_MINUTES
+    last = -(-end // BUCKET_MINUTES)
+    return ((1 << (last - first)) - 1) << (offset + first)
+
+def slot_bitmap(slot: Dict[str, Any]) -> int:
+    """Week bitmap of a time slot or schedule row"""
+    return interval_bitmap(slot["day"], *slot_minutes(slot))
+
+class Interval(NamedTuple):
+    start: int  # minutes since midnight
+    end: int
+    slot: Dict[str, Any]  # the schedule row
+
+class DaySchedule:
+    """
+    One day's intervals sorted by start, with a running argmax of end times.
+    Any interval starting before e that ends after s overlaps [s, e), and the
+    one ending last among them is found with one bisect: O(log n) per query.
+    """
+
+    __slots__ = ("intervals", "starts", "latest_end")
+
+    def __init__(self, intervals: List[Interval]):
+        # Empty intervals can't overlap anything
+        self.intervals = sorted((i for i in intervals if i.start < i.end), key=lambda i: (i.start, i.end))
+        self.starts = [interval.start for interval in self.intervals]
+        self.latest_end: List[int] = []
+        best = 0
+        for index, interval in enumerate(self.intervals):
+            if interval.end > self.intervals[best].end:
+                best = index
+            self.latest_end.append(best)
+
+    def find_conflict(self, start: int, end: int) -> Optional[Interval]:
+        """An interval overlapping [start, end), or None"""
+        if start >= end:
+            return None
+        before = bisect_left(self.starts, end)
+        if before == 0:
+            return None
+        candidate = self.intervals[self.latest_end[before - 1]]
+        return candidate if candidate.end > start else None
+
+    def conflicts(self) -> Iterator[Tuple[Interval, Interval]]:
+        """Every overlapping pair, earlier start first, in one sweep: O(n log n + k)"""
+        active: List[Tuple[int, int]] = []  # (end, index) of intervals still running
+        for index, interval in enumerate(self.intervals):
+            while active and active[0][0] <= interval.start:
+                heapq.heappop(active)
+            for _, other in sorted(active, key=lambda item: item[1]):
+                yield self.intervals[other], interval
+            heapq.heappush(active, (interval.end, index))
+
+class WeekSchedule:
+    """
+    Schedule rows (a student's sections, or the slots booked in a room) as
+    per-day interval indexes plus one week bitmap of everything occupied.
+    Conflict checks start with a single AND against the bitmap; only when
+    buckets intersect does the exact per-day bisect run.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.bitmap = 0
+        by_day: Dict[str, List[Interval]] = {}
+        for row in rows:
+            interval = Interval(*slot_minutes(row), row)
+            by_day.setdefault(row["day"], []).append(interval)
+            self.bitmap |= interval_bitmap(row["day"], interval.start, interval.end)
+        self.days = {day: DaySchedule(intervals) for day, intervals in by_day.items()}
+
+    def find_conflict(self, day: str, start: int, end: int, bitmap: Optional[int] = None) -> Optional[Interval]:
+        """A row overlapping [start, end) on day, or None; pass the interval's bitmap if it is known"""
+        if bitmap is None:
+            bitmap = interval_bitmap(day, start, end)
+        if not self.bitmap & bitmap:
+            return None
+        day_schedule = self.days.get(day)
+        return day_schedule.find_conflict(start, end) if day_schedule else None
+
+    def slot_conflict(self, slot: Dict[str, Any]) -> Optional[Interval]:
+        """find_conflict for a time slot row, using its precomputed week_bitmap when it has one"""
+        bitmap = slot.get("week_bitmap")
+        if bitmap is None:
+            bitmap = slot_bitmap(slot)
+        if not self.bitmap & bitmap:
+            return None
+        return self.find_conflict(slot["day"], *slot_minutes(slot), bitmap)
+
+    def conflicts(self) -> Iterator[Tuple[str, Interval, Interval]]:
+        for day, day_schedule in self.days.items():
+            for first, second in day_schedule.conflicts():
+                yield day, first, second
+
+class ScheduleIndex:
+    """Loads each student's schedule with one query and keeps the built index until it changes"""
+
+    async def get(self, student_id: str) -> WeekSchedule:
+        student_schedule = SCHEDULE_INDEX_CACHE.get((student_id,))
+        if student_schedule is None:
+            rows = await schedules_collection.find(
+                {"student_id": student_id},
+                {"_id": 0, "student_id": 0, "created_at": 0, "last_updated": 0}
+            ).to_list(None)
+            student_schedule = WeekSchedule(rows)
+            SCHEDULE_INDEX_CACHE.set((student_id,), student_schedule)
+        return student_schedule
+
+    def invalidate(self, student_id: Optional[str] = None):
+        """Drop one student's index, or every index"""
+        if student_id is None:
+            SCHEDULE_INDEX_CACHE.clear()
+        else:
+            SCHEDULE_INDEX_CACHE.invalidate((student_id,))
+
+    def on_schedule_change(self, event: Dict[str, Any]):
+        document = event.get("document")
+        if document and document.get("student_id"):
+            self.invalidate(document["student_id"])
+        else:
+            # Deletes carry no student_id
+            self.invalidate()
+
+schedule_index = ScheduleIndex()
+
+add_change_listener("schedules", schedule_index.on_schedule_change)
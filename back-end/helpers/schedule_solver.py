@@ -0,0 +1,185 @@
+import heapq
+from time import perf_counter
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from helpers.schedule_index import WeekSchedule, interval_bitmap, slot_minutes
+
+# Preference weights, in penalty points: per day on campus, per idle minute
+# between two classes on the same day, and per minute of class before the
+# preferred earliest start
+DAY_PENALTY = 60.0
+IDLE_PENALTY = 0.5
+EARLY_PENALTY = 1.0
+
+# Search budget per request, in seconds
+DEFAULT_TIME_BUDGET = 0.2
+# Search nodes between clock checks
+CLOCK_INTERVAL = 256
+
+class Section(NamedTuple):
+    day: str
+    start: int  # minutes since midnight
+    end: int
+    bitmap: int  # week bitmap of [start, end)
+    row: Dict[str, Any]  # the time slot row
+
+def to_section(row: Dict[str, Any]) -> Section:
+    start, end = slot_minutes(row)
+    bitmap = row.get("week_bitmap")
+    if bitmap is None:
+        bitmap = interval_bitmap(row["day"], start, end)
+    return Section(row["day"], start, end, bitmap, row)
+
+def compatible(a: Section, b: Section) -> bool:
+    """Disjoint bitmaps never overlap; the exact check only runs when buckets intersect"""
+    return not a.bitmap & b.bitmap or a.day != b.day or a.end <= b.start or b.end <= a.start
+
+class Requirement(NamedTuple):
+    course_id: str
+    slot_type: str
+    sections: List[Section]  # the sections that don't clash with the fixed schedule
+
+class ScheduleOption(NamedTuple):
+    penalty: float
+    campus_days: int
+    idle_minutes: int
+    early_minutes: int
+    sections: List[Dict[str, Any]]  # one time slot row per requirement, in requirement order
+
+class SolverResult(NamedTuple):
+    options: List[ScheduleOption]  # best first
+    exhaustive: bool  # False when the time budget ran out before the search finished
+    nodes: int
+
+def score(sections: List[Section], earliest_start: int) -> Tuple[float, int, int, int]:
+    """(penalty, campus days, idle minutes, early minutes) of a full week"""
+    by_day: Dict[str, List[Section]] = {}
+    for section in sections:
+        by_day.setdefault(section.day, []).append(section)
+
+    idle = 0
+    early = 0
+    for day_sections in by_day.values():
+        day_sections.sort(key=lambda section: section.start)
+        busy_until = day_sections[0].end
+        for section in day_sections:
+            if section.start > busy_until:
+                idle += section.start - busy_until
+            busy_until = max(busy_until, section.end)
+            early += max(0, earliest_start - section.start)
+
+    penalty = DAY_PENALTY * len(by_day) + IDLE_PENALTY * idle + EARLY_PENALTY * early
+    return penalty, len(by_day), idle, early
+
+class ScheduleSolver:
+    """
+    Finds the best complete, conflict-free choices of one section per
+    requirement (a course's lecture, lab or tutorial) on top of a fixed
+    schedule. Depth-first search that branches on the requirement with the
+    fewest sections left (most constrained first), forward-checks every other
+    requirement with one bitmap AND per section, and prunes branches whose
+    campus days and early minutes alone already cost more than the worst of
+    the top-K found so far. Stops at the time budget with the best found.
+    """
+
+    def __init__(
+        self,
+        fixed: WeekSchedule,
+        requirements: List[Requirement],
+        limit: int,
+        earliest_start: int,
+        time_budget: float = DEFAULT_TIME_BUDGET
+    ):
+        self.fixed = [to_section(row) for row in fixed.rows]
+        self.requirements = requirements
+        self.limit = limit
+        self.earliest_start = earliest_start
+        self.time_budget = time_budget
+        # Max-heap of kept options by penalty: (-penalty, -found order, option)
+        self.best: List[Tuple[float, int, ScheduleOption]] = []
+        self.found = 0
+        self.nodes = 0
+        self.deadline = 0.0
+        self.timed_out = False
+
+    def solve(self) -> SolverResult:
+        if any(not requirement.sections for requirement in self.requirements):
+            return SolverResult([], True, 0)
+
+        self.deadline = perf_counter() + self.time_budget
+        domains = {index: requirement.sections for index, requirement in enumerate(self.requirements)}
+        days = {section.day for section in self.fixed}
+        early = sum(max(0, self.earliest_start - section.start) for section in self.fixed)
+        self.search(domains, [], days, early)
+
+        options = [option for _, _, option in sorted(self.best, key=lambda item: (-item[0], -item[1]))]
+        return SolverResult(options, not self.timed_out, self.nodes)
+
+    def search(self, domains: Dict[int, List[Section]], chosen: List[Tuple[int, Section]], days: Set[str], early: int):
+        self.nodes += 1
+        if self.nodes % CLOCK_INTERVAL == 0 and perf_counter() > self.deadline:
+            self.timed_out = True
+        if self.timed_out:
+            return
+
+        if not domains:
+            self.record(chosen)
+            return
+
+        # Days and early minutes only grow as sections are added, so they bound the final penalty
+        if len(self.best) == self.limit and DAY_PENALTY * len(days) + EARLY_PENALTY * early >= -self.best[0][0]:
+            return
+
+        # Branch on the most constrained requirement, cheapest sections first
+        index = min(domains, key=lambda i: len(domains[i]))
+        rest = {i: sections for i, sections in domains.items() if i != index}
+        for section in sorted(domains[index], key=lambda s: self.step_cost(s, days)):
+            narrowed = self.narrow(rest, section)
+            if narrowed is None:
+                continue
+            chosen.append((index, section))
+            self.search(
+                narrowed,
+                chosen,
+                days if section.day in days else days | {section.day},
+                early + max(0, self.earliest_start - section.start)
+            )
+            chosen.pop()
+            if self.timed_out:
+                return
+
+    def step_cost(self, section: Section, days: Set[str]) -> float:
+        cost = EARLY_PENALTY * max(0, self.earliest_start - section.start)
+        return cost if section.day in days else cost + DAY_PENALTY
+
+    @staticmethod
+    def narrow(domains: Dict[int, List[Section]], section: Section) -> Optional[Dict[int, List[Section]]]:
+        """Drop the sections that clash with section; None as soon as a requirement has none left"""
+        narrowed = {}
+        for index, sections in domains.items():
+            kept = [other for other in sections if compatible(other, section)]
+            if not kept:
+                return None
+            narrowed[index] = kept
+        return narrowed
+
+    def record(self, chosen: List[Tuple[int, Section]]):
+        sections = [section for _, section in sorted(chosen, key=lambda item: item[0])]
+        penalty, campus_days, idle, early = score(self.fixed + sections, self.earliest_start)
+        if len(self.best) == self.limit and penalty >= -self.best[0][0]:
+            return
+
+        self.found += 1
+        option = ScheduleOption(penalty, campus_days, idle, early, [section.row for section in sections])
+        if len(self.best) == self.limit:
+            heapq.heapreplace(self.best, (-penalty, -self.found, option))
+        else:
+            heapq.heappush(self.best, (-penalty, -self.found, option))
+
+def build_requirement(fixed: WeekSchedule, course_id: str, slot_type: str, rows: List[Dict[str, Any]]) -> Requirement:
+    """A requirement with only the sections that fit around the fixed schedule"""
+    sections = [to_section(row) for row in rows]
+    return Requirement(course_id, slot_type, [
+        section for section in sections
+        if fixed.find_conflict(section.day, section.start, section.end, section.bitmap) is None
+    ])
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Set, Tuple
+
+from database import time_slots_collection, subscribers, add_change_listener, broadcast_text
+
+logger = logging.getLogger(__name__)
+
+# Subscription topic on /ws/realtime, keyed by course_id
+SEATS_TOPIC = "seats"
+
+# Seat changes within this window go out as one message per course
+SEAT_BROADCAST_WINDOW = 0.25  # seconds
+
+# Time slot fields that change what a course's seat message says
+SEAT_FIELDS = {"capacity", "seats_taken"}
+
+class SeatBroadcaster:
+    """
+    Pushes seat availability to the subscribers of the seats topic.
+
+    Seat changes (local reservations and time slot change events) only mark
+    their course dirty. Once per window the dirty, watched courses are read
+    back with one query, compared against the per-slot counters last sent,
+    and each course that changed gets one delta message, serialized once and
+    fanned out to all its subscribers:
+
+        {"collection": "seats", "operation": "delta", "course_id": ...,
+         "slots": {slot_id: {"enrolled_count": n, "seats_available": m}, ...}}
+
+    A slot that no longer exists is sent as null. New subscribers first get
+    the whole course with operation "snapshot".
+    """
+
+    def __init__(self):
+        # Last sent (seats_taken, capacity) per slot, per watched course
+        self.counters: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        self.dirty: Set[str] = set()
+        self.flush_task: Optional[asyncio.Task] = None
+        # course_id by slot ObjectId, for seat updates that arrive without the document
+        self.slot_courses: Dict[str, str] = {}
+
+    @staticmethod
+    def watched(course_id: str) -> bool:
+        return bool(subscribers.get(SEATS_TOPIC, {}).get(course_id))
+
+    def touch(self, course_id: str):
+        """Note a seat change in a course; subscribers hear about it at the end of the window"""
+        if not self.watched(course_id):
+            self.counters.pop(course_id, None)
+            return
+        self.dirty.add(course_id)
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self.flush_later())
+
+    def on_time_slot_change(self, event: Dict[str, Any]):
+        document = event.get("document")
+        if event["operation"] == "delete":
+            course_id = self.slot_courses.pop(event.get("document_id"), None)
+        elif document:
+            course_id = document.get("course_id")
+        else:
+            course_id = self.slot_courses.get(event.get("document_id"))
+        updated_fields = event.get("updated_fields")
+        if event["operation"] == "update" and updated_fields:
+            if not SEAT_FIELDS & updated_fields.keys():
+                return
+            if course_id is None and updated_fields.keys() <= SEAT_FIELDS:
+                # Every slot of a watched course was loaded, so this one is not watched
+                return
+        if course_id:
+            self.touch(course_id)
+        else:
+            # Deletes of slots not loaded here carry no course_id
+            for course_id in list(self.counters):
+                self.touch(course_id)
+
+    async def load(self, course_ids: list) -> Dict[str, Dict[str, Tuple[int, int]]]:
+        """Current (seats_taken, capacity) per slot of each course, in one query"""
+        current: Dict[str, Dict[str, Tuple[int, int]]] = {course_id: {} for course_id in course_ids}
+        slots = await time_slots_collection.find(
+            {"course_id": {"$in": course_ids}},
+            {"slot_id": 1, "course_id": 1, "capacity": 1, "seats_taken": 1}
+        ).to_list(None)
+        for slot in slots:
+            self.slot_courses[str(slot["_id"])] = slot["course_id"]
+            current[slot["course_id"]][slot["slot_id"]] = (slot.get("seats_taken", 0), slot.get("capacity", 0))
+        return current
+
+    @staticmethod
+    def message(course_id: str, operation: str, slots: Dict[str, Optional[Tuple[int, int]]]) -> str:
+        return json.dumps({
+            "collection": SEATS_TOPIC,
+            "operation": operation,
+            "course_id": course_id,
+            "slots": {
+                slot_id: None if counts is None else {
+                    "enrolled_count": counts[0],
+                    "seats_available": max(0, counts[1] - counts[0])
+                }
+                for slot_id, counts in slots.items()
+            }
+        }, separators=(",", ":"))
+
+    async def flush_later(self):
+        await asyncio.sleep(SEAT_BROADCAST_WINDOW)
+        course_ids = [course_id for course_id in self.dirty if self.watched(course_id)]
+        # Changes from here on start the next window
+        self.dirty = set()
+        self.flush_task = None
+
+        # Forget courses nobody watches any more
+        for course_id in list(self.counters):
+            if not self.watched(course_id):
+                del self.counters[course_id]
+        self.slot_courses = {
+            object_id: course_id for object_id, course_id in self.slot_courses.items()
+            if course_id in self.counters
+        }
+
+        if not course_ids:
+            return
+        try:
+            current = await self.load(course_ids)
+            for course_id, slots in current.items():
+                previous = self.counters.get(course_id, {})
+                delta: Dict[str, Optional[Tuple[int, int]]] = {
+                    slot_id: counts for slot_id, counts in slots.items() if previous.get(slot_id) != counts
+                }
+                delta.update((slot_id, None) for slot_id in previous.keys() - slots.keys())
+                self.counters[course_id] = slots
+                if delta:
+                    await broadcast_text(SEATS_TOPIC, course_id, self.message(course_id, "delta", delta))
+        except Exception as e:
+            logger.error(f"Error broadcasting seat updates: {str(e)}")
+
+    async def send_snapshot(self, course_id: str, websocket):
+        """Send one new subscriber every slot of a course"""
+        slots = self.counters.get(course_id)
+        if slots is None:
+            slots = (await self.load([course_id]))[course_id]
+            self.counters[course_id] = slots
+        await websocket.send_text(self.message(course_id, "snapshot", slots))
+
+seat_broadcast = SeatBroadcaster()
+
+add_change_listener("time_slots", seat_broadcast.on_time_slot_change)
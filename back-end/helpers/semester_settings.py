@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from database import semester_settings_collection, add_change_listener
+from models.SemesterSettings import SemesterType
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_ID = "semester_settings"  # Same as in semesterController
+
+def parse_setting_date(value: Any) -> Optional[datetime]:
+    """Parse a stored period boundary into an aware UTC datetime"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        # Mongo returns naive UTC datetimes
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+class SemesterSettingsSnapshot:
+    """
+    Process-wide, pre-parsed copy of the semester settings document.
+    Loaded once, then refreshed only when semester_settings_collection changes
+    (change stream) or after an explicit refresh from the admin endpoints.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.settings: Optional[Dict[str, Any]] = None
+        self.current_semester: SemesterType = SemesterType.FALL
+        self.registration_periods: Optional[Dict[str, Any]] = None
+        self.dates: Dict[str, Optional[datetime]] = {}
+        self.lock = asyncio.Lock()
+
+    async def get(self) -> "SemesterSettingsSnapshot":
+        if not self.loaded:
+            async with self.lock:
+                if not self.loaded:
+                    await self.refresh()
+        return self
+
+    async def refresh(self):
+        """Reload the settings document and re-parse its dates"""
+        settings = await semester_settings_collection.find_one({"_id": SETTINGS_ID})
+        self.settings = settings
+        self.current_semester = (settings or {}).get("current_semester", SemesterType.FALL)
+        self.registration_periods = (settings or {}).get("registration_periods")
+        self.dates = {
+            key: parse_setting_date((self.registration_periods or {}).get(key))
+            for key in (
+                "registration_start_date",
+                "registration_end_date",
+                "withdrawal_start_date",
+                "withdrawal_end_date",
+            )
+        }
+        self.loaded = True
+        logger.info("Semester settings snapshot refreshed")
+
+    def period_status(self, kind: str, label: str, now: Optional[datetime] = None) -> Tuple[bool, str]:
+        """
+        Check whether the registration or withdrawal period is open.
+        kind is "registration" or "withdrawal"; label is used in messages.
+        """
+        if not self.registration_periods:
+            return False, f"{label} period not configured"
+
+        if not self.registration_periods.get(f"{kind}_enabled", False):
+            return False, f"Course {label.lower()} is currently disabled"
+
+        start_date = self.dates.get(f"{kind}_start_date")
+        end_date = self.dates.get(f"{kind}_end_date")
+        if start_date and end_date:
+            current_time = now or datetime.now(timezone.utc)
+            if current_time < start_date:
+                return False, f"Course {label.lower()} period starts on {start_date.isoformat()}"
+            if current_time > end_date:
+                return False, f"Course {label.lower()} period ended on {end_date.isoformat()}"
+
+        return True, f"{label} allowed"
+
+    def registration_status(self, now: Optional[datetime] = None) -> Tuple[bool, str]:
+        return self.period_status("registration", "Registration", now)
+
+    def withdrawal_status(self, now: Optional[datetime] = None) -> Tuple[bool, str]:
+        return self.period_status("withdrawal", "Withdrawal", now)
+
+    async def on_change(self, event: Dict[str, Any]):
+        await self.refresh()
+
+semester_settings = SemesterSettingsSnapshot()
+
+add_change_listener("semester_settings", semester_settings.on_change)
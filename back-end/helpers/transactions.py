@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from pymongo.errors import OperationFailure, PyMongoError
+
+from database import client
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_MAX_ATTEMPTS = 5
+COMMIT_MAX_ATTEMPTS = 3
+
+# Server error code for "Transaction numbers are only allowed on a replica set member or mongos"
+ILLEGAL_OPERATION = 20
+
+def transactions_unsupported(error: PyMongoError) -> bool:
+    """True when the deployment (e.g. a standalone mongod) cannot run transactions"""
+    return isinstance(error, OperationFailure) and error.code == ILLEGAL_OPERATION
+
+async def commit_with_retry(session: AsyncIOMotorClientSession):
+    """Commit, retrying while the outcome of the commit is unknown"""
+    for attempt in range(1, COMMIT_MAX_ATTEMPTS + 1):
+        try:
+            await session.commit_transaction()
+            return
+        except PyMongoError as e:
+            if e.has_error_label("UnknownTransactionCommitResult") and attempt < COMMIT_MAX_ATTEMPTS:
+                continue
+            raise
+
+async def run_transaction(
+    callback: Callable[[Optional[AsyncIOMotorClientSession]], Awaitable[Any]],
+    max_attempts: int = TRANSACTION_MAX_ATTEMPTS
+) -> Any:
+    """
+    Run callback(session) in a transaction and return its result.
+    The whole transaction is retried with a short jittered backoff on
+    TransientTransactionError (write conflicts, elections), so callers don't
+    have to serialize concurrent requests. On deployments without transaction
+    support the callback runs once with session=None and must guard its own writes.
+    """
+    for attempt in range(1, max_attempts + 1):
+        try:
+            async with await client.start_session() as session:
+                async with session.start_transaction():
+                    result = await callback(session)
+                    await commit_with_retry(session)
+                return result
+        except PyMongoError as e:
+            if transactions_unsupported(e):
+                logger.debug("Transactions not supported by this deployment; running without one")
+                return await callback(None)
+            if e.has_error_label("TransientTransactionError") and attempt < max_attempts:
+                await asyncio.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+                continue
+            raise
@@ -0,0 +1,76 @@
+"""
+Time Minutes Migration
+
+Adds the integer start_min / end_min fields (minutes since midnight) to time
+slot and schedule documents written before the write paths stored them.
+Overlap checks, sorts and the room-overlap range query use these fields;
+documents without them still work, but are parsed from their time strings
+and always returned by the room-overlap query.
+
+Only documents missing either field are touched, in _id order and in batches
+of unordered bulk updates, so the script can be stopped and re-run at any
+time and picks up where it left off. Each update is guarded on the time
+strings it was computed from, so a concurrent edit is never overwritten.
+Documents with unparsable times are reported and left as they are.
+
+Run from the back-end directory: python migrate_time_minutes.py [batch_size]
+"""
+
+import asyncio
+import sys
+
+from pymongo import UpdateOne
+
+from database import time_slots_collection, schedules_collection
+from helpers.schedule_index import time_to_minutes
+
+DEFAULT_BATCH_SIZE = 1000
+
+async def migrate(collection, name: str, batch_size: int) -> int:
+    """Backfill one collection; returns the number of documents that could not be migrated"""
+    query = {"$or": [{"start_min": {"$exists": False}}, {"end_min": {"$exists": False}}]}
+    last_id = None
+    updated = 0
+    skipped = 0
+
+    while True:
+        # Resume after the last _id seen in this run; earlier runs are skipped by the query itself
+        batch_query = query if last_id is None else {**query, "_id": {"$gt": last_id}}
+        batch = await collection.find(
+            batch_query, {"start_time": 1, "end_time": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        operations = []
+        for document in batch:
+            try:
+                start_min = time_to_minutes(document["start_time"])
+                end_min = time_to_minutes(document["end_time"])
+            except (KeyError, ValueError) as e:
+                print(f"⚠️ {name} {document['_id']}: {e}")
+                skipped += 1
+                continue
+            operations.append(UpdateOne(
+                {"_id": document["_id"], "start_time": document["start_time"], "end_time": document["end_time"]},
+                {"$set": {"start_min": start_min, "end_min": end_min}}
+            ))
+
+        if operations:
+            result = await collection.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+        print(f"{name}: {updated} updated, {skipped} skipped")
+
+    print(f"✅ {name} done: {updated} updated, {skipped} skipped")
+    return skipped
+
+async def main(batch_size: int = DEFAULT_BATCH_SIZE) -> bool:
+    skipped = 0
+    skipped += await migrate(time_slots_collection, "time_slots", batch_size)
+    skipped += await migrate(schedules_collection, "schedules", batch_size)
+    return skipped == 0
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BATCH_SIZE
+    sys.exit(0 if asyncio.run(main(batch_size)) else 1)
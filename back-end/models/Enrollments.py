@@ -61,4 +61,14 @@ class CourseAvailabilityResponse(BaseModel):
     prerequisites: List[str]
     can_enroll: bool
     reason: Optional[str] = None
-
+    
+class CartItem(BaseModel):
+    course_id: str
+    course_name: str
+    credit_hours: int
+    
+class CartResponse(BaseModel):
+    student_id: str
+    courses: List[CartItem]
+    total_credit_hours: int
+    available_credit_hours: int
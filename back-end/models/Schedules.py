@@ -63,4 +63,54 @@ class ScheduleConflictResponse(BaseModel):
     course2_id: str
     course2_name: str
     course2_type: TimeSlotType
-    course2_time: str
\ No newline at end of file
+    course2_time: str
+
+class ScheduleOption(BaseModel):
+    penalty: float  # lower is better
+    campus_days: int
+    idle_minutes: int
+    early_minutes: int
+    sections: List[TimeSlotResponse]
+
+class TimetableRecommendationsResponse(BaseModel):
+    schedules: List[ScheduleOption]  # complete conflict-free assignments, best first
+    unschedulable: Dict[str, List[TimeSlotType]]  # needed section types with no open section that fits
+    exhaustive: bool  # False when the search hit its time budget
+
+class ScheduleAuditSection(BaseModel):
+    slot_id: str
+    course_id: str
+    type: TimeSlotType
+    time: str  # "HH:MM - HH:MM"
+
+class ScheduleAuditConflict(BaseModel):
+    owner_id: str  # the student, room or instructor booked twice
+    day: DayOfWeek
+    first: ScheduleAuditSection
+    second: ScheduleAuditSection
+
+class ScheduleAuditResponse(BaseModel):
+    schedule_rows: int
+    time_slots: int
+    student_conflicts: List[ScheduleAuditConflict]
+    room_double_bookings: List[ScheduleAuditConflict]
+    instructor_double_bookings: List[ScheduleAuditConflict]
+
+class WaitlistStatus(str, Enum):
+    WAITING = "waiting"
+    PROMOTING = "promoting"
+    PROMOTED = "promoted"
+    SKIPPED = "skipped"
+    CANCELLED = "cancelled"
+
+class WaitlistCreate(BaseModel):
+    course_id: str
+    slot_id: str
+
+class WaitlistEntryResponse(BaseModel):
+    slot_id: str
+    course_id: str
+    type: TimeSlotType
+    status: WaitlistStatus
+    position: Optional[int] = None  # 1-based place in the queue while waiting
+    created_at: datetime
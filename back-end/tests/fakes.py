@@ -0,0 +1,275 @@
+"""
+In-memory stand-ins for the Motor collections the helpers and controllers use.
+Only the query and update operators the code under test sends are understood.
+"""
+import copy
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+
+def resolve(document: Any, path: str) -> List[Any]:
+    """Every value a dotted path reaches, descending into arrays like MongoDB does"""
+    values = [document]
+    for part in path.split("."):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                found.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        values = found
+    return values
+
+def _candidates(values: List[Any]) -> List[Any]:
+    """Field values plus the elements of array values"""
+    out = list(values)
+    for value in values:
+        if isinstance(value, list):
+            out.extend(value)
+    return out
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    if left is None or left is _MISSING:
+        return False
+    try:
+        return {
+            "$gt": lambda: left > right,
+            "$gte": lambda: left >= right,
+            "$lt": lambda: left < right,
+            "$lte": lambda: left <= right
+        }[op]()
+    except TypeError:
+        return False
+
+def match_condition(values: List[Any], condition: Any) -> bool:
+    candidates = _candidates(values)
+    if not isinstance(condition, dict) or not any(key.startswith("$") for key in condition):
+        if condition is None:
+            return not values or None in candidates
+        return condition in candidates
+
+    for op, operand in condition.items():
+        if op == "$eq":
+            if not match_condition(values, operand):
+                return False
+        elif op == "$ne":
+            if match_condition(values, operand):
+                return False
+        elif op == "$in":
+            if not any(match_condition(values, option) for option in operand):
+                return False
+        elif op == "$nin":
+            if any(match_condition(values, option) for option in operand):
+                return False
+        elif op == "$exists":
+            if bool(values) != bool(operand):
+                return False
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            if not any(_compare(op, value, operand) for value in candidates):
+                return False
+        else:
+            raise NotImplementedError(f"query operator {op}")
+    return True
+
+def evaluate(document: Dict[str, Any], expression: Any) -> Any:
+    """Aggregation expressions used inside $expr"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        values = resolve(document, expression[1:])
+        return values[0] if values else None
+    if isinstance(expression, dict) and len(expression) == 1:
+        op, args = next(iter(expression.items()))
+        if op == "$ifNull":
+            value = evaluate(document, args[0])
+            return evaluate(document, args[1]) if value is None else value
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            return _compare(op, evaluate(document, args[0]), evaluate(document, args[1]))
+        if op == "$eq":
+            return evaluate(document, args[0]) == evaluate(document, args[1])
+        if op.startswith("$"):
+            raise NotImplementedError(f"expression operator {op}")
+    return expression
+
+def matches(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(document, branch) for branch in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, branch) for branch in condition):
+                return False
+        elif key == "$expr":
+            if not evaluate(document, condition):
+                return False
+        elif not match_condition(resolve(document, key), condition):
+            return False
+    return True
+
+def apply_update(document: Dict[str, Any], update: Dict[str, Any], inserting: bool = False):
+    for op, fields in update.items():
+        for field, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                document[field] = copy.deepcopy(value)
+            elif op == "$setOnInsert":
+                continue
+            elif op == "$unset":
+                document.pop(field, None)
+            elif op == "$inc":
+                document[field] = document.get(field, 0) + value
+            elif op == "$push":
+                document.setdefault(field, []).append(copy.deepcopy(value))
+            elif op == "$addToSet":
+                if value not in document.setdefault(field, []):
+                    document[field].append(copy.deepcopy(value))
+            elif op == "$pull":
+                document[field] = [
+                    item for item in document.get(field, [])
+                    if not (matches(item, value) if isinstance(value, dict) else item == value)
+                ]
+            else:
+                raise NotImplementedError(f"update operator {op}")
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+    included = {field for field, value in projection.items() if value and field != "_id"}
+    if included:
+        keep = included | ({"_id"} if projection.get("_id", 1) else set())
+        return {field: value for field, value in document.items() if field in keep}
+    return {field: value for field, value in document.items() if projection.get(field, 1)}
+
+def _sorted(documents: List[Dict[str, Any]], sort) -> List[Dict[str, Any]]:
+    for field, direction in reversed(list(sort or [])):
+        documents = sorted(
+            documents,
+            key=lambda document: (resolve(document, field) or [None])[0],
+            reverse=direction < 0
+        )
+    return documents
+
+class FakeCursor:
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.documents = documents
+
+    def sort(self, key, direction=None):
+        sort = [(key, direction)] if isinstance(key, str) else key
+        self.documents = _sorted(self.documents, sort)
+        return self
+
+    def limit(self, count: int):
+        if count:
+            self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return self.documents if length is None else self.documents[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+class FakeCollection:
+    """A Motor collection kept in a list; documents are copied in and out"""
+
+    def __init__(self, documents: Optional[List[Dict[str, Any]]] = None):
+        self.documents: List[Dict[str, Any]] = []
+        for document in documents or []:
+            self._insert(document)
+
+    def _insert(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        document = copy.deepcopy(document)
+        document.setdefault("_id", ObjectId())
+        if any(existing["_id"] == document["_id"] for existing in self.documents):
+            raise DuplicateKeyError(f"duplicate _id {document['_id']}")
+        self.documents.append(document)
+        return document
+
+    def _matching(self, query, sort=None) -> List[Dict[str, Any]]:
+        if not isinstance(query, dict):
+            query = {"_id": query}
+        return _sorted([document for document in self.documents if matches(document, query)], sort)
+
+    def _upsert(self, query: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        document = {
+            key: value for key, value in query.items()
+            if not key.startswith("$") and not (isinstance(value, dict) and any(k.startswith("$") for k in value))
+        }
+        apply_update(document, update, inserting=True)
+        return self._insert(document)
+
+    def find(self, query=None, projection=None, sort=None):
+        return FakeCursor([project(document, projection) for document in self._matching(query, sort)])
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        found = self._matching(query, sort)
+        return project(found[0], projection) if found else None
+
+    async def count_documents(self, query):
+        return len(self._matching(query))
+
+    async def insert_one(self, document):
+        inserted = self._insert(document)
+        document.setdefault("_id", inserted["_id"])
+        return SimpleNamespace(inserted_id=inserted["_id"])
+
+    async def insert_many(self, documents, ordered=True):
+        return SimpleNamespace(inserted_ids=[(await self.insert_one(document)).inserted_id for document in documents])
+
+    async def update_one(self, query, update, upsert=False):
+        found = self._matching(query)
+        if found:
+            before = copy.deepcopy(found[0])
+            apply_update(found[0], update)
+            return SimpleNamespace(matched_count=1, modified_count=int(found[0] != before), upserted_id=None)
+        if upsert:
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=self._upsert(query, update)["_id"])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def update_many(self, query, update, upsert=False):
+        found = self._matching(query)
+        for document in found:
+            apply_update(document, update)
+        return SimpleNamespace(matched_count=len(found), modified_count=len(found), upserted_id=None)
+
+    async def find_one_and_update(
+        self, query, update, projection=None, sort=None, upsert=False,
+        return_document=ReturnDocument.BEFORE
+    ):
+        found = self._matching(query, sort)
+        if not found:
+            if not upsert:
+                return None
+            inserted = self._upsert(query, update)
+            return copy.deepcopy(inserted) if return_document == ReturnDocument.AFTER else None
+        before = copy.deepcopy(found[0])
+        apply_update(found[0], update)
+        return copy.deepcopy(found[0]) if return_document == ReturnDocument.AFTER else before
+
+    async def delete_one(self, query):
+        found = self._matching(query)
+        if found:
+            self.documents.remove(found[0])
+        return SimpleNamespace(deleted_count=len(found[:1]))
+
+    async def delete_many(self, query):
+        found = self._matching(query)
+        for document in found:
+            self.documents.remove(document)
+        return SimpleNamespace(deleted_count=len(found))
+
+    async def bulk_write(self, operations, ordered=True):
+        # Only UpdateOne operations are sent by the code under test
+        modified = 0
+        for operation in operations:
+            result = await self.update_one(operation._filter, operation._doc, upsert=bool(operation._upsert))
+            modified += result.modified_count
+        return SimpleNamespace(modified_count=modified)
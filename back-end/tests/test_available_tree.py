@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+import helpers.available_tree as available_tree_module
+import helpers.course_graph as course_graph_module
+import helpers.prerequisite_index as prerequisite_index_module
+from fakes import FakeCollection
+from helpers.available_tree import OVERLAY_CACHE, AvailableTreeCache
+from helpers.catalog import CATALOG_SOURCES, CatalogKind, CatalogSnapshot
+from helpers.prerequisite_index import STUDENT_MASKS_CACHE, PrerequisiteIndex
+from models.Enrollments import EnrollmentStatus
+
+def course(course_id, prerequisites=(), semesters=("Fall",)):
+    return {
+        "course_id": course_id, "name": course_id, "department_id": "CS", "credit_hours": 3,
+        "semesters": list(semesters), "prerequisites": list(prerequisites)
+    }
+
+@pytest.fixture
+def tree(monkeypatch):
+    sources = {
+        CatalogKind.COURSES: FakeCollection([
+            course("CS101"),
+            course("CS102"),
+            course("CS201", ["CS101"]),
+            course("CS301", ["CS201", "CS102"]),
+            course("CS250", ["CS101"], semesters=["Spring"])
+        ]),
+        CatalogKind.DEPARTMENTS: FakeCollection([{"department_id": "CS", "name": "Computer Science"}])
+    }
+    for kind in CATALOG_SOURCES:
+        _, key_field, query = CATALOG_SOURCES[kind]
+        monkeypatch.setitem(CATALOG_SOURCES, kind, (sources.get(kind, FakeCollection()), key_field, query))
+    snapshot = CatalogSnapshot()
+    index = PrerequisiteIndex()
+    for module in (available_tree_module, course_graph_module, prerequisite_index_module):
+        monkeypatch.setattr(module, "catalog", snapshot)
+    monkeypatch.setattr(course_graph_module, "_graph", None)
+    monkeypatch.setattr(available_tree_module, "prerequisite_index", index)
+    monkeypatch.setattr(prerequisite_index_module, "enrollments_collection", FakeCollection([
+        {"student_id": "s1", "course_id": "CS101", "status": EnrollmentStatus.PENDING},
+        {"student_id": "s1", "course_id": "CS102", "status": EnrollmentStatus.COMPLETED}
+    ]))
+    STUDENT_MASKS_CACHE.clear()
+    OVERLAY_CACHE.clear()
+    yield AvailableTreeCache()
+    STUDENT_MASKS_CACHE.clear()
+    OVERLAY_CACHE.clear()
+
+def flatten(departments):
+    def walk(node, depth):
+        yield node["course_id"], depth, node["enrollment_status"], node["can_enroll"]
+        for child in node["children"]:
+            yield from walk(child, depth + 1)
+
+    return [row for department in departments for root in department["courses"] for row in walk(root, 0)]
+
+def test_render_merges_the_student_status_into_the_shared_layout(tree):
+    departments = asyncio.run(tree.render("s1", "Fall"))
+
+    assert [department["department_name"] for department in departments] == ["Computer Science"]
+    assert flatten(departments) == [
+        ("CS101", 0, "enrolled", False),
+        ("CS201", 1, "prerequisites_missing", False),
+        ("CS301", 2, "prerequisites_missing", False),
+        ("CS102", 0, "completed", False)
+    ]
+    assert flatten(asyncio.run(tree.render("s2", "Fall")))[0] == ("CS101", 0, "available", True)
+
+def test_completion_updates_the_cached_overlay_in_place(tree):
+    asyncio.run(tree.render("s1", "Fall"))
+    overlay = OVERLAY_CACHE.get(("s1",))
+
+    available_tree_module.prerequisite_index.on_enrollment_change({"operation": "update", "document": {
+        "student_id": "s1", "course_id": "CS101", "status": EnrollmentStatus.COMPLETED
+    }})
+    statuses = {course_id: status for course_id, _, status, _ in flatten(asyncio.run(tree.render("s1", "Fall")))}
+
+    assert OVERLAY_CACHE.get(("s1",)) is overlay
+    assert statuses["CS101"] == "completed"
+    assert statuses["CS201"] == "available"
+    assert statuses["CS301"] == "prerequisites_missing"
+
+def test_skeleton_is_shared_until_the_catalog_changes(tree):
+    first = asyncio.run(tree.skeleton("Fall"))
+    assert asyncio.run(tree.skeleton("Fall")) is first
+    assert asyncio.run(tree.skeleton("Spring")).order == ["CS250"]
+
+    catalog = available_tree_module.catalog
+    catalog.apply(CatalogKind.COURSES, {**course("CS401"), "_id": "new"})
+    rebuilt = asyncio.run(tree.skeleton("Fall"))
+
+    assert rebuilt is not first
+    assert "CS401" in rebuilt.order
+    # Skeletons of the old catalog version are dropped
+    assert all(version == catalog.version for version, _ in tree.skeletons)
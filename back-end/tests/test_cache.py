@@ -0,0 +1,84 @@
+import helpers.cache as cache_module
+from helpers.cache import CacheNamespace, CacheRegistry, estimate_size
+from helpers.encoded_response import EncodedJSON
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    region = CacheNamespace("test", ttl=60, max_entries=10, max_bytes=1_000_000)
+    region.set(("a",), 1)
+    region.set(("b",), 2, ttl=5)
+
+    clock.now += 10
+    assert region.get(("a",)) == 1
+    assert region.get(("b",)) is None
+
+    clock.now += 60
+    assert region.get(("a",)) is None
+    assert region.entries == {} and region.bytes == 0
+
+def test_least_recently_used_entry_is_evicted_first():
+    region = CacheNamespace("test", ttl=60, max_entries=2, max_bytes=1_000_000)
+    region.set(("a",), 1)
+    region.set(("b",), 2)
+    region.get(("a",))
+    region.set(("c",), 3)
+
+    assert region.get(("b",)) is None
+    assert region.get(("a",)) == 1 and region.get(("c",)) == 3
+    assert region.evictions == 1
+
+def test_invalidate_prefix_only_drops_matching_keys():
+    region = CacheNamespace("test", ttl=60, max_entries=10, max_bytes=1_000_000)
+    region.set(("CS101", "Lecture"), 1)
+    region.set(("CS101", "Lab"), 2)
+    region.set(("CS102", "Lecture"), 3)
+
+    assert region.invalidate_prefix(("CS101",)) == 2
+    assert list(region.entries) == [("CS102", "Lecture")]
+    assert region.bytes == region.entries[("CS102", "Lecture")][2]
+
+def test_value_over_the_budget_is_not_cached():
+    region = CacheNamespace("test", ttl=60, max_entries=10, max_bytes=1000)
+    region.set(("small",), "x")
+    region.set(("big",), "x" * 2000)
+
+    assert region.get(("big",)) is None
+    assert region.get(("small",)) == "x"
+
+def test_register_returns_the_existing_namespace():
+    registry = CacheRegistry()
+    region = registry.register("test", ttl=60)
+    assert registry.register("test", ttl=5) is region
+    registry.set("test", ("a",), 1)
+    registry.clear()
+    assert registry.get("test", ("a",)) is None
+
+def test_estimate_size_counts_encoded_body():
+    encoded = EncodedJSON({"a": "x" * 1_000_000})
+    assert estimate_size(encoded) > 1_000_000
+
+def test_estimate_size_counts_gzipped_body_once_built():
+    encoded = EncodedJSON({"a": list(range(10_000))})
+    before = estimate_size(encoded)
+    encoded.gzip_body()
+    assert estimate_size(encoded) > before
+
+def test_byte_budget_evicts_encoded_bodies():
+    region = CacheNamespace("test", ttl=60, max_entries=100, max_bytes=3_500_000)
+    for i in range(5):
+        region.set((i,), EncodedJSON({"a": "x" * 1_000_000}))
+
+    assert region.bytes <= region.max_bytes
+    assert len(region.entries) == 3
+    assert region.evictions == 2
+    # Oldest first
+    assert region.get((0,)) is None and region.get((1,)) is None
+    assert region.get((4,)) is not None
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import controllers.enrollmentController as enrollment_controller
+from fakes import FakeCollection
+from helpers.auth import TokenData
+
+STUDENT = TokenData(sub="student", role="student", user_id="s1")
+
+COURSES = {
+    course_id: {
+        "course_id": course_id, "name": course_id, "credit_hours": 3,
+        "semesters": ["Fall"], "prerequisites": prerequisites
+    }
+    for course_id, prerequisites in [("CS101", []), ("CS102", []), ("CS103", []), ("CS104", []), ("CS201", ["CS101"])]
+}
+
+class Snapshot:
+    def course(self, course_id):
+        return COURSES.get(course_id)
+
+@pytest.fixture
+def carts(monkeypatch):
+    collection = FakeCollection()
+    loads = []
+
+    async def load_student_context(student_id):
+        loads.append(student_id)
+        return {"student": {"credit_hours": 9}, "enrolled": set(), "completed": set(), "semester": "Fall"}
+
+    async def get_course_tree_flattened():
+        return set(COURSES)
+
+    async def get_snapshot():
+        return Snapshot()
+
+    monkeypatch.setattr(enrollment_controller, "carts_collection", collection)
+    monkeypatch.setattr(enrollment_controller, "load_student_context", load_student_context)
+    monkeypatch.setattr(enrollment_controller, "get_course_tree_flattened", get_course_tree_flattened)
+    monkeypatch.setattr(enrollment_controller.catalog, "get", get_snapshot)
+    enrollment_controller.CART_CONTEXT_CACHE.clear()
+    collection.loads = loads
+    yield collection
+    enrollment_controller.CART_CONTEXT_CACHE.clear()
+
+def course_ids(response):
+    return [item.course_id for item in response.courses]
+
+def test_cart_is_stored_once_per_course_and_survives_a_cold_worker(carts):
+    async def scenario():
+        await enrollment_controller.add_to_cart("CS101", STUDENT)
+        await enrollment_controller.add_to_cart("CS102", STUDENT)
+        await enrollment_controller.add_to_cart("CS101", STUDENT)
+        # Another worker has no cached context and rebuilds it
+        enrollment_controller.CART_CONTEXT_CACHE.clear()
+        return await enrollment_controller.view_cart(STUDENT)
+
+    response = asyncio.run(scenario())
+    assert course_ids(response) == ["CS101", "CS102"]
+    assert response.total_credit_hours == 6
+    assert [item["course_id"] for item in carts.documents[0]["courses"]] == ["CS101", "CS102"]
+    assert carts.loads == ["s1", "s1"]
+
+def test_cart_rejects_missing_prerequisites(carts):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(enrollment_controller.add_to_cart("CS201", STUDENT))
+    assert error.value.status_code == 400
+    assert error.value.detail == "Missing prerequisites: CS101"
+    assert carts.documents[0]["courses"] == []
+
+def test_cart_rejects_a_course_over_the_credit_limit(carts):
+    async def scenario():
+        for course_id in ("CS101", "CS102", "CS103"):
+            await enrollment_controller.add_to_cart(course_id, STUDENT)
+
+    asyncio.run(scenario())
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(enrollment_controller.add_to_cart("CS104", STUDENT))
+    assert "Insufficient credit hours" in error.value.detail
+    assert len(carts.documents[0]["courses"]) == 3
+
+def test_removing_a_course_not_in_the_cart_is_404(carts):
+    async def scenario():
+        await enrollment_controller.add_to_cart("CS101", STUDENT)
+        response = await enrollment_controller.remove_from_cart("CS101", STUDENT)
+        with pytest.raises(HTTPException) as error:
+            await enrollment_controller.remove_from_cart("CS101", STUDENT)
+        return response, error.value
+
+    response, error = asyncio.run(scenario())
+    assert course_ids(response) == []
+    assert carts.documents[0]["courses"] == []
+    assert error.status_code == 404
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import controllers.departmentController as department_controller
+import helpers.catalog as catalog_module
+from fakes import FakeCollection
+from helpers.catalog import CATALOG_SOURCES, CatalogKind, CatalogSnapshot
+
+@pytest.fixture
+def collections(monkeypatch):
+    collections = {
+        CatalogKind.COURSES: FakeCollection([
+            {"_id": "c1", "course_id": "CS101", "name": "Programming I", "department_id": "CS"},
+            {"_id": "c2", "course_id": "CS201", "name": "Data Structures", "department_id": "CS"},
+            {"_id": "c3", "course_id": "MATH101", "name": "Calculus", "department_id": "MATH"}
+        ]),
+        CatalogKind.DEPARTMENTS: FakeCollection([{"_id": "d1", "department_id": "CS", "name": "Computer Science"}]),
+        CatalogKind.ROOMS: FakeCollection([{"_id": "r1", "room_id": "R1", "building": "A", "room_number": "101"}]),
+        CatalogKind.INSTRUCTORS: FakeCollection([
+            {"_id": "u1", "instructor_id": "I1", "name": "Ada", "role": "instructor", "hashed_password": "x"},
+            {"_id": "u2", "student_id": "S1", "name": "Bob", "role": "student"}
+        ])
+    }
+    for kind, collection in collections.items():
+        _, key_field, query = CATALOG_SOURCES[kind]
+        monkeypatch.setitem(CATALOG_SOURCES, kind, (collection, key_field, query))
+    return collections
+
+@pytest.fixture
+def snapshot(collections):
+    return asyncio.run(CatalogSnapshot().get())
+
+def test_load_indexes_every_kind_by_business_key(snapshot):
+    assert snapshot.version == 1
+    assert [course["course_id"] for course in snapshot.department_courses("CS")] == ["CS101", "CS201"]
+    assert snapshot.department_name("CS") == "Computer Science"
+    assert snapshot.room_name("R1") == "A-101"
+    assert snapshot.instructor_name("I1") == "Ada"
+    assert "hashed_password" not in snapshot.instructor("I1")
+    assert snapshot.courses(["MATH101", "NOPE"]) == [snapshot.course("MATH101")]
+
+def test_course_events_patch_the_snapshot(snapshot):
+    # The business key itself changed
+    snapshot.on_change(CatalogKind.COURSES, {"operation": "update", "document_id": "c2", "document": {
+        "_id": "c2", "course_id": "CS202", "name": "Data Structures", "department_id": "MATH"
+    }})
+    assert snapshot.course("CS201") is None
+    assert [course["course_id"] for course in snapshot.department_courses("MATH")] == ["MATH101", "CS202"]
+
+    snapshot.on_change(CatalogKind.COURSES, {"operation": "delete", "document_id": "c1"})
+    assert snapshot.course("CS101") is None
+    assert snapshot.version == 3
+
+def test_demoted_instructor_leaves_the_snapshot(snapshot):
+    snapshot.on_change(CatalogKind.INSTRUCTORS, {"operation": "update", "document_id": "u1", "document": {
+        "_id": "u1", "instructor_id": "I1", "name": "Ada", "role": "student"
+    }})
+    assert snapshot.instructor("I1") is None
+
+def test_user_updates_without_documents_only_reload_for_instructors(snapshot):
+    # A student's credit hours changed
+    snapshot.on_change(CatalogKind.INSTRUCTORS, {
+        "operation": "update", "document_id": "u2", "updated_fields": {"credit_hours": 12}
+    })
+    assert snapshot.loaded
+
+    snapshot.on_change(CatalogKind.INSTRUCTORS, {
+        "operation": "update", "document_id": "u2", "updated_fields": {"role": "instructor"}
+    })
+    assert not snapshot.loaded
+
+def test_get_department_falls_back_to_the_object_id(collections, monkeypatch):
+    monkeypatch.setattr(department_controller, "catalog", CatalogSnapshot())
+    monkeypatch.setattr(department_controller, "departments_collection", collections[CatalogKind.DEPARTMENTS])
+
+    by_key = asyncio.run(department_controller.get_department("CS"))
+    by_object_id = asyncio.run(department_controller.get_department("d1"))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(department_controller.get_department("EE"))
+
+    assert by_key["name"] == by_object_id["name"] == "Computer Science"
+    assert error.value.status_code == 404
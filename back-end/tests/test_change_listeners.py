@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+import controllers.scheduleController as schedule_controller
+import database
+
+class ChangeStream:
+    def __init__(self, changes):
+        self.changes = changes
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for change in self.changes:
+            yield change
+
+@pytest.fixture
+def listeners(monkeypatch):
+    monkeypatch.setattr(database, "change_listeners", {})
+    return database.change_listeners
+
+def test_failing_listener_does_not_stop_the_others(listeners):
+    seen = []
+
+    def broken(event):
+        raise RuntimeError("boom")
+
+    async def coroutine_listener(event):
+        seen.append(event["document_id"])
+
+    database.add_change_listener("courses", broken)
+    database.add_change_listener("courses", coroutine_listener)
+    asyncio.run(database.notify_change_listeners("courses", {"document_id": "1"}))
+
+    assert seen == ["1"]
+
+def test_listeners_get_looked_up_documents_but_clients_do_not(listeners, monkeypatch):
+    listened, sent = [], []
+    database.add_change_listener("users", listened.append)
+
+    async def notify_subscribers(collection_name, event):
+        sent.append(event)
+
+    monkeypatch.setattr(database, "notify_subscribers", notify_subscribers)
+    document = {"_id": "u1", "name": "Ada", "hashed_password": "secret"}
+    asyncio.run(database.process_change_stream("users", ChangeStream([
+        {"operationType": "insert", "documentKey": {"_id": "u1"}, "fullDocument": document},
+        {
+            "operationType": "update", "documentKey": {"_id": "u1"}, "fullDocument": document,
+            "updateDescription": {"updatedFields": {"name": "Ada"}}
+        }
+    ])))
+
+    assert [event["document"] for event in listened] == [document, document]
+    assert sent[0]["document"] == {"_id": "u1", "name": "Ada"}
+    assert "document" not in sent[1]
+    assert sent[1]["updated_fields"] == {"name": "Ada"}
+
+@pytest.fixture
+def slot_caches(monkeypatch):
+    monkeypatch.setattr(schedule_controller, "SLOT_COURSES", {"slot-a": "CS101", "slot-b": "CS102"})
+    for course_id in ("CS101", "CS102"):
+        schedule_controller.TIME_SLOTS_CACHE.set((course_id, "Lecture"), [])
+        schedule_controller.SEAT_COUNT_CACHE.set((course_id,), [])
+    yield
+    schedule_controller.TIME_SLOTS_CACHE.clear()
+    schedule_controller.SEAT_COUNT_CACHE.clear()
+
+def cached_courses():
+    return (
+        sorted(key[0] for key in schedule_controller.TIME_SLOTS_CACHE.entries),
+        sorted(key[0] for key in schedule_controller.SEAT_COUNT_CACHE.entries)
+    )
+
+def test_seat_counter_update_only_evicts_that_course_seats(slot_caches):
+    schedule_controller.on_time_slot_change({
+        "operation": "update", "document_id": "slot-a", "updated_fields": {"seats_taken": 3}
+    })
+    assert cached_courses() == (["CS101", "CS102"], ["CS102"])
+
+def test_slot_update_with_document_evicts_that_course(slot_caches):
+    schedule_controller.on_time_slot_change({
+        "operation": "update", "document_id": "slot-c", "updated_fields": {"room_id": "R2"},
+        "document": {"course_id": "CS102"}
+    })
+    assert cached_courses() == (["CS101"], ["CS101"])
+
+def test_slot_delete_evicts_its_course_and_forgets_the_slot(slot_caches):
+    schedule_controller.on_time_slot_change({"operation": "delete", "document_id": "slot-a"})
+    assert cached_courses() == (["CS102"], ["CS102"])
+    assert schedule_controller.SLOT_COURSES == {"slot-b": "CS102"}
+
+    # A slot never seen here could belong to any course
+    schedule_controller.on_time_slot_change({"operation": "delete", "document_id": "slot-z"})
+    assert cached_courses() == ([], [])
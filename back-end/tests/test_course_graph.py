@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import controllers.CourseTreeController as course_tree_controller
+import helpers.course_graph as course_graph_module
+from fakes import FakeCollection
+from helpers.catalog import CATALOG_SOURCES, CatalogKind, CatalogSnapshot
+from helpers.course_graph import CourseGraph, group_by_department
+
+def graph_of(prerequisites, version=1):
+    return CourseGraph(
+        [{"course_id": course_id, "prerequisites": prereqs} for course_id, prereqs in prerequisites.items()],
+        version
+    )
+
+# CS101 -> CS201 -> CS301, MATH101 -> CS301, CS201 -> CS310
+CATALOG = {
+    "CS101": [],
+    "MATH101": [],
+    "CS201": ["CS101", "UNKNOWN"],
+    "CS301": ["CS201", "MATH101", "CS201"],
+    "CS310": ["CS201"]
+}
+
+def test_edges_skip_unknown_and_duplicate_prerequisites():
+    graph = graph_of(CATALOG)
+    assert graph.prerequisites["CS201"] == ["CS101"]
+    assert graph.prerequisites["CS301"] == ["CS201", "MATH101"]
+    assert graph.dependents["CS201"] == ["CS301", "CS310"]
+
+def test_topological_order_follows_catalog_order():
+    graph = graph_of(CATALOG)
+    assert graph.topological_order == ["CS101", "MATH101", "CS201", "CS301", "CS310"]
+    assert graph.cyclic == set()
+
+def test_transitive_closures():
+    graph = graph_of(CATALOG)
+    assert graph.ancestors("CS301") == {"CS101", "CS201", "MATH101"}
+    assert graph.descendants("CS101") == {"CS201", "CS301", "CS310"}
+    assert graph.ancestors("UNKNOWN") == frozenset()
+    # Memoized along the way
+    assert graph.ancestor_memo["CS201"] == {"CS101"}
+
+def test_closures_still_terminate_on_a_cyclic_catalog():
+    graph = graph_of({"A": ["C"], "B": ["A"], "C": ["B"], "D": ["C"]})
+    assert graph.cyclic == {"A", "B", "C", "D"}
+    assert graph.ancestors("D") == {"A", "B", "C"}
+
+def test_render_forest_places_each_course_once():
+    graph = graph_of(CATALOG)
+    nodes = {course_id: {"course_id": course_id, "children": []} for course_id in CATALOG}
+
+    roots = graph.render_forest(nodes)
+
+    def walk(node):
+        yield node["course_id"]
+        for child in node["children"]:
+            yield from walk(child)
+
+    assert [root["course_id"] for root in roots] == ["CS101", "MATH101"]
+    assert [course_id for root in roots for course_id in walk(root)] == [
+        "CS101", "CS201", "CS301", "CS310", "MATH101"
+    ]
+
+def test_group_by_department_keeps_first_seen_order():
+    roots = [
+        {"course_id": "MATH101", "department_id": "MATH", "department_name": "Mathematics"},
+        {"course_id": "CS101", "department_id": "CS", "department_name": "Computer Science"},
+        {"course_id": "MATH102", "department_id": "MATH", "department_name": "Mathematics"}
+    ]
+    departments = group_by_department(roots, {"semester": "Fall"})
+    assert [(department["department_id"], len(department["courses"])) for department in departments] == [
+        ("MATH", 2), ("CS", 1)
+    ]
+    assert departments[0]["semester"] == "Fall"
+
+def test_tarjan_finds_every_cycle_and_nothing_else():
+    graph = graph_of({
+        "A": ["B"], "B": ["C"], "C": ["A"],  # three-course cycle
+        "D": ["D"],                          # requires itself
+        "E": ["A"], "F": ["E"],              # depend on a cycle, but are not on one
+        "G": ["H"], "H": ["G"]
+    })
+    assert graph.strongly_connected_components() == [["A", "B", "C"], ["D"], ["G", "H"]]
+    assert graph.cycle_path(["A", "B", "C"]) == ["A", "B", "C", "A"]
+    assert graph.cycle_path(["D"]) == ["D", "D"]
+
+def test_acyclic_catalog_has_no_components():
+    assert graph_of(CATALOG).strongly_connected_components() == []
+
+def test_deep_chain_does_not_hit_the_recursion_limit():
+    chain = {f"C{i}": [f"C{i - 1}"] if i else [] for i in range(5000)}
+    chain["C0"] = ["C4999"]
+    components = graph_of(chain).strongly_connected_components()
+    assert len(components) == 1 and len(components[0]) == 5000
+
+@pytest.mark.parametrize("course_id, prereq_id, cycle", [
+    ("CS101", "CS301", ["CS101", "CS301", "CS201", "CS101"]),
+    ("CS101", "CS101", ["CS101", "CS101"]),
+    ("MATH101", "CS310", None),
+    ("CS310", "CS301", None)
+])
+def test_cycle_if_added(course_id, prereq_id, cycle):
+    graph = graph_of(CATALOG)
+    assert graph.cycle_if_added(course_id, prereq_id) == cycle
+    # Same answer once the closures are memoized
+    graph.ancestors(prereq_id)
+    assert graph.cycle_if_added(course_id, prereq_id) == cycle
+
+@pytest.fixture
+def courses(monkeypatch):
+    collection = FakeCollection([
+        {"course_id": course_id, "prerequisites": prereqs}
+        for course_id, prereqs in CATALOG.items()
+    ])
+    for kind in CATALOG_SOURCES:
+        _, key_field, query = CATALOG_SOURCES[kind]
+        source = collection if kind == CatalogKind.COURSES else FakeCollection()
+        monkeypatch.setitem(CATALOG_SOURCES, kind, (source, key_field, query))
+    snapshot = CatalogSnapshot()
+    monkeypatch.setattr(course_tree_controller, "catalog", snapshot)
+    monkeypatch.setattr(course_graph_module, "catalog", snapshot)
+    monkeypatch.setattr(course_graph_module, "_graph", None)
+    monkeypatch.setattr(course_tree_controller, "courses_collection", collection)
+    return collection
+
+def prerequisites_of(collection, course_id):
+    return next(course["prerequisites"] for course in collection.documents if course["course_id"] == course_id)
+
+def test_adding_a_prerequisite_that_closes_a_cycle_is_rejected(courses):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(course_tree_controller.add_prerequisite("CS101", "CS310"))
+
+    assert error.value.status_code == 400
+    assert error.value.detail == "Circular dependency detected: CS101 -> CS310 -> CS201 -> CS101"
+    assert prerequisites_of(courses, "CS101") == []
+
+def test_added_prerequisite_is_seen_by_the_next_cycle_check(courses):
+    asyncio.run(course_tree_controller.add_prerequisite("MATH101", "CS310"))
+    assert prerequisites_of(courses, "MATH101") == ["CS310"]
+
+    # MATH101 now requires CS101 through CS310 and CS201
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(course_tree_controller.add_prerequisite("CS101", "MATH101"))
+    assert error.value.detail == "Circular dependency detected: CS101 -> MATH101 -> CS310 -> CS201 -> CS101"
+
+    validation = asyncio.run(course_tree_controller.validate_course_tree())
+    assert validation["valid"] is True
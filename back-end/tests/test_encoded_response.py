@@ -0,0 +1,52 @@
+import asyncio
+import gzip
+import json
+from datetime import time
+
+from helpers.encoded_response import GZIP_MIN_SIZE, EncodedJSON, EncodedJSONResponse
+from models.Schedules import DayOfWeek
+
+def send_response(response, accept_encoding=None):
+    """Run an ASGI response and collect its status, headers and body"""
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    messages = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(response({"type": "http", "headers": headers}, receive, send))
+    start, body = messages[0], messages[1]["body"]
+    return start["status"], {name.decode(): value.decode() for name, value in start["headers"]}, body
+
+def test_body_matches_the_fastapi_encoding():
+    encoded = EncodedJSON({DayOfWeek.MONDAY: [{"start": time(9, 30)}], "n": 1})
+    assert json.loads(encoded.body) == {"Monday": [{"start": "09:30:00"}], "n": 1}
+
+def test_large_body_is_gzipped_once_for_clients_that_accept_it():
+    encoded = EncodedJSON({"courses": ["CS101"] * GZIP_MIN_SIZE})
+
+    status, headers, body = send_response(EncodedJSONResponse(encoded), "gzip, br")
+    gzipped = encoded.gzipped
+    send_response(EncodedJSONResponse(encoded), "gzip")
+
+    assert status == 200
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(body)
+    assert gzip.decompress(body) == encoded.body
+    assert encoded.gzipped is gzipped
+
+def test_plain_body_for_clients_without_gzip_and_for_small_bodies():
+    large = EncodedJSON({"courses": ["CS101"] * GZIP_MIN_SIZE})
+    _, headers, body = send_response(EncodedJSONResponse(large))
+    assert "content-encoding" not in headers
+    assert body == large.body
+    assert large.gzipped is None
+
+    small = EncodedJSON({"ok": True})
+    _, headers, body = send_response(EncodedJSONResponse(small), "gzip")
+    assert "content-encoding" not in headers and "vary" not in headers
+    assert body == b'{"ok":true}'
@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import controllers.enrollmentController as enrollment_controller
+import helpers.prerequisite_index as prerequisite_index_module
+from fakes import FakeCollection
+from helpers.exceptions import EnrollmentError
+from helpers.prerequisite_index import STUDENT_MASKS_CACHE, PrerequisiteIndex
+from models.Enrollments import EnrollmentStatus
+
+COURSES = {
+    "CS101": {"course_id": "CS101", "name": "Programming I", "credit_hours": 3, "semesters": ["Fall"], "prerequisites": []},
+    "CS102": {"course_id": "CS102", "name": "Programming II", "credit_hours": 3, "semesters": ["Fall"], "prerequisites": []},
+    "CS201": {"course_id": "CS201", "name": "Data Structures", "credit_hours": 3, "semesters": ["Fall"], "prerequisites": ["CS101"]},
+    "CS301": {"course_id": "CS301", "name": "Compilers", "credit_hours": 4, "semesters": ["Spring"], "prerequisites": []},
+    "CS401": {"course_id": "CS401", "name": "Thesis", "credit_hours": 12, "semesters": ["Fall"], "prerequisites": []}
+}
+
+class Snapshot:
+    version = 1
+
+    def course(self, course_id):
+        return COURSES.get(course_id)
+
+    def courses(self, course_ids=None):
+        return [COURSES[course_id] for course_id in (course_ids if course_ids is not None else COURSES)]
+
+class Catalog:
+    async def get(self):
+        return Snapshot()
+
+class Settings:
+    async def get(self):
+        return SimpleNamespace(current_semester="Fall")
+
+@pytest.fixture(autouse=True)
+def lookups(monkeypatch):
+    enrollments = FakeCollection([
+        {"student_id": "s1", "course_id": "CS101", "status": EnrollmentStatus.PENDING}
+    ])
+    for module in (enrollment_controller, prerequisite_index_module):
+        monkeypatch.setattr(module, "catalog", Catalog())
+        monkeypatch.setattr(module, "enrollments_collection", enrollments)
+    monkeypatch.setattr(enrollment_controller, "users_collection", FakeCollection([
+        {"student_id": "s1", "credit_hours": 9}
+    ]))
+    monkeypatch.setattr(enrollment_controller, "prerequisite_index", PrerequisiteIndex())
+    monkeypatch.setattr(enrollment_controller, "semester_settings", Settings())
+    STUDENT_MASKS_CACHE.clear()
+    yield
+    STUDENT_MASKS_CACHE.clear()
+
+@pytest.mark.parametrize("student_id, course_id, message", [
+    ("s2", "CS101", "Student not found"),
+    ("s1", "CS999", "Course not found"),
+    # CS101 is only pending, not completed
+    ("s1", "CS201", "Missing prerequisites: CS101 (Programming I)"),
+    ("s1", "CS401", "Insufficient credit hours. Required: 12, Available: 9"),
+    ("s1", "CS101", "Already enrolled in this course"),
+    ("s1", "CS301", "Course not offered in the current Fall semester")
+])
+def test_validate_enrollment_rejections(student_id, course_id, message):
+    with pytest.raises(EnrollmentError) as error:
+        asyncio.run(enrollment_controller.validate_enrollment(student_id, course_id))
+    assert str(error.value) == message
+
+def test_validate_enrollment_returns_student_and_course():
+    student, course = asyncio.run(enrollment_controller.validate_enrollment("s1", "CS102"))
+    assert student["student_id"] == "s1"
+    assert course["course_id"] == "CS102"
@@ -0,0 +1,33 @@
+from fastapi import Response
+
+from helpers.etag import check_etag, etag_matches, make_etag
+
+def test_etag_is_stable_per_parts():
+    assert make_etag("courses", 3) == make_etag("courses", 3)
+    assert make_etag("courses", 3) != make_etag("courses", 4)
+    assert make_etag("courses", 3).startswith('"')
+
+def test_if_none_match_uses_the_weak_comparison():
+    etag = make_etag("courses", 3)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"stale", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(make_etag("courses", 2), etag)
+
+def test_matching_tag_answers_304_without_a_body():
+    etag = make_etag("tree", "s1", 7)
+    not_modified = check_etag(Response(), etag, etag, private=True)
+
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.headers["Cache-Control"] == "private, no-cache"
+
+def test_stale_tag_tags_the_full_response():
+    etag = make_etag("courses", 3)
+    response = Response()
+
+    assert check_etag(response, make_etag("courses", 2), etag) is None
+    assert response.headers["ETag"] == etag
+    assert response.headers["Cache-Control"] == "no-cache"
@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+import helpers.idempotency as idempotency
+from fakes import FakeCollection
+from helpers.idempotency import IDEMPOTENCY_CACHE, IdempotencyStatus, request_fingerprint, run_idempotent
+
+@pytest.fixture
+def records(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(idempotency, "idempotency_collection", collection)
+    IDEMPOTENCY_CACHE.clear()
+    yield collection
+    IDEMPOTENCY_CACHE.clear()
+
+def in_progress(record_id, claimed_at, **fields):
+    return {
+        "_id": record_id,
+        "status": IdempotencyStatus.IN_PROGRESS,
+        "fingerprint": request_fingerprint({"course_id": "CS101"}),
+        "claim": "other-worker",
+        "claimed_at": claimed_at,
+        **fields
+    }
+
+def counting_handler():
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        return {"enrolled": len(calls)}
+
+    return handler, calls
+
+def test_replayed_key_returns_the_stored_response(records):
+    handler, calls = counting_handler()
+    payload = {"course_id": "CS101"}
+
+    first = asyncio.run(run_idempotent("key", "enroll", payload, handler))
+    # Another worker has an empty cache and reads the stored record
+    IDEMPOTENCY_CACHE.clear()
+    replay = asyncio.run(run_idempotent("key", "enroll", payload, handler))
+
+    assert first == {"enrolled": 1}
+    assert calls == [1]
+    assert replay.status_code == 200
+    assert replay.body == b'{"enrolled":1}'
+    assert replay.headers["Idempotent-Replayed"] == "true"
+
+def test_key_reused_for_a_different_request_is_rejected(records):
+    handler, calls = counting_handler()
+    asyncio.run(run_idempotent("key", "enroll", {"course_id": "CS101"}, handler))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run_idempotent("key", "enroll", {"course_id": "CS102"}, handler))
+    assert error.value.status_code == 422
+    assert calls == [1]
+
+def test_client_errors_are_stored_and_server_errors_release_the_key(records):
+    async def rejected():
+        raise HTTPException(status_code=400, detail="Course is full")
+
+    async def crashed():
+        raise HTTPException(status_code=503, detail="Database unavailable")
+
+    with pytest.raises(HTTPException):
+        asyncio.run(run_idempotent("full", "enroll", {}, rejected))
+    replay = asyncio.run(run_idempotent("full", "enroll", {}, rejected))
+    assert replay.status_code == 400
+
+    with pytest.raises(HTTPException):
+        asyncio.run(run_idempotent("down", "enroll", {}, crashed))
+    assert [record["_id"] for record in records.documents] == ["enroll:full"]
+
+def test_fresh_claim_by_another_request_is_a_conflict(records):
+    records.documents.append(in_progress("enroll:key", datetime.now(timezone.utc)))
+    handler, calls = counting_handler()
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run_idempotent("key", "enroll", {"course_id": "CS101"}, handler))
+    assert error.value.status_code == 409
+    assert calls == []
+
+def test_expired_lease_is_taken_over(records):
+    # Motor returns naive UTC datetimes
+    stale = datetime.now(timezone.utc).replace(tzinfo=None) - idempotency.IDEMPOTENCY_LEASE - timedelta(seconds=1)
+    records.documents.append(in_progress("enroll:key", stale))
+    handler, calls = counting_handler()
+
+    result = asyncio.run(run_idempotent("key", "enroll", {"course_id": "CS101"}, handler))
+
+    assert result == {"enrolled": 1}
+    record = records.documents[0]
+    assert record["status"] == IdempotencyStatus.COMPLETED
+    assert record["claim"] != "other-worker"
+
+def test_late_completion_of_a_taken_over_claim_is_ignored(records):
+    records.documents.append(in_progress("enroll:key", datetime.now(timezone.utc), claim="new-owner"))
+
+    asyncio.run(idempotency.complete("enroll:key", "fingerprint", "old-owner", 200, {}))
+
+    assert records.documents[0]["status"] == IdempotencyStatus.IN_PROGRESS
+    assert IDEMPOTENCY_CACHE.get(("enroll:key",)) is None
+
+def test_cancelled_request_releases_the_key(records):
+    async def scenario():
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(run_idempotent("key", "enroll", {}, slow))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert records.documents == []
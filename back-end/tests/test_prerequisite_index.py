@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import helpers.prerequisite_index as prerequisite_index_module
+from fakes import FakeCollection
+from helpers.prerequisite_index import STUDENT_MASKS_CACHE, PrerequisiteIndex
+from models.Enrollments import EnrollmentStatus
+
+class Snapshot:
+    def __init__(self, version, courses):
+        self.version = version
+        self._courses = courses
+
+    def courses(self):
+        return self._courses
+
+class Catalog:
+    def __init__(self):
+        self.snapshot = Snapshot(1, [
+            {"course_id": "CS101", "prerequisites": []},
+            {"course_id": "CS201", "prerequisites": ["CS101"]},
+            {"course_id": "CS301", "prerequisites": ["CS201", "MATH201"]},
+            {"course_id": "MATH201", "prerequisites": []}
+        ])
+
+    async def get(self):
+        return self.snapshot
+
+@pytest.fixture
+def index(monkeypatch):
+    enrollments = FakeCollection([
+        {"student_id": "s1", "course_id": "CS101", "status": EnrollmentStatus.COMPLETED},
+        {"student_id": "s1", "course_id": "MATH201", "status": EnrollmentStatus.PENDING}
+    ])
+    monkeypatch.setattr(prerequisite_index_module, "enrollments_collection", enrollments)
+    monkeypatch.setattr(prerequisite_index_module, "catalog", Catalog())
+    STUDENT_MASKS_CACHE.clear()
+    yield PrerequisiteIndex()
+    STUDENT_MASKS_CACHE.clear()
+
+def test_missing_prerequisites_only_counts_completed_courses(index):
+    assert asyncio.run(index.missing_prerequisites("s1", "CS201")) == []
+    # MATH201 is only pending
+    assert sorted(asyncio.run(index.missing_prerequisites("s1", "CS301"))) == ["CS201", "MATH201"]
+
+def test_eligible_courses_from_the_completed_mask(index):
+    _, completed = asyncio.run(index.load("s1"))
+    assert index.eligible_courses(completed) == {"CS101", "CS201", "MATH201"}
+
+def test_enrollment_events_update_and_drop_student_masks(index):
+    asyncio.run(index.load("s1"))
+    index.on_enrollment_change({"operation": "update", "document": {
+        "student_id": "s1", "course_id": "CS201", "status": EnrollmentStatus.COMPLETED
+    }})
+    index.on_enrollment_change({"operation": "update", "document": {
+        "student_id": "s1", "course_id": "MATH201", "status": EnrollmentStatus.COMPLETED
+    }})
+    active, completed = STUDENT_MASKS_CACHE.get(("s1",))
+    assert index.is_eligible("CS301", completed)
+    assert index.has(active, "CS201")
+
+    # A withdrawal can't clear a bit safely; the masks are reloaded instead
+    index.on_enrollment_change({"operation": "update", "document": {
+        "student_id": "s1", "course_id": "CS201", "status": EnrollmentStatus.WITHDRAWN
+    }})
+    assert STUDENT_MASKS_CACHE.get(("s1",)) is None
+
+def test_new_catalog_version_rebuilds_the_prerequisite_masks(index):
+    asyncio.run(index.ensure_catalog())
+    assert index.is_eligible("CS201", index.mask_of(["CS101"]))
+
+    prerequisite_index_module.catalog.snapshot = Snapshot(2, [{"course_id": "CS201", "prerequisites": ["CS101", "CS102"]}])
+    asyncio.run(index.ensure_catalog())
+    assert index.ids_of(index.missing_mask("CS201", index.mask_of(["CS101"]))) == ["CS102"]
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+import helpers.registration_queue as registration_queue_module
+from fakes import FakeCollection
+from helpers.exceptions import EnrollmentError
+from helpers.registration_queue import QueueFullError, RegistrationQueue, TicketStatus, public_ticket
+
+@pytest.fixture
+def tickets(monkeypatch):
+    collection = FakeCollection()
+    notified = []
+
+    async def notify(topic, entity_id, message):
+        notified.append(message)
+
+    monkeypatch.setattr(registration_queue_module, "tickets_collection", collection)
+    monkeypatch.setattr(registration_queue_module, "notify_entity_subscribers", notify)
+    collection.notified = notified
+    return collection
+
+async def drain(queue: RegistrationQueue):
+    await asyncio.gather(*(partition.join() for partition in queue.queues))
+    # Let the workers store the final state after task_done
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_finished_ticket_can_be_polled_from_another_process(tickets):
+    async def scenario():
+        queue = RegistrationQueue(workers=2, max_pending=10)
+        await queue.start()
+        try:
+            async def enroll():
+                return {"course_id": "CS101"}
+
+            ticket = await queue.submit("s1", "CS101", enroll)
+            assert (await queue.get_ticket(ticket["ticket_id"]))["status"] == TicketStatus.QUEUED
+            await drain(queue)
+        finally:
+            await queue.stop()
+        # A fresh queue holds nothing in memory, as on another worker
+        return await RegistrationQueue().get_ticket(ticket["ticket_id"])
+
+    stored = asyncio.run(scenario())
+    assert stored["status"] == TicketStatus.COMPLETED
+    assert stored["status_code"] == 200
+    assert stored["result"] == {"course_id": "CS101"}
+    assert public_ticket(stored).keys() == set(registration_queue_module.PUBLIC_TICKET_FIELDS)
+    assert tickets.notified[0]["operation"] == "ticket_completed"
+
+def test_rejected_enrollment_fails_the_ticket(tickets):
+    async def scenario():
+        queue = RegistrationQueue(workers=1, max_pending=10)
+        await queue.start()
+        try:
+            async def enroll():
+                raise EnrollmentError("Course is full")
+
+            ticket = await queue.submit("s1", "CS101", enroll)
+            await drain(queue)
+        finally:
+            await queue.stop()
+        return await queue.get_ticket(ticket["ticket_id"])
+
+    stored = asyncio.run(scenario())
+    assert stored["status"] == TicketStatus.FAILED
+    assert stored["status_code"] == 400
+    assert stored["error"] == "Course is full"
+
+def test_full_partition_rejects_without_storing_a_ticket(tickets):
+    async def scenario():
+        queue = RegistrationQueue(workers=1, max_pending=1)
+        await queue.start()
+        release = asyncio.Event()
+
+        async def enroll():
+            await release.wait()
+
+        try:
+            await queue.submit("s1", "CS101", enroll)
+            # Wait for the worker to take the first job, then fill the queue
+            await asyncio.sleep(0)
+            await queue.submit("s2", "CS101", enroll)
+            with pytest.raises(QueueFullError):
+                await queue.submit("s3", "CS101", enroll)
+            assert {ticket["student_id"] for ticket in tickets.documents} == {"s1", "s2"}
+            release.set()
+            await drain(queue)
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
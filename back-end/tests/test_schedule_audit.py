@@ -0,0 +1,52 @@
+import itertools
+import random
+
+import pytest
+
+import helpers.schedule_audit as schedule_audit
+from helpers.schedule_audit import AuditRows, overlapping_pairs
+
+@pytest.fixture(params=["python", "numpy"])
+def implementation(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(schedule_audit, "numpy", None)
+    return request.param
+
+def test_overlapping_pairs_match_a_brute_force_scan(implementation):
+    generator = random.Random(11)
+    for _ in range(200):
+        count = generator.randint(0, 40)
+        keys = [generator.randint(0, 4) for _ in range(count)]
+        starts = [generator.randint(0, 1380) for _ in range(count)]
+        ends = [start + generator.randint(1, 59) for start in starts]
+
+        pairs = overlapping_pairs(keys, starts, ends)
+
+        expected = {
+            (i, j) for i, j in itertools.combinations(range(count), 2)
+            if keys[i] == keys[j] and starts[i] < ends[j] and starts[j] < ends[i]
+        }
+        assert {tuple(sorted(pair)) for pair in pairs} == expected
+        assert len(pairs) == len(expected)
+        assert all(starts[i] <= starts[j] for i, j in pairs)
+
+def test_intervals_do_not_spill_into_the_next_key(implementation):
+    # Key 0 ends at midnight, key 1 starts at midnight
+    assert overlapping_pairs([0, 1], [1380, 0], [1440, 60]) == []
+    assert overlapping_pairs([], [], []) == []
+
+def test_audit_rows_report_conflicts_per_owner_and_day(implementation):
+    rows = [
+        {"student_id": "s1", "slot_id": "a", "day": "Monday", "start_min": 540, "end_min": 630},
+        {"student_id": "s1", "slot_id": "b", "day": "Monday", "start_time": "10:00:00", "end_time": "11:00:00"},
+        {"student_id": "s1", "slot_id": "c", "day": "Tuesday", "start_min": 540, "end_min": 630},
+        {"student_id": "s2", "slot_id": "d", "day": "Monday", "start_min": 540, "end_min": 630},
+        {"student_id": "s2", "slot_id": "e", "day": "Monday", "start_min": 630, "end_min": 700},
+        {"student_id": "s2", "slot_id": "empty", "day": "Monday", "start_min": 560, "end_min": 560},
+        {"student_id": None, "slot_id": "orphan", "day": "Monday", "start_min": 540, "end_min": 630},
+        {"student_id": "s1", "slot_id": "weekend", "day": "Someday", "start_min": 540, "end_min": 630}
+    ]
+    conflicts = AuditRows(rows, "student_id").conflicts()
+    assert [(first["slot_id"], second["slot_id"]) for first, second in conflicts] == [("a", "b")]
@@ -0,0 +1,125 @@
+import asyncio
+import random
+
+import pytest
+
+import helpers.schedule_index as schedule_index_module
+from fakes import FakeCollection
+from helpers.schedule_index import (
+    BUCKETS_PER_DAY,
+    SCHEDULE_INDEX_CACHE,
+    DaySchedule,
+    Interval,
+    ScheduleIndex,
+    WeekSchedule,
+    interval_bitmap,
+    slot_bitmap
+)
+
+def row(slot_id, day, start, end):
+    return {"slot_id": slot_id, "day": day, "start_min": start, "end_min": end}
+
+def overlaps(first, second):
+    return first[0] < second[1] and second[0] < first[1]
+
+def test_find_conflict_matches_a_brute_force_scan():
+    generator = random.Random(7)
+    for _ in range(300):
+        intervals = []
+        for index in range(generator.randint(0, 12)):
+            start = generator.randrange(0, 1440, 5)
+            intervals.append(Interval(start, start + generator.randrange(0, 180, 5), {"slot_id": index}))
+        day = DaySchedule(intervals)
+
+        for _ in range(20):
+            start = generator.randrange(0, 1440, 5)
+            end = start + generator.randrange(0, 120, 5)
+            conflict = day.find_conflict(start, end)
+            expected = start < end and any(
+                interval.start < interval.end and overlaps((interval.start, interval.end), (start, end))
+                for interval in intervals
+            )
+            assert (conflict is not None) == expected
+            if conflict is not None:
+                assert overlaps((conflict.start, conflict.end), (start, end))
+
+def test_back_to_back_sections_do_not_conflict():
+    day = DaySchedule([Interval(540, 600, {}), Interval(600, 660, {})])
+    assert day.find_conflict(660, 720) is None
+    assert day.find_conflict(480, 540) is None
+    assert day.find_conflict(599, 601).start == 600
+
+def test_long_interval_is_found_behind_shorter_later_ones():
+    # The running argmax of ends finds the 8:00-12:00 block, not the last start before 11:00
+    day = DaySchedule([Interval(480, 720, {"slot_id": "long"}), Interval(540, 560, {}), Interval(600, 620, {})])
+    assert day.find_conflict(650, 700).slot["slot_id"] == "long"
+
+def test_conflicts_lists_every_overlapping_pair_once():
+    week = WeekSchedule([
+        row("a", "Monday", 540, 660),
+        row("b", "Monday", 600, 630),
+        row("c", "Monday", 620, 700),
+        row("d", "Monday", 700, 760),
+        row("e", "Tuesday", 540, 660)
+    ])
+    pairs = [(day, first.slot["slot_id"], second.slot["slot_id"]) for day, first, second in week.conflicts()]
+    assert pairs == [("Monday", "a", "b"), ("Monday", "a", "c"), ("Monday", "b", "c")]
+
+def test_rows_without_minutes_are_parsed_from_their_times():
+    week = WeekSchedule([{"slot_id": "old", "day": "Friday", "start_time": "13:00:00", "end_time": "14:15:00"}])
+    assert week.find_conflict("Friday", 840, 900).slot["slot_id"] == "old"
+    assert week.find_conflict("Friday", 855, 900) is None
+
+def test_interval_bitmap_buckets():
+    # Sunday is the first day of the week; 09:00-09:12 covers buckets 108, 109 and part of 110
+    assert interval_bitmap("Sunday", 540, 552) == 0b111 << 108
+    assert interval_bitmap("Monday", 540, 545) == 1 << (BUCKETS_PER_DAY + 108)
+    assert interval_bitmap("Monday", 600, 600) == 0
+    assert interval_bitmap("Someday", 540, 600) == 0
+
+def test_disjoint_bitmaps_rule_out_conflicts_across_days_and_back_to_back():
+    monday = slot_bitmap(row("a", "Monday", 540, 600))
+    assert not monday & slot_bitmap(row("b", "Tuesday", 540, 600))
+    assert not monday & slot_bitmap(row("c", "Monday", 600, 660))
+    assert monday & slot_bitmap(row("d", "Monday", 595, 660))
+
+def test_shared_bucket_still_gets_the_exact_check():
+    week = WeekSchedule([row("a", "Monday", 540, 542)])
+    slot = row("b", "Monday", 543, 545)
+
+    assert week.bitmap & slot_bitmap(slot)
+    assert week.slot_conflict(slot) is None
+    assert week.slot_conflict(row("c", "Monday", 541, 545)).slot["slot_id"] == "a"
+
+def test_slot_conflict_uses_the_precomputed_week_bitmap():
+    week = WeekSchedule([row("a", "Monday", 540, 600)])
+    slot = row("b", "Monday", 570, 630)
+    assert week.slot_conflict({**slot, "week_bitmap": slot_bitmap(slot)}).slot["slot_id"] == "a"
+    # The row is not re-parsed when the bitmap is there
+    assert week.slot_conflict({"day": "Tuesday", "week_bitmap": 0}) is None
+
+@pytest.fixture
+def schedules(monkeypatch):
+    collection = FakeCollection([
+        {**row("a", "Monday", 540, 600), "student_id": "s1"},
+        {**row("b", "Monday", 540, 600), "student_id": "s2"}
+    ])
+    monkeypatch.setattr(schedule_index_module, "schedules_collection", collection)
+    SCHEDULE_INDEX_CACHE.clear()
+    yield collection
+    SCHEDULE_INDEX_CACHE.clear()
+
+def test_index_is_kept_until_the_student_schedule_changes(schedules):
+    index = ScheduleIndex()
+    first = asyncio.run(index.get("s1"))
+    assert [row["slot_id"] for row in first.rows] == ["a"]
+    assert asyncio.run(index.get("s1")) is first
+    other = asyncio.run(index.get("s2"))
+
+    index.on_schedule_change({"operation": "insert", "document": {"student_id": "s1"}})
+    assert asyncio.run(index.get("s1")) is not first
+    assert asyncio.run(index.get("s2")) is other
+
+    # Deletes carry no student_id
+    index.on_schedule_change({"operation": "delete", "document_id": "x"})
+    assert asyncio.run(index.get("s2")) is not other
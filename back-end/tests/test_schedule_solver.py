@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import json
+import random
+
+import pytest
+
+import controllers.scheduleController as schedule_controller
+from fakes import FakeCollection
+from helpers.auth import TokenData
+from helpers.catalog import CATALOG_SOURCES, CatalogKind, CatalogSnapshot
+from helpers.schedule_index import WeekSchedule
+from helpers.schedule_solver import ScheduleSolver, build_requirement, compatible, score, to_section
+from models.Enrollments import EnrollmentStatus
+
+DAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
+
+def row(slot_id, day, start, end, course_id="C", slot_type="Lecture"):
+    return {
+        "slot_id": slot_id, "course_id": course_id, "type": slot_type,
+        "day": day, "start_min": start, "end_min": end
+    }
+
+def random_row(generator, slot_id, course_id, slot_type):
+    start = generator.randrange(7 * 60, 17 * 60, 5)
+    return row(slot_id, generator.choice(DAYS), start, start + generator.choice([50, 75, 90]), course_id, slot_type)
+
+def test_best_options_match_a_brute_force_search():
+    generator = random.Random(3)
+    for trial in range(150):
+        fixed_rows = []
+        for index in range(generator.randint(0, 3)):
+            candidate = random_row(generator, f"F{index}", "F", "Lecture")
+            if all(compatible(to_section(candidate), to_section(other)) for other in fixed_rows):
+                fixed_rows.append(candidate)
+        fixed = WeekSchedule(fixed_rows)
+        requirements = [
+            build_requirement(fixed, f"C{course}", slot_type, [
+                random_row(generator, f"C{course}-{slot_type}-{index}", f"C{course}", slot_type)
+                for index in range(generator.randint(1, 4))
+            ])
+            for course in range(generator.randint(1, 3))
+            for slot_type in ("Lecture", "Lab")[:generator.randint(1, 2)]
+        ]
+        limit = generator.randint(1, 4)
+
+        result = ScheduleSolver(fixed, requirements, limit, 540, time_budget=5).solve()
+
+        fixed_sections = [to_section(fixed_row) for fixed_row in fixed_rows]
+        expected = sorted(
+            score(fixed_sections + list(combination), 540)[0]
+            for combination in itertools.product(*(requirement.sections for requirement in requirements))
+            if all(compatible(a, b) for a, b in itertools.combinations(combination, 2))
+        )
+        assert result.exhaustive
+        assert [option.penalty for option in result.options] == expected[:limit], trial
+        for option in result.options:
+            sections = fixed_sections + [to_section(section) for section in option.sections]
+            assert all(compatible(a, b) for a, b in itertools.combinations(sections, 2))
+
+def test_sections_clashing_with_the_fixed_schedule_are_dropped():
+    fixed = WeekSchedule([row("F", "Monday", 540, 600)])
+    requirement = build_requirement(fixed, "C", "Lecture", [
+        row("clash", "Monday", 570, 630),
+        row("after", "Monday", 600, 660)
+    ])
+    assert [section.row["slot_id"] for section in requirement.sections] == ["after"]
+
+def test_requirement_without_sections_has_no_timetable():
+    requirements = [
+        build_requirement(WeekSchedule([]), "A", "Lecture", [row("A1", "Monday", 540, 600)]),
+        build_requirement(WeekSchedule([]), "B", "Lecture", [])
+    ]
+    result = ScheduleSolver(WeekSchedule([]), requirements, 3, 540).solve()
+    assert result.options == [] and result.exhaustive
+
+def test_options_prefer_fewer_days_fewer_gaps_and_no_early_classes():
+    requirements = [
+        build_requirement(WeekSchedule([]), "A", "Lecture", [row("A-early", "Monday", 480, 540), row("A-mon", "Monday", 600, 660)]),
+        build_requirement(WeekSchedule([]), "B", "Lecture", [row("B-tue", "Tuesday", 660, 720), row("B-mon", "Monday", 780, 840)])
+    ]
+    best = ScheduleSolver(WeekSchedule([]), requirements, 1, 540).solve().options[0]
+
+    assert [section["slot_id"] for section in best.sections] == ["A-mon", "B-mon"]
+    assert (best.campus_days, best.idle_minutes, best.early_minutes) == (1, 120, 0)
+
+def test_search_stops_at_the_time_budget_with_what_it_found():
+    generator = random.Random(5)
+    requirements = [
+        build_requirement(WeekSchedule([]), f"C{course}", "Lecture", [
+            random_row(generator, f"C{course}-{index}", f"C{course}", "Lecture") for index in range(12)
+        ])
+        for course in range(14)
+    ]
+    result = ScheduleSolver(WeekSchedule([]), requirements, 5, 540, time_budget=0).solve()
+
+    assert not result.exhaustive
+    assert len(result.options) <= 5
+
+@pytest.fixture
+def registration(monkeypatch):
+    """CS101 has a full Monday lecture and a lab that clashes with the student's CS102 lecture"""
+    slots = FakeCollection([
+        {**row("L-full", "Monday", 540, 630, "CS101", "Lecture"), "seats_taken": 30},
+        {**row("L-open", "Tuesday", 540, 630, "CS101", "Lecture"), "seats_taken": 3},
+        {**row("B-clash", "Monday", 660, 750, "CS101", "Lab"), "seats_taken": 0},
+        {**row("B-open", "Wednesday", 540, 630, "CS101", "Lab"), "seats_taken": 0},
+        {**row("X-full", "Sunday", 540, 630, "CS103", "Lecture"), "seats_taken": 30}
+    ])
+    for slot in slots.documents:
+        slot.update(
+            capacity=30, room_id="R1", instructor_id=None,
+            start_time=f"{slot['start_min'] // 60:02d}:{slot['start_min'] % 60:02d}:00",
+            end_time=f"{slot['end_min'] // 60:02d}:{slot['end_min'] % 60:02d}:00"
+        )
+    sources = {
+        CatalogKind.COURSES: FakeCollection([
+            {"course_id": course_id, "name": course_id} for course_id in ("CS101", "CS102", "CS103")
+        ]),
+        CatalogKind.ROOMS: FakeCollection([{"room_id": "R1", "building": "A", "room_number": "101"}])
+    }
+    for kind in CATALOG_SOURCES:
+        _, key_field, query = CATALOG_SOURCES[kind]
+        monkeypatch.setitem(CATALOG_SOURCES, kind, (sources.get(kind, FakeCollection()), key_field, query))
+
+    class ScheduleIndex:
+        async def get(self, student_id):
+            return WeekSchedule([row("CS102-L", "Monday", 690, 780, "CS102", "Lecture")])
+
+    monkeypatch.setattr(schedule_controller, "catalog", CatalogSnapshot())
+    monkeypatch.setattr(schedule_controller, "schedule_index", ScheduleIndex())
+    monkeypatch.setattr(schedule_controller, "time_slots_collection", slots)
+    monkeypatch.setattr(schedule_controller, "enrollments_collection", FakeCollection([
+        {"student_id": "s1", "course_id": course_id, "status": EnrollmentStatus.PENDING}
+        for course_id in ("CS101", "CS102", "CS103")
+    ]))
+    schedule_controller.TIME_SLOTS_CACHE.clear()
+    yield TokenData(sub="student", role="student", user_id="s1")
+    schedule_controller.TIME_SLOTS_CACHE.clear()
+
+def test_recommendations_skip_full_and_clashing_sections(registration):
+    response = asyncio.run(schedule_controller.get_schedule_recommendations(registration))
+    recommendations = json.loads(response.body)
+
+    assert {
+        course_id: {slot_type: [slot["slot_id"] for slot in slots] for slot_type, slots in types.items()}
+        for course_id, types in recommendations.items()
+    } == {"CS101": {"Lecture": ["L-open"], "Lab": ["B-open"]}}
+    assert recommendations["CS101"]["Lecture"][0]["room_name"] == "A-101"
+
+def test_timetables_report_requirements_left_without_a_section(registration):
+    response = asyncio.run(schedule_controller.get_timetable_recommendations(user=registration))
+    timetables = json.loads(response.body)
+
+    assert timetables["schedules"] == []
+    assert timetables["unschedulable"] == {"CS103": ["Lecture"]}
+    assert timetables["exhaustive"] is True
+
+def test_timetables_once_every_requirement_has_an_open_section(registration):
+    schedule_controller.time_slots_collection.documents[-1]["seats_taken"] = 29
+
+    response = asyncio.run(schedule_controller.get_timetable_recommendations(user=registration))
+    timetables = json.loads(response.body)
+
+    assert [
+        sorted(section["slot_id"] for section in schedule["sections"]) for schedule in timetables["schedules"]
+    ] == [["B-open", "L-open", "X-full"]]
+    assert timetables["unschedulable"] == {}
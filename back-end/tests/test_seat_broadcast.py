@@ -0,0 +1,137 @@
+import asyncio
+import json
+
+import pytest
+
+import helpers.seat_broadcast as seat_broadcast_module
+from fakes import FakeCollection
+from helpers.seat_broadcast import SEATS_TOPIC, SeatBroadcaster
+
+class WebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+@pytest.fixture
+def slots(monkeypatch):
+    """CS101 has two slots and one watcher; CS102 is not watched"""
+    collection = FakeCollection([
+        {"slot_id": "L1", "course_id": "CS101", "capacity": 30, "seats_taken": 29},
+        {"slot_id": "L2", "course_id": "CS101", "capacity": 20, "seats_taken": 5},
+        {"slot_id": "X1", "course_id": "CS102", "capacity": 10, "seats_taken": 0}
+    ])
+    monkeypatch.setattr(seat_broadcast_module, "time_slots_collection", collection)
+    monkeypatch.setattr(seat_broadcast_module, "subscribers", {SEATS_TOPIC: {"CS101": {object()}}})
+    return collection
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Messages broadcast to the subscribers of a topic key"""
+    messages = []
+
+    async def broadcast_text(topic, key, text):
+        messages.append((topic, key, json.loads(text)))
+
+    monkeypatch.setattr(seat_broadcast_module, "broadcast_text", broadcast_text)
+    return messages
+
+@pytest.fixture
+def broadcaster(slots, sent, monkeypatch):
+    monkeypatch.setattr(seat_broadcast_module, "SEAT_BROADCAST_WINDOW", 0)
+    return SeatBroadcaster()
+
+def slot(slots, slot_id):
+    return next(document for document in slots.documents if document["slot_id"] == slot_id)
+
+async def settle(broadcaster):
+    while broadcaster.flush_task is not None:
+        await broadcaster.flush_task
+
+def test_changes_in_one_window_go_out_as_one_delta(broadcaster, slots, sent):
+    async def scenario():
+        websocket = WebSocket()
+        await broadcaster.send_snapshot("CS101", websocket)
+
+        slot(slots, "L1")["seats_taken"] = 30
+        broadcaster.touch("CS101")
+        broadcaster.touch("CS101")
+        await settle(broadcaster)
+        return websocket.sent
+
+    snapshot = asyncio.run(scenario())
+
+    assert snapshot == [{
+        "collection": "seats", "operation": "snapshot", "course_id": "CS101",
+        "slots": {
+            "L1": {"enrolled_count": 29, "seats_available": 1},
+            "L2": {"enrolled_count": 5, "seats_available": 15}
+        }
+    }]
+    assert sent == [("seats", "CS101", {
+        "collection": "seats", "operation": "delta", "course_id": "CS101",
+        "slots": {"L1": {"enrolled_count": 30, "seats_available": 0}}
+    })]
+
+def test_deleted_slots_are_sent_as_null_and_unchanged_courses_stay_quiet(broadcaster, slots, sent):
+    async def scenario():
+        await broadcaster.send_snapshot("CS101", WebSocket())
+        broadcaster.touch("CS101")
+        await settle(broadcaster)
+
+        object_id = next(key for key, course_id in broadcaster.slot_courses.items() if course_id == "CS101")
+        slots.documents.remove(next(
+            document for document in slots.documents if str(document["_id"]) == object_id
+        ))
+        broadcaster.on_time_slot_change({"operation": "delete", "document_id": object_id})
+        await settle(broadcaster)
+        return object_id
+
+    object_id = asyncio.run(scenario())
+
+    assert object_id not in broadcaster.slot_courses
+    [(_, _, message)] = sent
+    assert list(message["slots"].values()) == [None]
+
+def test_only_seat_changes_of_watched_courses_are_broadcast(broadcaster, slots, sent):
+    async def scenario():
+        await broadcaster.send_snapshot("CS101", WebSocket())
+        object_id = next(iter(broadcaster.slot_courses))
+
+        broadcaster.on_time_slot_change({
+            "operation": "update", "document_id": object_id, "updated_fields": {"room_id": "R2"}
+        })
+        assert broadcaster.flush_task is None
+        # Seat updates of slots never loaded here belong to unwatched courses
+        broadcaster.on_time_slot_change({
+            "operation": "update", "document_id": "unknown", "updated_fields": {"seats_taken": 1}
+        })
+        broadcaster.on_time_slot_change({
+            "operation": "insert", "document_id": "new", "document": {"course_id": "CS102"}
+        })
+        assert broadcaster.flush_task is None
+
+        slot(slots, "L2")["seats_taken"] = 6
+        broadcaster.on_time_slot_change({
+            "operation": "update", "document_id": object_id, "updated_fields": {"seats_taken": 6}
+        })
+        await settle(broadcaster)
+
+    asyncio.run(scenario())
+
+    assert [(key, message["slots"]) for _, key, message in sent] == [
+        ("CS101", {"L2": {"enrolled_count": 6, "seats_available": 14}})
+    ]
+
+def test_courses_nobody_watches_any_more_are_forgotten(broadcaster, sent, monkeypatch):
+    async def scenario():
+        await broadcaster.send_snapshot("CS101", WebSocket())
+        broadcaster.touch("CS101")
+        monkeypatch.setattr(seat_broadcast_module, "subscribers", {SEATS_TOPIC: {}})
+        await settle(broadcaster)
+
+    asyncio.run(scenario())
+
+    assert sent == []
+    assert broadcaster.counters == {} and broadcaster.slot_courses == {}
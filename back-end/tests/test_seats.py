@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+import controllers.scheduleController as schedule_controller
+from fakes import FakeCollection, FakeCursor, matches
+from helpers.catalog import CATALOG_SOURCES, CatalogKind, CatalogSnapshot
+
+@pytest.fixture
+def time_slots(monkeypatch):
+    collection = FakeCollection([
+        {"slot_id": "open", "capacity": 2, "seats_taken": 1},
+        {"slot_id": "full", "capacity": 2, "seats_taken": 2},
+        {"slot_id": "empty", "capacity": 2, "seats_taken": 0}
+    ])
+    monkeypatch.setattr(schedule_controller, "time_slots_collection", collection)
+    return collection
+
+def seats_taken(collection, slot_id):
+    return next(slot["seats_taken"] for slot in collection.documents if slot["slot_id"] == slot_id)
+
+def test_reserve_seat_takes_the_last_seat_then_refuses(time_slots):
+    assert asyncio.run(schedule_controller.reserve_seat("open")) is True
+    assert seats_taken(time_slots, "open") == 2
+    assert asyncio.run(schedule_controller.reserve_seat("open")) is False
+    assert seats_taken(time_slots, "open") == 2
+
+def test_reserve_seat_refuses_a_full_section(time_slots):
+    assert asyncio.run(schedule_controller.reserve_seat("full")) is False
+    assert seats_taken(time_slots, "full") == 2
+
+def test_concurrent_reservations_never_overbook(time_slots):
+    async def race():
+        return await asyncio.gather(*(schedule_controller.reserve_seat("empty") for _ in range(5)))
+
+    assert sorted(asyncio.run(race())) == [False, False, False, True, True]
+    assert seats_taken(time_slots, "empty") == 2
+
+def test_release_seat_never_drops_below_zero(time_slots):
+    asyncio.run(schedule_controller.release_seat("empty"))
+    assert seats_taken(time_slots, "empty") == 0
+    asyncio.run(schedule_controller.release_seat("full"))
+    assert seats_taken(time_slots, "full") == 1
+
+class FakeSchedules(FakeCollection):
+    """Schedule rows with the per-slot count aggregation ensure_seat_counters runs"""
+
+    def __init__(self, documents):
+        super().__init__(documents)
+        self.aggregations = 0
+
+    def aggregate(self, pipeline):
+        self.aggregations += 1
+        counts = {}
+        for document in self.documents:
+            if matches(document, pipeline[0]["$match"]):
+                counts[document["slot_id"]] = counts.get(document["slot_id"], 0) + 1
+        return FakeCursor([{"_id": slot_id, "count": count} for slot_id, count in counts.items()])
+
+@pytest.fixture
+def legacy_slots(monkeypatch):
+    """Slots written before seat counters existed, in room R1 with 30 seats"""
+    collection = FakeCollection([
+        {"slot_id": "a", "room_id": "R1"},
+        {"slot_id": "b", "room_id": "R1", "capacity": 5},
+        {"slot_id": "c", "room_id": "gone"},
+        {"slot_id": "d", "room_id": "R1", "capacity": 9, "seats_taken": 2}
+    ])
+    schedules = FakeSchedules([{"slot_id": slot_id} for slot_id in ("a", "a", "b", "other")])
+    sources = {CatalogKind.ROOMS: FakeCollection([{"room_id": "R1", "capacity": 30}])}
+    for kind in CATALOG_SOURCES:
+        _, key_field, query = CATALOG_SOURCES[kind]
+        monkeypatch.setitem(CATALOG_SOURCES, kind, (sources.get(kind, FakeCollection()), key_field, query))
+    monkeypatch.setattr(schedule_controller, "catalog", CatalogSnapshot())
+    monkeypatch.setattr(schedule_controller, "time_slots_collection", collection)
+    monkeypatch.setattr(schedule_controller, "schedules_collection", schedules)
+    return collection, schedules
+
+def test_counters_are_backfilled_from_rooms_and_schedule_rows(legacy_slots):
+    collection, schedules = legacy_slots
+    slots = [dict(slot) for slot in collection.documents]
+
+    backfilled = asyncio.run(schedule_controller.ensure_seat_counters(slots))
+
+    assert [(slot["slot_id"], slot["capacity"], slot["seats_taken"]) for slot in backfilled] == [
+        ("a", 30, 2), ("b", 5, 1), ("c", 0, 0), ("d", 9, 2)
+    ]
+    assert backfilled[3] is slots[3]
+    assert schedules.aggregations == 1
+
+def test_slots_with_counters_are_returned_without_queries(legacy_slots):
+    _, schedules = legacy_slots
+    slots = [{"slot_id": "d", "capacity": 9, "seats_taken": 2}]
+    assert asyncio.run(schedule_controller.ensure_seat_counters(slots)) is slots
+    assert schedules.aggregations == 0
+
+def test_backfill_never_overwrites_counters_set_since_the_read(legacy_slots):
+    collection, _ = legacy_slots
+    stale = dict(collection.documents[0])
+    # A concurrent backfill and reservation ran after this slot was read
+    collection.documents[0].update(capacity=30, seats_taken=3)
+
+    slot = asyncio.run(schedule_controller.ensure_seat_counter(stale))
+
+    assert (slot["capacity"], slot["seats_taken"]) == (30, 3)
@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+import helpers.semester_settings as semester_settings_module
+from fakes import FakeCollection
+from helpers.semester_settings import SETTINGS_ID, SemesterSettingsSnapshot
+
+@pytest.fixture
+def settings(monkeypatch):
+    collection = FakeCollection([{
+        "_id": SETTINGS_ID,
+        "current_semester": "Spring",
+        "registration_periods": {
+            "registration_enabled": True,
+            "registration_start_date": "2026-01-10T00:00:00Z",
+            "registration_end_date": datetime(2026, 1, 20),
+            "withdrawal_enabled": False
+        }
+    }])
+    monkeypatch.setattr(semester_settings_module, "semester_settings_collection", collection)
+    return collection
+
+def test_registration_period_boundaries(settings):
+    snapshot = asyncio.run(SemesterSettingsSnapshot().get())
+    assert snapshot.current_semester == "Spring"
+
+    before = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    during = datetime(2026, 1, 15, tzinfo=timezone.utc)
+    after = datetime(2026, 1, 21, tzinfo=timezone.utc)
+    assert snapshot.registration_status(before)[0] is False
+    assert snapshot.registration_status(during) == (True, "Registration allowed")
+    # Naive stored dates are read as UTC
+    assert snapshot.registration_status(after) == (
+        False, "Course registration period ended on 2026-01-20T00:00:00+00:00"
+    )
+    assert snapshot.withdrawal_status(during) == (False, "Course withdrawal is currently disabled")
+
+def test_change_event_refreshes_the_snapshot(settings):
+    async def scenario():
+        snapshot = await SemesterSettingsSnapshot().get()
+        await settings.update_one({"_id": SETTINGS_ID}, {"$set": {"current_semester": "Fall"}})
+        stale = snapshot.current_semester
+        await snapshot.on_change({"operation": "update", "document_id": SETTINGS_ID})
+        return stale, snapshot.current_semester
+
+    assert asyncio.run(scenario()) == ("Spring", "Fall")
+
+def test_missing_settings_document_closes_registration(settings):
+    settings.documents.clear()
+    snapshot = asyncio.run(SemesterSettingsSnapshot().get())
+    assert snapshot.registration_status() == (False, "Registration period not configured")
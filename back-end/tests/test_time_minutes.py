@@ -0,0 +1,44 @@
+import asyncio
+from datetime import time
+
+import pytest
+
+from fakes import FakeCollection
+from helpers.schedule_index import format_minutes, slot_minutes, stored_time_fields
+from migrate_time_minutes import migrate
+
+def test_stored_time_fields_normalize_every_accepted_format():
+    assert stored_time_fields(time(9, 5), "2:30 PM") == {
+        "start_time": "09:05:00", "end_time": "14:30:00", "start_min": 545, "end_min": 870
+    }
+    assert stored_time_fields("09:05", "23:59:59")["end_min"] == 23 * 60 + 59
+    assert format_minutes(545) == "09:05"
+
+    with pytest.raises(ValueError):
+        stored_time_fields("25:00", "26:00")
+
+def test_slot_minutes_fall_back_to_the_time_strings():
+    assert slot_minutes({"start_min": 540, "end_min": 600, "start_time": "ignored"}) == (540, 600)
+    assert slot_minutes({"start_time": "09:00:00", "end_time": "10:15:00"}) == (540, 615)
+    # A half-migrated row is parsed as a whole
+    assert slot_minutes({"start_min": 0, "start_time": "09:00:00", "end_time": "10:00:00"}) == (540, 600)
+
+def test_migration_backfills_minutes_in_batches_and_skips_bad_rows():
+    collection = FakeCollection([
+        {"_id": 1, "start_time": "09:00:00", "end_time": "10:30:00"},
+        {"_id": 2, "start_time": "nine", "end_time": "10:30:00"},
+        {"_id": 3, "start_time": "13:00:00", "end_time": "14:00:00", "start_min": 780, "end_min": 840},
+        {"_id": 4, "start_time": "1:00 PM", "end_time": "2:00 PM", "start_min": 780},
+        {"_id": 5, "end_time": "10:00:00"}
+    ])
+
+    skipped = asyncio.run(migrate(collection, "time_slots", batch_size=2))
+
+    assert skipped == 2
+    by_id = {document["_id"]: document for document in collection.documents}
+    assert (by_id[1]["start_min"], by_id[1]["end_min"]) == (540, 630)
+    assert (by_id[4]["start_min"], by_id[4]["end_min"]) == (780, 840)
+    assert "start_min" not in by_id[2] and "start_min" not in by_id[5]
+
+    # Re-running only revisits the rows that could not be migrated
+    assert asyncio.run(migrate(collection, "time_slots", batch_size=2)) == 2
@@ -0,0 +1,37 @@
+from datetime import time
+
+import pytest
+
+from controllers.scheduleController import parse_time, time_slot_response_row, time_slot_row
+from models.Schedules import TimeSlotResponse
+
+SLOT = {
+    "_id": "ignored",
+    "slot_id": "CS101-L1",
+    "course_id": "CS101",
+    "day": "Monday",
+    "start_time": "09:00:00",
+    "end_time": "10:30:00",
+    "type": "Lecture",
+    "room_id": "R1",
+    "capacity": 30
+}
+
+@pytest.mark.parametrize("value, expected", [
+    (time(9, 5), time(9, 5)),
+    ("09:05:00", time(9, 5)),
+    ("09:05", time(9, 5)),
+    ("9:05 PM", time(21, 5))
+])
+def test_parse_time_accepts_every_stored_format(value, expected):
+    assert parse_time(value) == expected
+
+def test_row_matches_what_the_response_model_would_produce():
+    row = time_slot_response_row(time_slot_row(SLOT, "A-101", None), "Programming I")
+    validated = TimeSlotResponse(**row).model_dump()
+
+    assert row == validated
+    # Same field order as the model, so the JSON is byte-for-byte the same
+    assert list(row) == list(validated)
+    assert row["start_time"] == time(9, 0)
+    assert row["instructor_id"] is None
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from pymongo.errors import OperationFailure, PyMongoError
+
+import helpers.transactions as transactions
+from helpers.transactions import ILLEGAL_OPERATION, run_transaction
+
+def labelled(message, label):
+    return PyMongoError(message, error_labels=[label])
+
+class Session:
+    def __init__(self, client):
+        self.client = client
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def start_transaction(self):
+        self.client.transactions += 1
+        if self.client.start_error is not None:
+            raise self.client.start_error
+        return self
+
+    async def commit_transaction(self):
+        self.client.commits += 1
+        if self.client.commit_errors:
+            raise self.client.commit_errors.pop(0)
+
+class Client:
+    def __init__(self, start_error=None, commit_errors=()):
+        self.start_error = start_error
+        self.commit_errors = list(commit_errors)
+        self.transactions = 0
+        self.commits = 0
+
+    async def start_session(self):
+        return Session(self)
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    async def sleep(delay):
+        pass
+
+    monkeypatch.setattr(transactions.asyncio, "sleep", sleep)
+
+def run(client, monkeypatch, callback):
+    monkeypatch.setattr(transactions, "client", client)
+    return asyncio.run(run_transaction(callback))
+
+def test_transient_errors_retry_the_whole_transaction(monkeypatch, no_backoff):
+    attempts = []
+
+    async def callback(session):
+        attempts.append(session)
+        if len(attempts) < 3:
+            raise labelled("write conflict", "TransientTransactionError")
+        return "charged"
+
+    client = Client()
+    assert run(client, monkeypatch, callback) == "charged"
+    assert len(attempts) == 3
+    assert client.commits == 1
+
+def test_retries_stop_after_max_attempts(monkeypatch, no_backoff):
+    attempts = []
+
+    async def callback(session):
+        attempts.append(session)
+        raise labelled("write conflict", "TransientTransactionError")
+
+    with pytest.raises(PyMongoError):
+        run(Client(), monkeypatch, callback)
+    assert len(attempts) == transactions.TRANSACTION_MAX_ATTEMPTS
+
+def test_other_errors_are_not_retried(monkeypatch):
+    attempts = []
+
+    async def callback(session):
+        attempts.append(session)
+        raise PyMongoError("duplicate key")
+
+    with pytest.raises(PyMongoError):
+        run(Client(), monkeypatch, callback)
+    assert len(attempts) == 1
+
+def test_unknown_commit_result_retries_only_the_commit(monkeypatch):
+    attempts = []
+
+    async def callback(session):
+        attempts.append(session)
+        return "charged"
+
+    client = Client(commit_errors=[labelled("network timeout", "UnknownTransactionCommitResult")])
+    assert run(client, monkeypatch, callback) == "charged"
+    assert len(attempts) == 1
+    assert client.commits == 2
+
+def test_standalone_deployment_runs_the_callback_without_a_session(monkeypatch):
+    sessions = []
+
+    async def callback(session):
+        sessions.append(session)
+        return "charged"
+
+    client = Client(start_error=OperationFailure("Transaction numbers are only allowed on a replica set", ILLEGAL_OPERATION))
+    assert run(client, monkeypatch, callback) == "charged"
+    assert sessions == [None]
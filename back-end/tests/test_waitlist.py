@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import PyMongoError
+
+import controllers.scheduleController as schedule_controller
+from fakes import FakeCollection
+from models.Enrollments import EnrollmentStatus
+from models.Schedules import WaitlistStatus
+
+class Registrar:
+    """Stands in for assign_slot and notify_waitlist and records their calls"""
+
+    def __init__(self):
+        self.assigned = []
+        self.notified = []
+        self.failures = {}
+
+    async def assign_slot(self, student_id, course_id, slot, seat_reserved=False):
+        assert seat_reserved
+        failure = self.failures.get(student_id)
+        if failure is not None:
+            # assign_slot gives the seat back whenever it raises
+            await schedule_controller.release_seat(slot["slot_id"])
+            raise failure
+        self.assigned.append(student_id)
+
+    async def notify_waitlist(self, student_id, operation, entry, detail=None):
+        self.notified.append((student_id, operation, detail))
+
+@pytest.fixture
+def registrar(monkeypatch):
+    registrar = Registrar()
+    registrar.time_slots = FakeCollection([
+        {"slot_id": "lab-1", "course_id": "CS101", "capacity": 2, "seats_taken": 1}
+    ])
+    registrar.waitlist = FakeCollection([
+        {"_id": student_id, "slot_id": "lab-1", "course_id": "CS101", "student_id": student_id,
+         "status": WaitlistStatus.WAITING, "position": position}
+        for position, student_id in [(2, "s2"), (1, "s1"), (3, "s3")]
+    ])
+    enrollments = FakeCollection([
+        {"student_id": student_id, "course_id": "CS101", "status": EnrollmentStatus.PENDING}
+        for student_id in ("s1", "s2", "s3")
+    ])
+    monkeypatch.setattr(schedule_controller, "time_slots_collection", registrar.time_slots)
+    monkeypatch.setattr(schedule_controller, "waitlist_collection", registrar.waitlist)
+    monkeypatch.setattr(schedule_controller, "enrollments_collection", enrollments)
+    monkeypatch.setattr(schedule_controller, "assign_slot", registrar.assign_slot)
+    monkeypatch.setattr(schedule_controller, "notify_waitlist", registrar.notify_waitlist)
+    registrar.enrollments = enrollments
+    return registrar
+
+def statuses(registrar):
+    return {entry["student_id"]: entry["status"] for entry in registrar.waitlist.documents}
+
+def seats_taken(registrar):
+    return registrar.time_slots.documents[0]["seats_taken"]
+
+def test_freed_seat_goes_to_the_head_of_the_waitlist(registrar):
+    assert asyncio.run(schedule_controller.promote_waitlist("lab-1")) == "s1"
+
+    assert registrar.assigned == ["s1"]
+    assert seats_taken(registrar) == 2
+    assert statuses(registrar) == {
+        "s1": WaitlistStatus.PROMOTED, "s2": WaitlistStatus.WAITING, "s3": WaitlistStatus.WAITING
+    }
+    assert registrar.notified == [("s1", "waitlist_promoted", None)]
+
+def test_full_section_promotes_nobody(registrar):
+    registrar.time_slots.documents[0]["seats_taken"] = 2
+
+    assert asyncio.run(schedule_controller.promote_waitlist("lab-1")) is None
+
+    assert registrar.assigned == []
+    assert seats_taken(registrar) == 2
+    assert set(statuses(registrar).values()) == {WaitlistStatus.WAITING}
+
+def test_students_who_cannot_take_the_seat_are_skipped(registrar):
+    registrar.enrollments.documents = [
+        enrollment for enrollment in registrar.enrollments.documents if enrollment["student_id"] != "s1"
+    ]
+    registrar.failures["s2"] = HTTPException(status_code=400, detail="Time conflict with CS102")
+
+    assert asyncio.run(schedule_controller.promote_waitlist("lab-1")) == "s3"
+
+    assert statuses(registrar) == {
+        "s1": WaitlistStatus.SKIPPED, "s2": WaitlistStatus.SKIPPED, "s3": WaitlistStatus.PROMOTED
+    }
+    assert registrar.notified == [
+        ("s1", "waitlist_skipped", "You are no longer enrolled in this course"),
+        ("s2", "waitlist_skipped", "Time conflict with CS102"),
+        ("s3", "waitlist_promoted", None)
+    ]
+    assert seats_taken(registrar) == 2
+
+def test_failed_promotion_puts_the_entry_back_and_frees_the_seat(registrar):
+    registrar.failures["s1"] = PyMongoError("connection reset")
+
+    with pytest.raises(PyMongoError):
+        asyncio.run(schedule_controller.promote_waitlist("lab-1"))
+
+    assert statuses(registrar)["s1"] == WaitlistStatus.WAITING
+    assert seats_taken(registrar) == 1
+
+def test_empty_waitlist_keeps_the_seat_free(registrar):
+    registrar.waitlist.documents.clear()
+
+    assert asyncio.run(schedule_controller.promote_waitlist("lab-1")) is None
+    assert seats_taken(registrar) == 1
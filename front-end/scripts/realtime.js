@@ -281,6 +281,9 @@ class RealtimeService {
         else if (collection === 'courses') {
             entityId = data.document?.course_id || '';
         }
+        else if (collection === 'seats') {
+            entityId = data.course_id || '';
+        }
         
         // If we have a valid entity ID, call the appropriate callback
         if (entityId) {
@@ -351,11 +354,23 @@ async function subscribeToCourseUpdates(courseId, callback) {
     return realtimeService.subscribe('courses', courseId, callback);
 }
 
+// Helper function to subscribe to seat availability for a specific course.
+// The callback first gets a 'snapshot' of every slot, then 'delta' messages with
+// only the slots that changed: data.slots[slotId] = {enrolled_count, seats_available},
+// or null once the slot is removed
+async function subscribeToSeatUpdates(courseId, callback) {
+    if (!realtimeService.connected) {
+        await realtimeService.connect();
+    }
+    return realtimeService.subscribe('seats', courseId, callback);
+}
+
 // Export the service and helper functions
 export {
     realtimeService,
     subscribeToScheduleUpdates,
     subscribeToTimeSlotUpdates,
     subscribeToEnrollmentUpdates,
-    subscribeToCourseUpdates
+    subscribeToCourseUpdates,
+    subscribeToSeatUpdates
 }; 
\ No newline at end of file